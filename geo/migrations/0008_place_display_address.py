@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+BACKFILL_SQL = """
+    UPDATE geo_place p
+    SET display_address = p.name || ', ' || p.address || ', ' || c.name || ', '
+        || coalesce(s.state_code, '') || ' ' || p.zip_code || ', ' || coalesce(co.iso3, '')
+    FROM geo_city c, geo_state s, geo_country co
+    WHERE c.id = p.city_id AND s.id = p.state_id AND co.id = p.country_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("geo", "0007_auto_20250501_0415"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="place",
+            name="display_address",
+            field=models.CharField(blank=True, default="", max_length=1024),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
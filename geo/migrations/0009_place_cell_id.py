@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+# One place per geohash-9 cell gets the cell id; the others stay NULL until the
+# dedupe_places command merges them into it
+BACKFILL_SQL = """
+    UPDATE geo_place p
+    SET cell_id = ST_GeoHash(p.location, 9)
+    WHERE p.id IN (
+        SELECT DISTINCT ON (ST_GeoHash(location, 9)) id
+        FROM geo_place
+        WHERE location IS NOT NULL
+        ORDER BY ST_GeoHash(location, 9), id
+    )
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("geo", "0008_place_display_address"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="place",
+            name="cell_id",
+            field=models.CharField(blank=True, max_length=12, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+        migrations.AlterField(
+            model_name="place",
+            name="cell_id",
+            field=models.CharField(blank=True, max_length=12, null=True, unique=True),
+        ),
+    ]
@@ -112,6 +112,9 @@ class Timezone(models.Model):
     def __str__(self):
         return f"{self.tz_name} ({self.zone_name})"
 
+# Geohash length of Place.cell_id; 9 characters is a ~4.8m x 4.8m cell
+PLACE_CELL_PRECISION = 9
+
 class Place(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255)
@@ -121,9 +124,38 @@ class Place(models.Model):
     city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='city_places')
     country = models.ForeignKey(Country, on_delete=models.CASCADE, related_name='country_places')
     state = models.ForeignKey(State, on_delete=models.CASCADE, related_name='state_places')
+    # "name, address, city, STATE zip, ISO3", kept in sync by save() and geo.signals
+    display_address = models.CharField(max_length=1024, blank=True, default='')
+    # Geohash (PLACE_CELL_PRECISION) of the location; one place per cell, see navigation.places
+    cell_id = models.CharField(max_length=12, unique=True, null=True, blank=True)
 
     class Meta:
         unique_together = ('country', 'state', 'city', 'zip_code', 'location')
 
+    def build_display_address(self):
+        return (
+            f"{self.name}, {self.address}, {self.city.name}, "
+            f"{self.state.state_code or ''} {self.zip_code}, {self.country.iso3 or ''}"
+        )
+
+    def save(self, *args, **kwargs):
+        self.display_address = self.build_display_address()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'display_address'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
+
+
+# Recomputes Place.display_address in SQL for the places matching {where}, e.g. after a
+# city is renamed; mirrors Place.build_display_address
+DISPLAY_ADDRESS_SQL = """
+    UPDATE geo_place p
+    SET display_address = p.name || ', ' || p.address || ', ' || c.name || ', '
+        || coalesce(s.state_code, '') || ' ' || p.zip_code || ', ' || coalesce(co.iso3, '')
+    FROM geo_city c, geo_state s, geo_country co
+    WHERE c.id = p.city_id AND s.id = p.state_id AND co.id = p.country_id
+      AND {where}
+"""
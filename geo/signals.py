@@ -0,0 +1,30 @@
+# geo/signals.py
+from django.db import connection
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from geo.models import DISPLAY_ADDRESS_SQL, City, Country, State
+
+
+def refresh_display_addresses(column, value):
+    """Recompute the display address of every place whose `column` equals `value`, in one UPDATE."""
+    with connection.cursor() as cursor:
+        cursor.execute(DISPLAY_ADDRESS_SQL.format(where=f"p.{column} = %s"), [value])
+
+
+@receiver(post_save, sender=City)
+def city_saved(sender, instance, created=False, **kwargs):
+    if not created:
+        refresh_display_addresses('city_id', instance.id)
+
+
+@receiver(post_save, sender=State)
+def state_saved(sender, instance, created=False, **kwargs):
+    if not created:
+        refresh_display_addresses('state_id', instance.id)
+
+
+@receiver(post_save, sender=Country)
+def country_saved(sender, instance, created=False, **kwargs):
+    if not created:
+        refresh_display_addresses('country_id', instance.id)
@@ -1,19 +1,22 @@
 import os
 import pandas as pd
-import requests
 from django import forms
+from django.conf import settings
 from django.shortcuts import redirect
 from django.template.response import TemplateResponse
 from django.contrib import admin, messages
+from django.contrib.gis.geos import LineString, Point
 
 from django.urls import path
 from django.db.models import Q
-from geo.models import Country, State, City, Place
+from geo.models import Country, State, City
 from math import radians, sin, cos, sqrt, atan2
 
 from .models import (
-    Route, SurfaceType, TravelType, Transit, TransitMarker, TransitMarkerTracking
+    Route, Segments, SurfaceType, TravelType, Transit, TransitMarker, TransitMarkerTracking
 )
+from .providers import provider_client, deadline_in
+from .places import upsert_place
 
 
 class UploadExcelForm(forms.Form):
@@ -31,8 +34,12 @@ class TravelTypeAdmin(admin.ModelAdmin):
     search_fields = ['name']
     ordering = ['name']
 
-def get_place_details(location_name):
-    """Function to search Google Places API and return place details with structured address components."""
+def get_place_details(location_name, deadline=None):
+    """
+    Function to search Google Places API and return place details with structured address components.
+    Both Google calls stop at `deadline`, GEOCODE_BUDGET from now by default.
+    """
+    deadline = deadline or deadline_in(settings.GEOCODE_BUDGET)
     url = f"https://maps.googleapis.com/maps/api/place/findplacefromtext/json"
     params = {
         "input": location_name,
@@ -40,8 +47,8 @@ def get_place_details(location_name):
         "fields": "formatted_address,geometry,place_id",
         "key": os.getenv('GOOGLE_MPA_KEY'),
     }
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
+    response = provider_client.get('google', url, params=params, deadline=deadline)
+    if response is not None and response.status_code == 200:
         data = response.json()
         if data.get("candidates"):
             place_id = data["candidates"][0]["place_id"]
@@ -53,8 +60,8 @@ def get_place_details(location_name):
                 "fields": "address_component,formatted_address,geometry",
                 "key": os.getenv('GOOGLE_MPA_KEY'),
             }
-            details_response = requests.get(details_url, params=details_params)
-            if details_response.status_code == 200:
+            details_response = provider_client.get('google', details_url, params=details_params, deadline=deadline)
+            if details_response is not None and details_response.status_code == 200:
                 details_data = details_response.json()
                 if details_data.get("result"):
                     place = details_data["result"]
@@ -149,7 +156,7 @@ def find_city(city_value, state_code=None, country_code=None):
 
 def find_or_create_place(name, address, country, state, city, zip_code, lat, lng):
     """
-    Finds a Place instance based on name, address, country, state, city, and zip_code.
+    Finds the Place in the geohash cell of the given coordinates.
     If not found, creates a new Place instance.
 
     Parameters:
@@ -165,32 +172,7 @@ def find_or_create_place(name, address, country, state, city, zip_code, lat, lng
     Returns:
         Place: The Place instance found or created.
     """
-    print(lat, lng, country, state, city, zip_code)
-    place = Place.objects.filter(
-        lat=lat,
-        lng=lng,
-        country=country,
-        state=state,
-        city=city,
-        zip_code=zip_code
-    ).first()
-
-    # If place is not found, create a new one
-    if not place:
-        print("No Place Found:")
-        place = Place.objects.create(
-            name=name,
-            address=address,
-            country=country,
-            state=state,
-            city=city,
-            zip_code=zip_code,
-            lat=lat,
-            lng=lng
-        )
-        print("New Place created with ID:", place.name)
-
-    return place
+    return upsert_place(name, address, country, state, city, zip_code, lat, lng)
 
 def get_or_create_surface_type(name):
     """
@@ -240,7 +222,7 @@ class RouteAdmin(admin.ModelAdmin):
     list_filter = ['status', 'created_at']
     ordering = ['created_at']
     fields = ['origin', 'destination', 'status']
-    exclude = ['route', 'user', 'updated_by']
+    exclude = ['user', 'updated_by']
 
 
     def number_of_segments(self, obj):
@@ -352,7 +334,6 @@ class RouteAdmin(admin.ModelAdmin):
                                         status='active',  # Set to either 'active' or 'inactive'
                                         origin=origin_place,
                                         destination=destination_place,
-                                        route=[],  # JSON data for the route field
                                         user=request.user  # The user creating the route
                                     )
 
@@ -410,9 +391,8 @@ class RouteAdmin(admin.ModelAdmin):
 
                                     wheelchair_speed_mps = 1.2  # Average speed in meters per second
 
-                                    # Iterate over each segment in mapSegment
-                                    from .models import SegmentPoints
-
+                                    # Build every segment's geometry in memory and insert them together
+                                    new_segments = []
                                     for segment_number, segment_data_list in mapSegment.items():
                                         print(f"Segment Number: {segment_number}")
 
@@ -424,79 +404,50 @@ class RouteAdmin(admin.ModelAdmin):
                                             instructions = segment_data_list[0].get("instructions")
                                             maneuver = segment_data_list[0].get("maneuver")
 
-                                            # Initialize total distance and duration for the segment
-                                            segment_distance = 0
-                                            previous_lat, previous_lng = None, None
+                                            coordinates = [
+                                                (data["lng"], data["lat"], 0)
+                                                for data in segment_data_list
+                                                if data.get("lat") is not None and data.get("lng") is not None
+                                            ]
+
+                                            # Segments end where the next one starts
+                                            if (segment_number + 1) in mapSegment:
+                                                next_data = mapSegment[segment_number + 1][0]
+                                                if next_data.get("lat") is not None and next_data.get("lng") is not None:
+                                                    coordinates.append((next_data["lng"], next_data["lat"], 0))
+
+                                            if not coordinates:
+                                                continue
+                                            if len(coordinates) == 1:
+                                                coordinates.append(coordinates[0])
+
+                                            segment_distance = sum(
+                                                haversine(lat1, lng1, lat2, lng2)
+                                                for (lng1, lat1, _), (lng2, lat2, _) in zip(coordinates, coordinates[1:])
+                                            )
 
-                                            # Create the Segments instance
-                                            new_segment = Segments(
+                                            new_segments.append(Segments(
                                                 route=new_route,
                                                 segment_number=segment_number,
                                                 surface_id=surface_id,
                                                 travel_mode_id=1,  # Replace with the correct travel mode ID
                                                 maneuver=maneuver,
                                                 instructions=instructions,
-                                                duration=0,  # Calculated later
-                                                distance=0,  # Calculated later
+                                                geometry=LineString(coordinates, srid=4326),
+                                                distance=segment_distance,
+                                                duration=round(segment_distance / wheelchair_speed_mps),  # Duration in seconds
+                                                number_of_point=len(coordinates),
                                                 user=request.user
-                                            )
+                                            ))
+                                            print(f"Total distance for segment {segment_number}: {segment_distance:.2f} meters")
 
-                                            new_segment.save()
-
-                                            # Iterate over each row (dictionary) within the current segment and create SegmentPoints
-                                            for i, data in enumerate(segment_data_list):
-                                                lat = data.get("lat")
-                                                lng = data.get("lng")
-
-                                                # Calculate distance from the previous point, if applicable
-                                                if previous_lat is not None and previous_lng is not None:
-                                                    distance = haversine(previous_lat, previous_lng, lat,lng)  # Distance in meters
-                                                    segment_distance += distance
-
-                                                # Create the SegmentPoints instance
-                                                segment_point = SegmentPoints(
-                                                    segment=new_segment,
-                                                    route=new_route,
-                                                    user=request.user,
-                                                    updated_by=request.user,
-                                                    lat=lat,
-                                                    lng=lng,
-                                                    point_number=i + 1,  # Point number starts from 1
-                                                )
-                                                segment_point.save()
-                                                print(f"SegmentPoint created with ID: {segment_point.id} at (lat: {lat}, lng: {lng})")
-
-                                                # Update the previous point coordinates for the next iteration
-                                                previous_lat, previous_lng = lat, lng
+                                    Segments.objects.bulk_create(new_segments)
 
-                                            if (segment_number + 1) in mapSegment:
-                                                next_segment_data_list = mapSegment[segment_number + 1]
-                                                next_lat = next_segment_data_list[0].get("lat")
-                                                next_lng = next_segment_data_list[0].get("lng")
-
-                                                # Calculate distance from the previous point, if applicable
-                                                if previous_lat is not None and previous_lng is not None:
-                                                    distance = haversine(previous_lat, previous_lng, next_lat,next_lng)  # Distance in meters
-                                                    segment_distance += distance
-
-                                                segment_point = SegmentPoints(
-                                                    segment=new_segment,
-                                                    route=new_route,
-                                                    user=request.user,
-                                                    updated_by=request.user,
-                                                    lat=next_lat,
-                                                    lng=next_lng,
-                                                    point_number=len(segment_data_list) + 1,  # Point number starts from 1
-                                                )
-                                                segment_point.save()
-
-
-                                            # Update the segment with the calculated total distance and duration
-                                            new_segment.distance = segment_distance
-                                            new_segment.duration = round(segment_distance / wheelchair_speed_mps)  # Duration in seconds
-                                            new_segment.number_of_point = len(segment_data_list)+1
-                                            new_segment.save()
-                                            print(f"Total distance for segment {segment_number}: {segment_distance:.2f} meters")
+                                    if new_segments:
+                                        ordered = sorted(new_segments, key=lambda item: item.segment_number)
+                                        first, last = ordered[0].geometry.coords[0], ordered[-1].geometry.coords[-1]
+                                        new_route.start_point = Point(first[0], first[1], srid=4326)
+                                        new_route.end_point = Point(last[0], last[1], srid=4326)
 
                                     new_route.number_of_segments = len(mapSegment)
                                     new_route.save()
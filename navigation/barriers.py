@@ -0,0 +1,232 @@
+# navigation/barriers.py
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError
+
+from navigation import geohash
+from navigation.changelog import Changelog
+from navigation.routing.graph import haversine, segment_distance
+
+logger = logging.getLogger(__name__)
+
+# Cost multiplier applied to routing-graph edges near an active barrier; inf avoids the edge
+BARRIER_PENALTIES = {
+    'Stairs': math.inf,
+    'Construction': math.inf,
+    'No Curb Ramp': math.inf,
+    'Steep Slope': 8.0,
+    'Snow Pile': 8.0,
+    'SideWalk': 5.0,
+    'Tree': 3.0,
+}
+DEFAULT_PENALTY = 5.0
+
+
+class BarrierOverlay:
+    """
+    In-memory spatial index of the active (detected) barrier markers, bucketed by geohash cell.
+
+    The index is loaded from the database once per process and then kept current
+    incrementally: marker signals apply changes locally and append them to a versioned
+    changelog in the shared Django cache, which other workers replay at most every
+    `refresh_interval` seconds. A worker that falls behind the changelog reloads from the
+    database. Route requests only ever read memory (and the changelog version).
+    """
+
+    def __init__(self, precision=7, penalty_radius=15, annotation_radius=30, refresh_interval=5, changelog_ttl=86400):
+        self.precision = precision
+        self.penalty_radius = penalty_radius
+        self.annotation_radius = annotation_radius
+        self.refresh_interval = refresh_interval
+        self.changelog = Changelog('barrier-overlay', changelog_ttl)
+
+        self._markers = {}  # id -> (lat, lng, marker_type)
+        self._cells = {}  # geohash cell -> set of marker ids
+        self._version = None  # changelog version the index reflects; None until loaded
+        self._checked_at = 0.0
+        self._penalties = {}  # graph id -> (revision, {edge: multiplier})
+        self._revision = 0  # bumped on every local change
+        self._lock = threading.RLock()
+
+    # Index maintenance --------------------------------------------------------------
+
+    def _add(self, marker_id, lat, lng, marker_type):
+        self._remove(marker_id)
+        self._markers[marker_id] = (lat, lng, marker_type)
+        self._cells.setdefault(geohash.encode(lat, lng, self.precision), set()).add(marker_id)
+        self._revision += 1
+
+    def _remove(self, marker_id):
+        marker = self._markers.pop(marker_id, None)
+        if marker is None:
+            return
+        cell = geohash.encode(marker[0], marker[1], self.precision)
+        self._cells[cell].discard(marker_id)
+        if not self._cells[cell]:
+            del self._cells[cell]
+        self._revision += 1
+
+    def _apply(self, change):
+        if change[0] == 'add':
+            self._add(*change[1:])
+        else:
+            self._remove(change[1])
+
+    def load(self):
+        """(Re)build the index from the database."""
+        from navigation.models import TransitMarker
+
+        version = self.changelog.version()
+        markers = TransitMarker.objects.filter(
+            marker_category='Barrier', status='detected', location__isnull=False
+        ).values_list('id', 'location', 'marker_type')
+
+        with self._lock:
+            self._markers, self._cells = {}, {}
+            for marker_id, location, marker_type in markers:
+                self._add(str(marker_id), location.y, location.x, marker_type)
+            self._version = version
+            self._checked_at = time.monotonic()
+        logger.info("Loaded %d active barriers into the overlay", len(self._markers))
+
+    def _reload(self):
+        try:
+            self.load()
+        except DatabaseError as e:
+            logger.error("Could not load the barrier overlay: %s", e)
+
+    def sync(self):
+        """Catch up with changes published by other workers; throttled to `refresh_interval`."""
+        if self._version is None:
+            with self._lock:
+                if self._version is None:
+                    self._reload()
+            return
+
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_interval:
+            return
+
+        with self._lock:
+            self._checked_at = now
+            latest = self.changelog.version()
+            if latest == self._version:
+                return
+
+            changes = self.changelog.changes(self._version, latest)
+            if changes is None:
+                self._reload()
+                return
+            for change in changes:
+                self._apply(change)
+            self._version = latest
+
+    def publish(self, change):
+        """Apply a change locally and append it to the shared changelog."""
+        with self._lock:
+            if self._version is not None:
+                self._apply(change)
+        self.changelog.append(change)
+
+    def marker_changed(self, marker):
+        """Record the current state of a TransitMarker (called from model signals)."""
+        if marker.marker_category == 'Barrier' and marker.status == 'detected' and marker.location:
+            self.publish(('add', str(marker.id), marker.location.y, marker.location.x, marker.marker_type))
+        else:
+            self.publish(('remove', str(marker.id)))
+
+    def marker_deleted(self, marker):
+        self.publish(('remove', str(marker.id)))
+
+    # Queries ------------------------------------------------------------------------
+
+    def _candidates(self, cells, distance):
+        # Markers in the cells within `distance` meters of any point of `cells`
+        ids = set()
+        for cell in cells:
+            for neighbor in geohash.neighbors(cell, geohash.rings_covering(cell, distance)):
+                ids.update(self._cells.get(neighbor, ()))
+        return [(marker_id, *self._markers[marker_id]) for marker_id in ids]
+
+    def _path_cells(self, lat, lng, step):
+        """
+        Cells of points sampled along a polyline at most `step` meters apart, so long edges
+        between distant vertices don't skip the cells they cross.
+        """
+        cells = {geohash.encode(lat[0], lng[0], self.precision)}
+        if len(lat) > 1:
+            legs = haversine(lat[:-1], lng[:-1], lat[1:], lng[1:])
+            for index, steps in enumerate(np.maximum(np.ceil(legs / step), 1).astype(int).tolist()):
+                fractions = np.arange(1, steps + 1) / steps
+                sample_lat = lat[index] + (lat[index + 1] - lat[index]) * fractions
+                sample_lng = lng[index] + (lng[index + 1] - lng[index]) * fractions
+                cells.update(geohash.encode(a, b, self.precision) for a, b in zip(sample_lat.tolist(), sample_lng.tolist()))
+        return cells
+
+    def edge_penalties(self, graph):
+        """
+        Return {edge: multiplier} for the routing-graph edges near active barriers, to be
+        passed to RoutingEngine.route. Recomputed only when the overlay changes.
+        """
+        self.sync()
+        with self._lock:
+            revision, penalties = self._penalties.get(id(graph), (None, None))
+            if revision == self._revision:
+                return penalties
+
+            penalties = {}
+            for lat, lng, marker_type in self._markers.values():
+                multiplier = BARRIER_PENALTIES.get(marker_type, DEFAULT_PENALTY)
+                for edge in graph.edges_near(lat, lng, self.penalty_radius):
+                    penalties[edge] = max(penalties.get(edge, 1.0), multiplier)
+            self._penalties[id(graph)] = (self._revision, penalties)
+            return penalties
+
+    def annotate_segments(self, response_data):
+        """
+        Add a `barriers` list to every route segment with the active barriers within
+        `annotation_radius` meters of its geometry, nearest first.
+        """
+        self.sync()
+        for segment in response_data.get("segments", []):
+            points = segment.get("points") or []
+            segment["barriers"] = []
+            if not points:
+                continue
+
+            lat = np.array([point["latitude"] for point in points], dtype=np.float64)
+            lng = np.array([point["longitude"] for point in points], dtype=np.float64)
+            # Every point of the segment is within step / 2 of a sample
+            step = max(self.annotation_radius, 10.0)
+            cells = self._path_cells(lat, lng, step)
+            with self._lock:
+                candidates = self._candidates(cells, self.annotation_radius + step / 2)
+
+            for marker_id, marker_lat, marker_lng, marker_type in candidates:
+                if len(points) > 1:
+                    distance = float(segment_distance(marker_lat, marker_lng, lat[:-1], lng[:-1], lat[1:], lng[1:]).min())
+                else:
+                    distance = float(haversine(marker_lat, marker_lng, lat[0], lng[0]))
+                if distance <= self.annotation_radius:
+                    segment["barriers"].append({
+                        "id": marker_id,
+                        "marker_type": marker_type,
+                        "latitude": marker_lat,
+                        "longitude": marker_lng,
+                        "distance": round(distance, 1),
+                    })
+            segment["barriers"].sort(key=lambda barrier: barrier["distance"])
+        return response_data
+
+
+barrier_overlay = BarrierOverlay(
+    precision=settings.BARRIER_OVERLAY_PRECISION,
+    penalty_radius=settings.BARRIER_PENALTY_RADIUS,
+    annotation_radius=settings.BARRIER_ANNOTATION_RADIUS,
+    refresh_interval=settings.BARRIER_OVERLAY_REFRESH,
+)
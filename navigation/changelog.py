@@ -0,0 +1,53 @@
+# navigation/changelog.py
+from django.core.cache import cache
+
+
+class Changelog:
+    """
+    Versioned log of changes to an in-process index, shared between workers through the
+    Django cache.
+
+    Each change is stored under its own version number with a TTL; a worker remembers the
+    version its index reflects and replays the changes after it. When an entry is missing
+    (expired or evicted) or the version went backwards (cache flushed), the worker has to
+    rebuild its index from the source of truth instead.
+    """
+
+    def __init__(self, name, ttl=86400):
+        self.name = name
+        self.ttl = ttl
+
+    @property
+    def version_key(self):
+        return f'{self.name}:version'
+
+    def change_key(self, version):
+        return f'{self.name}:change:{version}'
+
+    def version(self):
+        return cache.get(self.version_key, 0)
+
+    def changes(self, since, until):
+        """
+        Return the changes after version `since` up to `until`, oldest first, or None when
+        they can no longer be replayed.
+        """
+        if until < since:
+            return None
+        versions = range(since + 1, until + 1)
+        stored = cache.get_many([self.change_key(version) for version in versions])
+        if len(stored) != len(versions):
+            return None
+        return [stored[self.change_key(version)] for version in versions]
+
+    def append(self, change):
+        """Append a change; returns its version, or None if it could not be recorded."""
+        cache.add(self.version_key, 0, None)
+        try:
+            version = cache.incr(self.version_key)
+        except ValueError:
+            # Evicted between add() and incr(); other workers will notice and reload
+            cache.set(self.version_key, 0, None)
+            return None
+        cache.set(self.change_key(version), change, self.ttl)
+        return version
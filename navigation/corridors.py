@@ -0,0 +1,209 @@
+# navigation/corridors.py
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.utils import timezone
+
+from navigation import geohash
+from navigation.changelog import Changelog
+from navigation.routing.graph import EARTH_RADIUS, haversine, segment_distance
+
+logger = logging.getLogger(__name__)
+
+
+def route_key(transit_id):
+    return f'transit-route:{transit_id}'
+
+
+def route_geometry(response_data):
+    """Return the [(lat, lng, segment number), ...] polyline of a formatted route response."""
+    return [
+        (float(point["latitude"]), float(point["longitude"]), segment.get("segment_number"))
+        for segment in response_data.get("segments", [])
+        for point in segment.get("points") or []
+    ]
+
+
+class CorridorIndex:
+    """
+    In-memory spatial index of the route corridors of in-progress transits.
+
+    A corridor is the area within `width` meters of the route a transit was given. Its
+    geometry is cached per transit when the route is served; once the transit starts, the
+    geohash cells the corridor covers are indexed, so a new marker is matched against the
+    few transits indexed in its cell instead of querying every active transit.
+
+    Like the barrier overlay, each worker keeps its own index current by replaying a
+    changelog of started and finished transits from the shared Django cache, and reloads
+    from the database when it falls behind.
+    """
+
+    def __init__(self, precision=7, width=50, route_ttl=21600, refresh_interval=5):
+        self.precision = precision
+        self.width = width
+        self.route_ttl = route_ttl
+        self.refresh_interval = refresh_interval
+        self.changelog = Changelog('transit-corridors', route_ttl)
+
+        self._transits = {}  # transit id -> (lat array, lng array, cells)
+        self._cells = {}  # geohash cell -> set of transit ids
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+
+    # Index maintenance --------------------------------------------------------------
+
+    def _corridor_cells(self, points):
+        # Walk each leg in steps shorter than the corridor width so long straight legs don't
+        # skip cells; the neighbour lookup in transits_near covers the width on either side
+        cells = set()
+        for (lat1, lng1, _), (lat2, lng2, _) in zip(points, points[1:] or points):
+            leg = math.hypot(
+                math.radians(lat2 - lat1),
+                math.radians(lng2 - lng1) * math.cos(math.radians(lat1)),
+            ) * EARTH_RADIUS
+            steps = max(int(leg / self.width), 1)
+            for step in range(steps + 1):
+                fraction = step / steps
+                cells.add(geohash.encode(lat1 + (lat2 - lat1) * fraction, lng1 + (lng2 - lng1) * fraction, self.precision))
+        return cells
+
+    def _add(self, transit_id, points):
+        self._remove(transit_id)
+        if not points:
+            return
+        cells = self._corridor_cells(points)
+        lat = np.array([point[0] for point in points], dtype=np.float64)
+        lng = np.array([point[1] for point in points], dtype=np.float64)
+        self._transits[transit_id] = (lat, lng, cells)
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(transit_id)
+
+    def _remove(self, transit_id):
+        transit = self._transits.pop(transit_id, None)
+        if transit is None:
+            return
+        for cell in transit[2]:
+            self._cells[cell].discard(transit_id)
+            if not self._cells[cell]:
+                del self._cells[cell]
+
+    def _apply(self, change):
+        if change[0] == 'add':
+            self._add(*change[1:])
+        else:
+            self._remove(change[1])
+
+    def load(self):
+        """(Re)build the index from the in-progress transits and their cached routes."""
+        from navigation.models import Transit
+
+        version = self.changelog.version()
+        transit_ids = [
+            str(transit_id) for transit_id in Transit.objects.filter(
+                status='in_progress',
+                start_at__gte=timezone.now() - timedelta(seconds=self.route_ttl),
+            ).values_list('id', flat=True)
+        ]
+        routes = cache.get_many([route_key(transit_id) for transit_id in transit_ids])
+
+        with self._lock:
+            self._transits, self._cells = {}, {}
+            for transit_id in transit_ids:
+                points = routes.get(route_key(transit_id))
+                if points:
+                    self._add(transit_id, points)
+            self._version = version
+            self._checked_at = time.monotonic()
+        logger.info("Loaded %d active transit corridors", len(self._transits))
+
+    def _reload(self):
+        try:
+            self.load()
+        except DatabaseError as e:
+            logger.error("Could not load the transit corridors: %s", e)
+
+    def sync(self):
+        """Catch up with transits started or finished on other workers; throttled to `refresh_interval`."""
+        if self._version is None:
+            with self._lock:
+                if self._version is None:
+                    self._reload()
+            return
+
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_interval:
+            return
+
+        with self._lock:
+            self._checked_at = now
+            latest = self.changelog.version()
+            if latest == self._version:
+                return
+
+            changes = self.changelog.changes(self._version, latest)
+            if changes is None:
+                self._reload()
+                return
+            for change in changes:
+                self._apply(change)
+            self._version = latest
+
+    def publish(self, change):
+        with self._lock:
+            if self._version is not None:
+                self._apply(change)
+        self.changelog.append(change)
+
+    def remember_route(self, transit_id, response_data):
+        """Cache the geometry of the route served for a transit, for when it starts."""
+        points = route_geometry(response_data)
+        if points:
+            cache.set(route_key(transit_id), points, self.route_ttl)
+
+    def transit_started(self, transit_id):
+        points = cache.get(route_key(transit_id))
+        if points:
+            self.publish(('add', str(transit_id), points))
+
+    def transit_finished(self, transit_id):
+        self.publish(('remove', str(transit_id)))
+
+    # Queries ------------------------------------------------------------------------
+
+    def transits_near(self, lat, lng):
+        """
+        Return [(transit id, distance in meters)] for the in-progress transits whose corridor
+        contains (lat, lng).
+        """
+        self.sync()
+        with self._lock:
+            candidates = set()
+            for cell in geohash.neighbors(geohash.encode(lat, lng, self.precision)):
+                candidates.update(self._cells.get(cell, ()))
+            geometries = [(transit_id, *self._transits[transit_id][:2]) for transit_id in candidates]
+
+        matches = []
+        for transit_id, route_lat, route_lng in geometries:
+            if len(route_lat) > 1:
+                distance = float(segment_distance(lat, lng, route_lat[:-1], route_lng[:-1], route_lat[1:], route_lng[1:]).min())
+            else:
+                distance = float(haversine(lat, lng, route_lat[0], route_lng[0]))
+            if distance <= self.width:
+                matches.append((transit_id, distance))
+        return matches
+
+
+transit_corridors = CorridorIndex(
+    precision=settings.TRANSIT_CORRIDOR_PRECISION,
+    width=settings.TRANSIT_CORRIDOR_WIDTH,
+    route_ttl=settings.TRANSIT_ROUTE_TTL,
+    refresh_interval=settings.BARRIER_OVERLAY_REFRESH,
+)
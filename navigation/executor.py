@@ -0,0 +1,28 @@
+# navigation/executor.py
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+# Shared, bounded pool for the blocking lookups RouteAPI runs side by side
+route_executor = ThreadPoolExecutor(
+    max_workers=settings.ROUTE_EXECUTOR_WORKERS,
+    thread_name_prefix='route-worker',
+)
+
+
+def submit(fn, *args, **kwargs):
+    """
+    Run `fn` on the shared route pool and return its Future.
+
+    Pool threads live outside the request cycle, so database connections are
+    released around each task the same way Django does around each request.
+    """
+    def run():
+        close_old_connections()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return route_executor.submit(run)
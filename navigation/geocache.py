@@ -0,0 +1,119 @@
+# navigation/geocache.py
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from navigation import geohash
+
+# Stored in place of a value when a lookup is known to produce nothing
+NEGATIVE = '__negative__'
+
+
+class GeoCellCache:
+    """
+    Two-tier cache keyed by a snapped coordinate cell (geohash).
+
+    The first tier is a small in-process LRU, the second is the shared Django cache.
+    Empty results can be cached as well (negative caching) with their own, shorter TTL.
+    """
+
+    def __init__(self, namespace, precision=8, ttl=86400, negative_ttl=300, max_entries=2048):
+        self.namespace = namespace
+        self.precision = precision
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'negative_hits': 0, 'misses': 0}
+
+    def cell(self, lat, lng):
+        return geohash.encode(lat, lng, self.precision)
+
+    def _key(self, cell):
+        return f"{self.namespace}:{self.precision}:{cell}"
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _remember(self, cell, value, ttl):
+        with self._lock:
+            self._entries[cell] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(cell)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, lat, lng):
+        """
+        Look up the value cached for the cell containing (lat, lng).
+
+        Returns:
+            tuple: (hit, value). A negative hit returns (True, None); a miss returns (False, None).
+        """
+        cell = self.cell(lat, lng)
+
+        with self._lock:
+            entry = self._entries.get(cell)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(cell)
+            else:
+                if entry:
+                    del self._entries[cell]
+                entry = None
+
+        if entry:
+            value = entry[1]
+            self._count('negative_hits' if value == NEGATIVE else 'local_hits')
+            return True, None if value == NEGATIVE else value
+
+        value = cache.get(self._key(cell))
+        if value is None:
+            self._count('misses')
+            return False, None
+
+        negative = value == NEGATIVE
+        self._remember(cell, value, self.negative_ttl if negative else self.ttl)
+        self._count('negative_hits' if negative else 'shared_hits')
+        return True, None if negative else value
+
+    def set(self, lat, lng, value):
+        """
+        Cache a value for the cell containing (lat, lng). A value of None is cached as a negative result.
+        """
+        cell = self.cell(lat, lng)
+        if value is None:
+            value, ttl = NEGATIVE, self.negative_ttl
+        else:
+            ttl = self.ttl
+
+        cache.set(self._key(cell), value, ttl)
+        self._remember(cell, value, ttl)
+
+    def delete(self, lat, lng):
+        cell = self.cell(lat, lng)
+        cache.delete(self._key(cell))
+        with self._lock:
+            self._entries.pop(cell, None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['local_entries'] = len(self._entries)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['negative_hits'] + stats['misses']
+        stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# Resolved Place ids keyed by the cell the request coordinates fall in
+place_cache = GeoCellCache(
+    'geocode-place',
+    precision=settings.GEOCODE_CACHE_PRECISION,
+    ttl=settings.GEOCODE_CACHE_TTL,
+    negative_ttl=settings.GEOCODE_CACHE_NEGATIVE_TTL,
+    max_entries=settings.GEOCODE_CACHE_LOCAL_SIZE,
+)
@@ -0,0 +1,105 @@
+# navigation/geohash.py
+import math
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_DECODE_MAP = {char: index for index, char in enumerate(_BASE32)}
+
+
+def encode(lat, lng, precision=8):
+    """
+    Encode a coordinate into a geohash cell id.
+
+    Parameters:
+        lat (float): Latitude in degrees.
+        lng (float): Longitude in degrees.
+        precision (int): Number of base32 characters. 8 gives a ~38m x 19m cell.
+
+    Returns:
+        str: The geohash of the cell containing the coordinate.
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    lat, lng = float(lat), float(lng)
+
+    cell = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(cell) < precision:
+        value, interval = (lng, lng_range) if even else (lat, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            interval[0] = mid
+        else:
+            bits <<= 1
+            interval[1] = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            cell.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(cell)
+
+
+def bounds(cell):
+    """
+    Return the bounding box of a geohash cell as (min_lat, min_lng, max_lat, max_lng).
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in cell:
+        bits = _DECODE_MAP[char]
+        for shift in range(4, -1, -1):
+            interval = lng_range if even else lat_range
+            mid = (interval[0] + interval[1]) / 2
+            if (bits >> shift) & 1:
+                interval[0] = mid
+            else:
+                interval[1] = mid
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def decode(cell):
+    """
+    Return the (lat, lng) centre of a geohash cell.
+    """
+    min_lat, min_lng, max_lat, max_lng = bounds(cell)
+    return (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+
+
+def neighbors(cell, rings=1):
+    """
+    Return the cell itself and the `rings` rings of cells around it at the same precision
+    (the eight surrounding cells for one ring).
+    """
+    min_lat, min_lng, max_lat, max_lng = bounds(cell)
+    lat, lng = (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+    lat_step, lng_step = max_lat - min_lat, max_lng - min_lng
+
+    cells = []
+    for d_lat in range(-rings, rings + 1):
+        for d_lng in range(-rings, rings + 1):
+            n_lat = max(-90.0, min(90.0, lat + d_lat * lat_step))
+            n_lng = (lng + d_lng * lng_step + 180.0) % 360.0 - 180.0
+            neighbor = encode(n_lat, n_lng, len(cell))
+            if neighbor not in cells:
+                cells.append(neighbor)
+    return cells
+
+
+def rings_covering(cell, distance):
+    """
+    Return how many rings of neighbours around `cell` are needed to reach every point within
+    `distance` meters of any point inside it. Cells narrow towards the poles (their width is
+    proportional to the cosine of the latitude), so this grows with the latitude.
+    """
+    min_lat, min_lng, max_lat, max_lng = bounds(cell)
+    height = (max_lat - min_lat) * 111320
+    width = (max_lng - min_lng) * 111320 * max(math.cos(math.radians(max(abs(min_lat), abs(max_lat)))), 1e-6)
+    return max(math.ceil(distance / min(height, width)), 1)
@@ -0,0 +1,95 @@
+# navigation/management/commands/benchmark_marker_search.py
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from navigation.markers import nearest_markers_sql
+
+TABLE = 'benchmark_transit_marker'
+
+# What MarkerSearchAPI ran before: location__distance_lte plus a Distance annotation on a
+# geodetic geometry column, i.e. a spherical distance computed for every active row
+LEGACY_SQL = f"""
+    SELECT m.*, ST_DistanceSphere(m.location, ref.point) AS distance
+    FROM {TABLE} m,
+         (SELECT ST_SetSRID(ST_MakePoint(%s, %s), 4326) AS point) ref
+    WHERE m.status = 'detected'
+      AND ST_DistanceSphere(m.location, ref.point) <= %s
+    ORDER BY distance
+    LIMIT %s
+"""
+
+
+class Command(BaseCommand):
+    help = "Benchmark the nearest-marker search against the previous unindexed query on a synthetic marker table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--radius', type=float, default=100.0, help="Search radius in meters.")
+        parser.add_argument('--limit', type=int, default=10, help="Markers returned per query.")
+        parser.add_argument('--lat', type=float, default=40.7128)
+        parser.add_argument('--lng', type=float, default=-74.0060)
+        parser.add_argument('--span', type=float, default=0.3, help="Width of the synthetic area in degrees.")
+        parser.add_argument('--explain', action='store_true', help="Print the query plan of the indexed search.")
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            try:
+                self.create_table(cursor, options)
+                rng = random.Random(42)
+                points = [
+                    (options['lng'] + (rng.random() - 0.5) * options['span'],
+                     options['lat'] + (rng.random() - 0.5) * options['span'])
+                    for _ in range(options['queries'])
+                ]
+
+                indexed_sql = nearest_markers_sql(TABLE)
+                if options['explain']:
+                    lng, lat = points[0]
+                    cursor.execute("EXPLAIN ANALYZE " + indexed_sql, [lng, lat, options['radius'], options['limit']])
+                    self.stdout.write("\n".join(row[0] for row in cursor.fetchall()))
+
+                for name, sql in (("previous (ST_DistanceSphere)", LEGACY_SQL), ("indexed (geography KNN)", indexed_sql)):
+                    timings, found = [], 0
+                    for lng, lat in points:
+                        started = time.perf_counter()
+                        cursor.execute(sql, [lng, lat, options['radius'], options['limit']])
+                        found += len(cursor.fetchall())
+                        timings.append((time.perf_counter() - started) * 1000)
+
+                    timings.sort()
+                    self.stdout.write(
+                        f"{name}: avg {sum(timings) / len(timings):.2f} ms, "
+                        f"p95 {timings[min(len(timings) - 1, int(len(timings) * 0.95))]:.2f} ms, "
+                        f"{found / len(points):.1f} markers/query"
+                    )
+            finally:
+                cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    def create_table(self, cursor, options):
+        started = time.monotonic()
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cursor.execute(f"""
+            CREATE TEMP TABLE {TABLE} (
+                id bigserial PRIMARY KEY,
+                marker_category varchar(50) NOT NULL,
+                status varchar(20) NOT NULL,
+                location geometry(Point, 4326)
+            )
+        """)
+        cursor.execute(f"""
+            INSERT INTO {TABLE} (marker_category, status, location)
+            SELECT CASE WHEN random() < 0.5 THEN 'Barrier' ELSE 'Facility' END,
+                   CASE WHEN random() < 0.8 THEN 'detected' ELSE 'resolved' END,
+                   ST_SetSRID(ST_MakePoint(%s + (random() - 0.5) * %s, %s + (random() - 0.5) * %s), 4326)
+            FROM generate_series(1, %s)
+        """, [options['lng'], options['span'], options['lat'], options['span'], options['rows']])
+
+        # Same indexes as the real table: Django's geometry index and the partial geography index
+        cursor.execute(f"CREATE INDEX ON {TABLE} USING GIST (location)")
+        cursor.execute(f"CREATE INDEX ON {TABLE} USING GIST ((location::geography)) WHERE status = 'detected'")
+        cursor.execute(f"ANALYZE {TABLE}")
+        self.stdout.write(f"Created {options['rows']} synthetic markers in {time.monotonic() - started:.1f}s")
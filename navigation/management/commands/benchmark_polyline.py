@@ -0,0 +1,64 @@
+# navigation/management/commands/benchmark_polyline.py
+import json
+import timeit
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from navigation import polyline
+from navigation.views import RouteAPI
+
+
+class Command(BaseCommand):
+    help = "Compare the batched NumPy polyline decoder against RouteAPI.decode_polyline on multi-kilometre routes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--route-file', action='append', default=[],
+            help="Google Directions API response (JSON) to benchmark; may be given several times.",
+        )
+        parser.add_argument('--length-km', type=float, default=10.0,
+                            help="Length of the synthetic route used when no route file is given.")
+        parser.add_argument('--step-points', type=int, default=40,
+                            help="Points per step polyline in the synthetic route.")
+        parser.add_argument('--iterations', type=int, default=50)
+
+    def load_steps(self, path):
+        try:
+            with open(path) as route_file:
+                data = json.load(route_file)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read {path}: {e}")
+
+        route = data["routes"][0] if "routes" in data else data
+        return [step["polyline"]["points"] for leg in route["legs"] for step in leg["steps"]]
+
+    def synthetic_steps(self, length_km, step_points):
+        # Wheelchair-scale walk: ~5 m between points with gentle turns
+        rng = np.random.default_rng(42)
+        count = max(2, int(length_km * 1000 / 5))
+        headings = np.cumsum(rng.normal(0, 0.05, count))
+        steps_m = np.column_stack((np.cos(headings), np.sin(headings))) * 5
+        coordinates = np.array([40.7128, -74.0060]) + np.cumsum(steps_m / 111_320, axis=0)
+        return [polyline.encode(coordinates[i:i + step_points])
+                for i in range(0, count, step_points)]
+
+    def handle(self, *args, **options):
+        routes = {path: self.load_steps(path) for path in options['route_file']}
+        if not routes:
+            name = f"synthetic {options['length_km']} km"
+            routes[name] = self.synthetic_steps(options['length_km'], options['step_points'])
+
+        iterations = options['iterations']
+        for name, steps in routes.items():
+            points = sum(len(points) for points in polyline.decode_many(steps))
+
+            legacy = timeit.timeit(lambda: [RouteAPI.decode_polyline(None, step) for step in steps], number=iterations)
+            batched = timeit.timeit(lambda: polyline.decode_many(steps), number=iterations)
+
+            self.stdout.write(
+                f"{name}: {len(steps)} steps, {points} points\n"
+                f"  RouteAPI.decode_polyline: {legacy / iterations * 1000:.3f} ms/route\n"
+                f"  polyline.decode_many:     {batched / iterations * 1000:.3f} ms/route\n"
+                f"  speed-up: {legacy / batched:.1f}x"
+            )
@@ -0,0 +1,37 @@
+# navigation/management/commands/build_contraction_hierarchy.py
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from navigation.routing.ch import ContractionHierarchy
+from navigation.routing.engine import PROFILES
+from navigation.routing.graph import RoutingGraph
+
+
+class Command(BaseCommand):
+    help = "Precompute contraction hierarchies over the routing graph, one per wheelchair profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument('graph', help="Routing graph (.npz) written by build_routing_graph.")
+        parser.add_argument('output', help="Directory to write the hierarchies to; point ROUTING_CH_PATH at it.")
+        parser.add_argument('--profile', action='append', choices=sorted(PROFILES), default=[],
+                            help="Profile to build; may be given several times. Defaults to all profiles.")
+
+    def handle(self, *args, **options):
+        try:
+            graph = RoutingGraph.load(options['graph'])
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Could not read {options['graph']}: {e}")
+
+        for profile in options['profile'] or sorted(PROFILES):
+            started = time.monotonic()
+            hierarchy = ContractionHierarchy.build(graph, profile)
+            directory = os.path.join(options['output'], profile)
+            hierarchy.save(directory)
+
+            shortcuts = int((hierarchy.edge_original < 0).sum())
+            self.stdout.write(self.style.SUCCESS(
+                f"{profile}: contracted {graph.node_count} nodes, added {shortcuts} shortcuts "
+                f"in {time.monotonic() - started:.1f}s -> {directory}"
+            ))
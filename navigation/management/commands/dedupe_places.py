@@ -0,0 +1,78 @@
+# navigation/management/commands/dedupe_places.py
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+from django.db.models import Case, Value, When
+
+from geo.models import PLACE_CELL_PRECISION, Place
+from navigation.models import Route, Transit
+
+# Places sharing a geohash cell, the one already holding the cell id (or else the oldest id) first
+DUPLICATE_CELLS_SQL = """
+    SELECT ST_GeoHash(location, %s) AS cell,
+           array_agg(id ORDER BY cell_id IS NULL, id) AS place_ids
+    FROM {table}
+    WHERE location IS NOT NULL
+    GROUP BY 1
+    HAVING count(*) > 1 OR bool_and(cell_id IS NULL)
+"""
+
+PLACE_FOREIGN_KEYS = (
+    (Route, 'origin'),
+    (Route, 'destination'),
+    (Transit, 'origin'),
+    (Transit, 'destination'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge places that share a geohash cell into one, repointing the routes and transits "
+        "of the duplicates, and give every place its cell id."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Cells merged per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Report the duplicates without changing anything.")
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            cursor.execute(DUPLICATE_CELLS_SQL.format(table=Place._meta.db_table), [PLACE_CELL_PRECISION])
+            cells = cursor.fetchall()
+
+        duplicates = sum(len(place_ids) - 1 for _, place_ids in cells)
+        self.stdout.write(f"{len(cells)} cells to fix, {duplicates} duplicate places")
+        if options['dry_run'] or not cells:
+            return
+
+        repointed = 0
+        for start in range(0, len(cells), options['batch_size']):
+            with transaction.atomic():
+                repointed += self.merge(cells[start:start + options['batch_size']])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Merged {duplicates} duplicate places into {len(cells)} cells, repointing {repointed} rows"
+        ))
+
+    def merge(self, cells):
+        """Merge one batch of [(cell, [canonical id, duplicate ids...])]; returns the rows repointed."""
+        canonical = {
+            duplicate_id: place_ids[0]
+            for _, place_ids in cells
+            for duplicate_id in place_ids[1:]
+        }
+
+        repointed = 0
+        if canonical:
+            for model, field in PLACE_FOREIGN_KEYS:
+                repointed += model.objects.filter(**{f'{field}__in': canonical}).update(**{field: Case(
+                    *[When(**{field: duplicate_id}, then=Value(place_id)) for duplicate_id, place_id in canonical.items()],
+                    output_field=models.UUIDField(),
+                )})
+            Place.objects.filter(id__in=canonical).delete()
+
+        # Only after the duplicates are gone, since one of them may hold the cell id
+        Place.objects.filter(id__in=[place_ids[0] for _, place_ids in cells]).update(cell_id=Case(
+            *[When(id=place_ids[0], then=Value(cell)) for cell, place_ids in cells],
+            output_field=models.CharField(),
+        ))
+        return repointed
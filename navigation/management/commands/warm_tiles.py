@@ -0,0 +1,55 @@
+# navigation/management/commands/warm_tiles.py
+import math
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from geo.models import City
+from navigation.tiles import MVT_LAYERS, tiles_covering, vector_tiles
+
+
+class Command(BaseCommand):
+    help = "Pre-render the vector tiles around the cities with the most recent transits."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help="Look-back window for city activity.")
+        parser.add_argument('--cities', type=int, default=10, help="Number of most active cities to warm.")
+        parser.add_argument('--radius-km', type=float, default=3.0, help="Area around each city centre.")
+        parser.add_argument('--min-zoom', type=int, default=12)
+        parser.add_argument('--max-zoom', type=int, default=16)
+        parser.add_argument('--layer', action='append', choices=sorted(MVT_LAYERS), default=[],
+                            help="Layer to warm; may be given several times. Defaults to all layers.")
+
+    def handle(self, *args, **options):
+        if options['min_zoom'] > options['max_zoom']:
+            raise CommandError("--min-zoom must not exceed --max-zoom.")
+
+        since = timezone.now() - timedelta(days=options['days'])
+        cities = City.objects.filter(location__isnull=False).annotate(
+            transits=Count('city_places__origin_transits', filter=Q(city_places__origin_transits__created_at__gte=since))
+        ).filter(transits__gt=0).order_by('-transits')[:options['cities']]
+
+        layers = options['layer'] or sorted(MVT_LAYERS)
+        started = time.monotonic()
+        rendered = 0
+        for city in cities:
+            lat, lng = city.location.y, city.location.x
+            d_lat = options['radius_km'] / 111.32
+            d_lng = d_lat / max(math.cos(math.radians(lat)), 0.01)
+            bbox = (lng - d_lng, lat - d_lat, lng + d_lng, lat + d_lat)
+
+            city_tiles = 0
+            for z in range(options['min_zoom'], options['max_zoom'] + 1):
+                for x, y in tiles_covering(*bbox, z):
+                    for layer in layers:
+                        vector_tiles.get(layer, z, x, y, vector_tiles.fields(layer))
+                        city_tiles += 1
+            rendered += city_tiles
+            self.stdout.write(f"{city.name}: {city_tiles} tiles ({city.transits} recent transits)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {rendered} tiles in {time.monotonic() - started:.1f}s"
+        ))
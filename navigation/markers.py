@@ -0,0 +1,340 @@
+# navigation/markers.py
+import base64
+import json
+import uuid
+from datetime import datetime, timedelta
+
+from django.contrib.gis.geos import Point, Polygon
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from navigation import geohash
+from navigation.models import Transit, TransitMarker, TransitMarkerRemoval, TransitMarkerTracking
+from navigation.routing.graph import haversine
+from navigation.signals import markers_changed
+
+# Nearest markers within a true meter radius. The geography casts match the partial GiST
+# index from migration 0002, so both the ST_DWithin filter and the KNN (<->) ordering are
+# answered from the index instead of computing a distance for every row.
+NEAREST_MARKERS_SQL = """
+    SELECT m.*, ST_Distance(m.location::geography, ref.point) AS distance
+    FROM {table} m,
+         (SELECT ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography AS point) ref
+    WHERE m.status = 'detected'
+      AND ST_DWithin(m.location::geography, ref.point, %s)
+      {filters}
+    ORDER BY m.location::geography <-> ref.point
+    LIMIT %s
+"""
+
+
+def nearest_markers_sql(table, categories=False):
+    filters = "AND m.marker_category = %s" if categories else ""
+    return NEAREST_MARKERS_SQL.format(table=table, filters=filters)
+
+
+def nearest_markers(lat, lng, radius, limit=1, category=None):
+    """
+    Find the detected markers closest to a coordinate.
+
+    Parameters:
+        lat (float): Latitude of the search point.
+        lng (float): Longitude of the search point.
+        radius (float): Search radius in meters.
+        limit (int): Maximum number of markers to return.
+        category (str): Optional marker_category ('Barrier' or 'Facility') to restrict to.
+
+    Returns:
+        list[TransitMarker]: Markers ordered nearest first, each with a `distance` attribute in meters.
+    """
+    params = [lng, lat, radius]
+    if category:
+        params.append(category)
+    params.append(limit)
+
+    sql = nearest_markers_sql(TransitMarker._meta.db_table, categories=bool(category))
+    return list(TransitMarker.objects.raw(sql, params))
+
+
+def nearest_marker(lat, lng, radius):
+    """Return the detected marker closest to (lat, lng) within `radius` meters, or None."""
+    markers = nearest_markers(lat, lng, radius, limit=1)
+    return markers[0] if markers else None
+
+
+def sync_markers(user, items):
+    """
+    Store a batch of markers reported offline, idempotently on client_id.
+
+    Markers and their tracking rows are written with bulk inserts in one transaction, and the
+    report flags of every affected transit are set with a single UPDATE. Markers whose
+    client_id is already stored (a retried batch) are reported as duplicates and left alone.
+
+    Parameters:
+        user (User): The reporting user.
+        items (list[dict]): Validated MarkerSyncItemSerializer data.
+
+    Returns:
+        list[dict]: {"client_id", "id", "status": "created" | "duplicate"} per item, in input order.
+    """
+    client_ids = [item['client_id'] for item in items]
+
+    with transaction.atomic():
+        stored = dict(TransitMarker.objects.filter(client_id__in=client_ids).values_list('client_id', 'id'))
+        new_markers = [
+            TransitMarker(
+                client_id=item['client_id'],
+                transit_id=item['transit_id'],
+                segment_number=item['segment_number'],
+                marker_category=item['marker_category'],
+                marker_type=item['marker_type'],
+                location=Point(item['marker_lng'], item['marker_lat'], srid=4326),
+                status='detected',
+            )
+            for item in items if item['client_id'] not in stored
+        ]
+
+        # A concurrent retry of the same batch may insert some of these first; keep its rows
+        TransitMarker.objects.bulk_create(new_markers, ignore_conflicts=True)
+        stored.update(TransitMarker.objects.filter(
+            client_id__in=[marker.client_id for marker in new_markers]
+        ).values_list('client_id', 'id'))
+        created = [marker for marker in new_markers if stored.get(marker.client_id) == marker.id]
+
+        TransitMarkerTracking.objects.bulk_create([
+            TransitMarkerTracking(transit_id=marker.transit_id, marker=marker, user=user, status='detected')
+            for marker in created
+        ])
+
+        barrier_transits = {marker.transit_id for marker in created if marker.marker_category == 'Barrier'}
+        facility_transits = {marker.transit_id for marker in created if marker.marker_category != 'Barrier'}
+        flags = {}
+        if barrier_transits:
+            flags['barrier_report'] = Case(When(id__in=barrier_transits, then=Value(True)), default=F('barrier_report'))
+        if facility_transits:
+            flags['facility_report'] = Case(When(id__in=facility_transits, then=Value(True)), default=F('facility_report'))
+        if flags:
+            Transit.objects.filter(id__in=barrier_transits | facility_transits).update(**flags)
+
+        # bulk_create skips the post_save signals; notify the overlay, route and tile caches once committed
+        transaction.on_commit(lambda: markers_changed(created, created=True))
+
+    created_ids = {marker.client_id for marker in created}
+    return [
+        {
+            "client_id": str(client_id),
+            "id": str(stored[client_id]),
+            "status": "created" if client_id in created_ids else "duplicate",
+        }
+        for client_id in client_ids
+    ]
+
+
+def merge_precision(distance):
+    """Finest geohash whose cells are at least `distance` meters across in both directions at the equator."""
+    return 8 if distance <= 19 else 7
+
+
+def merge_cells(lat, lng, distance):
+    """
+    Return (cell, search cells) for a marker: its merge-precision geohash cell, and the cells
+    holding every point within `distance` meters of it. Cells are narrower than `distance` at
+    high latitudes, where more than one ring of neighbours is needed.
+    """
+    cell = geohash.encode(lat, lng, merge_precision(distance))
+    return cell, geohash.neighbors(cell, geohash.rings_covering(cell, distance))
+
+
+def find_duplicates(markers, distance, window, since=None):
+    """
+    Group reports of the same obstacle: markers of the same type within `distance` meters and
+    `window` (a timedelta) of an earlier marker are duplicates of it.
+
+    Markers are bucketed by (marker_type, geohash cell), so each one is only compared with the
+    earlier canonical markers in the cells from merge_cells. A duplicate never becomes a
+    canonical itself, which keeps clusters from chaining along a street.
+
+    Parameters:
+        markers (iterable): (id, marker_type, lat, lng, created_at) tuples, oldest first.
+        distance (float): Merge distance in meters; at most 150.
+        window (timedelta): Maximum time between a canonical marker and its duplicates.
+        since (datetime): Markers created at or before this were already consolidated and
+            only serve as canonicals for the later ones.
+
+    Returns:
+        dict: {canonical id: [duplicate ids]} for every canonical marker that has duplicates.
+    """
+    canonicals = {}  # (marker_type, cell) -> [(id, lat, lng, created_at)]
+    duplicates = {}
+
+    for marker_id, marker_type, lat, lng, created_at in markers:
+        if since is not None and created_at <= since:
+            cell = geohash.encode(lat, lng, merge_precision(distance))
+            canonicals.setdefault((marker_type, cell), []).append((marker_id, lat, lng, created_at))
+            continue
+
+        cell, search_cells = merge_cells(lat, lng, distance)
+        best, best_distance = None, distance
+        for neighbor in search_cells:
+            for canonical_id, canonical_lat, canonical_lng, canonical_created in canonicals.get((marker_type, neighbor), ()):
+                if created_at - canonical_created > window:
+                    continue
+                gap = float(haversine(lat, lng, canonical_lat, canonical_lng))
+                if gap <= best_distance:
+                    best, best_distance = canonical_id, gap
+
+        if best is None:
+            canonicals.setdefault((marker_type, cell), []).append((marker_id, lat, lng, created_at))
+        else:
+            duplicates.setdefault(best, []).append(marker_id)
+
+    return duplicates
+
+
+def merge_duplicates(duplicates):
+    """
+    Merge each group of duplicate markers into its canonical marker: tracking rows are
+    repointed and confirmation counts added up with one UPDATE each, a 'merged' tombstone is
+    written for the change feed, then the duplicates are deleted (which notifies the marker
+    caches through post_delete).
+
+    Parameters:
+        duplicates (dict): {canonical id: [duplicate ids]} as returned by find_duplicates.
+
+    Returns:
+        int: Number of markers merged away.
+    """
+    if not duplicates:
+        return 0
+
+    canonical_of = {duplicate: canonical for canonical, group in duplicates.items() for duplicate in group}
+
+    with transaction.atomic():
+        rows = TransitMarker.objects.filter(
+            id__in=list(canonical_of) + list(duplicates)
+        ).values_list('id', 'confirmation_count', 'location')
+        counts, locations = {}, {}
+        for marker_id, confirmation_count, location in rows:
+            counts[marker_id], locations[marker_id] = confirmation_count, location
+        TransitMarkerTracking.objects.filter(marker_id__in=list(canonical_of)).update(
+            marker_id=Case(*[When(marker_id=duplicate, then=Value(canonical)) for duplicate, canonical in canonical_of.items()])
+        )
+        TransitMarker.objects.filter(id__in=list(duplicates)).update(
+            confirmation_count=Case(*[
+                When(id=canonical, then=Value(counts.get(canonical, 1) + sum(counts.get(duplicate, 1) for duplicate in group)))
+                for canonical, group in duplicates.items()
+            ])
+        )
+        TransitMarkerRemoval.objects.bulk_create([
+            TransitMarkerRemoval(marker_id=duplicate, merged_into=canonical, reason='merged', location=locations.get(duplicate))
+            for duplicate, canonical in canonical_of.items()
+        ], ignore_conflicts=True)
+        TransitMarker.objects.filter(id__in=list(canonical_of)).delete()
+
+        # Counts changed on the canonical markers; refresh the tiles showing them
+        canonicals = list(TransitMarker.objects.filter(id__in=list(duplicates)))
+        transaction.on_commit(lambda: markers_changed(canonicals))
+
+    return len(canonical_of)
+
+
+# Changes younger than this are held back from the feed, so a row committed late with an
+# earlier created_at can't land behind a cursor a client already holds
+CHANGE_FEED_LAG = timedelta(seconds=2)
+
+
+def encode_cursor(created_at, row_id):
+    payload = json.dumps({"t": created_at.isoformat(), "id": str(row_id)})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (created_at, id) position of a feed cursor. Raises ValueError if malformed."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return datetime.fromisoformat(payload["t"]), uuid.UUID(payload["id"])
+    except (TypeError, KeyError, UnicodeDecodeError, json.JSONDecodeError, base64.binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def marker_changes(after=None, since=None, bbox=None, limit=100):
+    """
+    Page through marker changes in the order they happened, using keyset pagination on
+    (created_at, id) across the tracking rows (reports, confirmations and resolutions) and
+    the removal tombstones.
+
+    A 'merged' or 'deleted' change means the marker is gone: clients must drop its id (a
+    merged marker's reports now count towards `merged_into`). Merged-away markers never
+    reappear in later changes.
+
+    Parameters:
+        after (tuple): (created_at, id) position from decode_cursor; changes after it are returned.
+        since (datetime): Start of the feed when no cursor is given.
+        bbox (tuple): Optional (west, south, east, north) restricting changes to markers inside it.
+        limit (int): Page size.
+
+    Returns:
+        tuple: (changes, next_cursor, has_more). next_cursor is the cursor to resume from, or
+        the incoming position when the page is empty.
+    """
+    cutoff = timezone.now() - CHANGE_FEED_LAG
+    tracking = TransitMarkerTracking.objects.select_related('marker').filter(created_at__lte=cutoff)
+    removals = TransitMarkerRemoval.objects.filter(created_at__lte=cutoff)
+    if after is not None:
+        created_at, row_id = after
+        position = Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=row_id)
+        tracking, removals = tracking.filter(position), removals.filter(position)
+    elif since is not None:
+        tracking, removals = tracking.filter(created_at__gte=since), removals.filter(created_at__gte=since)
+    if bbox is not None:
+        area = Polygon.from_bbox(bbox)
+        tracking, removals = tracking.filter(marker__location__bboverlaps=area), removals.filter(location__bboverlaps=area)
+
+    # Both streams are keyset-ordered; the first limit + 1 of their merge come from the
+    # first limit + 1 of each
+    page = sorted(
+        [*tracking.order_by('created_at', 'id')[:limit + 1], *removals.order_by('created_at', 'id')[:limit + 1]],
+        key=lambda row: (row.created_at, row.id),
+    )[:limit + 1]
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    changes = [
+        {
+            "change_id": str(row.id),
+            "event": row.reason,
+            "changed_at": row.created_at.isoformat(),
+            "marker": {
+                "id": str(row.marker_id),
+                "merged_into": str(row.merged_into) if row.merged_into else None,
+                "latitude": row.location.y if row.location else None,
+                "longitude": row.location.x if row.location else None,
+            },
+        }
+        if isinstance(row, TransitMarkerRemoval) else
+        {
+            "change_id": str(row.id),
+            "event": row.status,
+            "changed_at": row.created_at.isoformat(),
+            "marker": {
+                "id": str(row.marker.id),
+                "marker_category": row.marker.marker_category,
+                "marker_type": row.marker.marker_type,
+                "status": row.marker.status,
+                "segment_number": row.marker.segment_number,
+                "confirmation_count": row.marker.confirmation_count,
+                "latitude": row.marker.location.y if row.marker.location else None,
+                "longitude": row.marker.location.x if row.marker.location else None,
+            },
+        }
+        for row in page
+    ]
+
+    if page:
+        next_cursor = encode_cursor(page[-1].created_at, page[-1].id)
+    elif after is not None:
+        next_cursor = encode_cursor(*after)
+    else:
+        next_cursor = None
+    return changes, next_cursor, has_more
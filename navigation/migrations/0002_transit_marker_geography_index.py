@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("navigation", "0001_initial"),
+    ]
+
+    operations = [
+        # Partial GiST index on the geography cast of active markers: serves meter-radius
+        # ST_DWithin filters and KNN (<->) ordering in navigation.markers
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS navigation_transit_marker_detected_geog_idx
+                ON navigation_transit_marker USING GIST ((location::geography))
+                WHERE status = 'detected';
+            """,
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS navigation_transit_marker_detected_geog_idx;",
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("navigation", "0002_transit_marker_geography_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transitmarker",
+            name="client_id",
+            field=models.UUIDField(blank=True, null=True, unique=True),
+        ),
+    ]
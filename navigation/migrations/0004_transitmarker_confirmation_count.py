@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("navigation", "0003_transitmarker_client_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transitmarker",
+            name="confirmation_count",
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("navigation", "0004_transitmarker_confirmation_count"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transitmarkertracking",
+            index=models.Index(fields=["created_at", "id"], name="navigation_tracking_feed_idx"),
+        ),
+    ]
@@ -0,0 +1,42 @@
+import django.contrib.gis.db.models.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("navigation", "0005_transitmarkertracking_feed_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransitPosition",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("location", django.contrib.gis.db.models.fields.PointField(srid=4326)),
+                ("accuracy", models.FloatField(blank=True, help_text="Reported horizontal accuracy in meters", null=True)),
+                ("recorded_at", models.DateTimeField()),
+                ("segment_number", models.IntegerField(blank=True, null=True)),
+                ("distance_from_route", models.FloatField(blank=True, null=True)),
+                ("progress", models.FloatField(blank=True, help_text="Meters along the route", null=True)),
+                ("off_route", models.BooleanField(default=False)),
+                (
+                    "transit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="positions",
+                        to="navigation.transit",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Transit Positions",
+                "db_table": "navigation_transit_position",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="transitposition",
+            index=models.Index(fields=["transit", "recorded_at"], name="navigation_position_time_idx"),
+        ),
+    ]
@@ -0,0 +1,120 @@
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("navigation", "0006_transitposition"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Segments",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("segment_number", models.IntegerField(default=1)),
+                ("maneuver", models.CharField(blank=True, max_length=100, null=True)),
+                ("instructions", models.TextField(blank=True, null=True)),
+                ("distance", models.FloatField(default=0)),
+                ("duration", models.FloatField(default=0)),
+                ("number_of_point", models.IntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="segments", to="navigation.route"
+                    ),
+                ),
+                (
+                    "surface",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="segments",
+                        to="navigation.surfacetype",
+                    ),
+                ),
+                (
+                    "travel_mode",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="segments",
+                        to="navigation.traveltype",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="navigationSegments",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Segments",
+                "db_table": "navigation_segments",
+                "ordering": ["route", "segment_number"],
+            },
+        ),
+        migrations.CreateModel(
+            name="SegmentPoints",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("lat", models.FloatField()),
+                ("lng", models.FloatField()),
+                ("point_number", models.IntegerField(default=1)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="segment_points", to="navigation.route"
+                    ),
+                ),
+                (
+                    "segment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="points", to="navigation.segments"
+                    ),
+                ),
+                (
+                    "updated_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="updated_segment_points",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="navigationSegmentPoints",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Segment Points",
+                "db_table": "navigation_segment_points",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="segments",
+            index=models.Index(fields=["route", "segment_number"], name="navigation_segment_order_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="segmentpoints",
+            index=models.Index(fields=["segment", "point_number"], name="navigation_point_order_idx"),
+        ),
+    ]
@@ -0,0 +1,58 @@
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+# One LineStringZ per segment, built from its points in point_number order. Single-point
+# segments repeat the point so the line is valid; distance and duration are only filled
+# where the importer left them at 0 (duration at the importer's 1.2 m/s wheelchair speed).
+BACKFILL_SQL = """
+    WITH points AS (
+        SELECT segment_id,
+               array_agg(ST_SetSRID(ST_MakePoint(lng, lat, 0), 4326) ORDER BY point_number) AS points
+        FROM navigation_segment_points
+        WHERE lat IS NOT NULL AND lng IS NOT NULL
+        GROUP BY segment_id
+    )
+    UPDATE navigation_segments s
+    SET geometry = ST_MakeLine(CASE WHEN array_length(p.points, 1) = 1 THEN p.points || p.points ELSE p.points END)
+    FROM points p
+    WHERE s.id = p.segment_id;
+
+    UPDATE navigation_segments
+    SET distance = CASE WHEN distance = 0 THEN ST_Length(geometry::geography) ELSE distance END,
+        number_of_point = ST_NPoints(geometry)
+    WHERE geometry IS NOT NULL;
+
+    UPDATE navigation_segments
+    SET duration = round(distance / 1.2)
+    WHERE geometry IS NOT NULL AND duration = 0;
+"""
+
+RESTORE_SQL = """
+    INSERT INTO navigation_segment_points (segment_id, route_id, lat, lng, point_number, user_id, created_at)
+    SELECT s.id, s.route_id, ST_Y(d.geom), ST_X(d.geom), d.path[1], s.user_id, now()
+    FROM navigation_segments s, ST_DumpPoints(s.geometry) d
+    WHERE s.geometry IS NOT NULL;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("navigation", "0007_segments_segmentpoints"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="segments",
+            name="geometry",
+            field=django.contrib.gis.db.models.fields.LineStringField(blank=True, dim=3, null=True, srid=4326),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=RESTORE_SQL),
+        migrations.DeleteModel(
+            name="SegmentPoints",
+        ),
+        migrations.RemoveField(
+            model_name="route",
+            name="route",
+        ),
+    ]
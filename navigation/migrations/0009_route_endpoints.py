@@ -0,0 +1,48 @@
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+# Endpoints of the curated geometry, falling back to the origin/destination places for
+# routes without segment geometry
+BACKFILL_SQL = """
+    UPDATE navigation_route r
+    SET start_point = (
+            SELECT ST_Force2D(ST_StartPoint(s.geometry)) FROM navigation_segments s
+            WHERE s.route_id = r.id AND s.geometry IS NOT NULL
+            ORDER BY s.segment_number LIMIT 1
+        ),
+        end_point = (
+            SELECT ST_Force2D(ST_EndPoint(s.geometry)) FROM navigation_segments s
+            WHERE s.route_id = r.id AND s.geometry IS NOT NULL
+            ORDER BY s.segment_number DESC LIMIT 1
+        );
+
+    UPDATE navigation_route r SET start_point = p.location
+    FROM geo_place p
+    WHERE r.start_point IS NULL AND p.id = r.origin_id;
+
+    UPDATE navigation_route r SET end_point = p.location
+    FROM geo_place p
+    WHERE r.end_point IS NULL AND p.id = r.destination_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("geo", "0007_auto_20250501_0415"),
+        ("navigation", "0008_segment_geometry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="route",
+            name="start_point",
+            field=django.contrib.gis.db.models.fields.PointField(blank=True, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="end_point",
+            field=django.contrib.gis.db.models.fields.PointField(blank=True, null=True, srid=4326),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
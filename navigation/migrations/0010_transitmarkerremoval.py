@@ -0,0 +1,33 @@
+import uuid
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("navigation", "0009_route_endpoints"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransitMarkerRemoval",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("marker_id", models.UUIDField(unique=True)),
+                ("merged_into", models.UUIDField(blank=True, help_text="Canonical marker of a merged duplicate", null=True)),
+                ("reason", models.CharField(choices=[("merged", "Merged"), ("deleted", "Deleted")], max_length=10)),
+                ("location", django.contrib.gis.db.models.fields.PointField(blank=True, null=True, srid=4326)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name_plural": "Marker Removals",
+                "db_table": "navigation_transit_marker_removal",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="transitmarkerremoval",
+            index=models.Index(fields=["created_at", "id"], name="navigation_removal_feed_idx"),
+        ),
+    ]
@@ -1,4 +1,3 @@
-from collections import OrderedDict
 from account.models import User  # Import the User model from the account app
 from django.contrib.gis.db import models as gis_models
 
@@ -6,7 +5,6 @@ from django.db import models
 from geo.models import Place
 
 from account.models import WheelchairRelation  # Import the Wheelchair model from account app
-import json
 import uuid
 
 class Route(models.Model):
@@ -20,20 +18,16 @@ class Route(models.Model):
 
     origin = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='routes_from')
     destination = models.ForeignKey(Place, on_delete=models.CASCADE, related_name='routes_to')
-    route = models.JSONField( null=True, blank=True)  # Store route data as JSON
     number_of_segments = models.IntegerField(default=1, db_index=True)
+    # Where the curated geometry starts and ends; GiST-indexed for the proximity lookup in RouteAPI
+    start_point = gis_models.PointField(null=True, blank=True, srid=4326)
+    end_point = gis_models.PointField(null=True, blank=True, srid=4326)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='navigationRoutes')
 
     # Distinct related_name for the updated_by field
     updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
                                    related_name='updated_routes')
 
-
-    def save(self, *args, **kwargs):
-        if isinstance(self.route, dict):
-            self.route = json.loads(json.dumps(self.route, sort_keys=False), object_pairs_hook=OrderedDict)
-        super().save(*args, **kwargs)
-
     @classmethod
     def route_exists(cls, origin_id, destination_id):
         """
@@ -78,6 +72,38 @@ class TravelType(models.Model):
         verbose_name_plural = 'Travel Type'
         ordering = ['name']
 
+class Segments(models.Model):
+    # One leg of a curated route (imported from Excel in the Route admin)
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name='segments')
+    segment_number = models.IntegerField(default=1)
+
+    surface = models.ForeignKey(SurfaceType, on_delete=models.SET_NULL, null=True, blank=True, related_name='segments')
+    travel_mode = models.ForeignKey(TravelType, on_delete=models.SET_NULL, null=True, blank=True, related_name='segments')
+    maneuver = models.CharField(max_length=100, null=True, blank=True)
+    instructions = models.TextField(null=True, blank=True)
+
+    # The segment's polyline (x=lng, y=lat, z=elevation or 0), GiST-indexed
+    geometry = gis_models.LineStringField(dim=3, srid=4326, null=True, blank=True)
+    # Precomputed from the geometry when the segment is written; meters and seconds
+    distance = models.FloatField(default=0)
+    duration = models.FloatField(default=0)
+    number_of_point = models.IntegerField(default=0)
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='navigationSegments')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'navigation_segments'
+        verbose_name_plural = 'Segments'
+        ordering = ['route', 'segment_number']
+        indexes = [
+            models.Index(fields=['route', 'segment_number'], name='navigation_segment_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.route} #{self.segment_number}"
+
 class Transit(models.Model):
     # Define status choices
     STATUS_CHOICES = [
@@ -169,6 +195,10 @@ class TransitMarker(models.Model):
     location = gis_models.PointField(null=True, blank=True, srid=4326)
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='detected', db_index=True)
+    # Id generated by the app for markers reported offline; makes bulk sync retries idempotent
+    client_id = models.UUIDField(null=True, blank=True, unique=True)
+    # Number of reports merged into this marker by the consolidation job
+    confirmation_count = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)  # Use only auto_now_add=True
 
     class Meta:
@@ -205,6 +235,64 @@ class TransitMarkerTracking(models.Model):
     class Meta:
         db_table = 'navigation_transit_marker_tracking'  # Custom table name
         verbose_name_plural = 'Marker Tracking'  # Admin panel name
+        indexes = [
+            # Keyset pagination of the marker change feed
+            models.Index(fields=['created_at', 'id'], name='navigation_tracking_feed_idx'),
+        ]
 
     def __str__(self):
         return f"Resolution by {self.user.username} for Marker {self.marker.id} - Status: {self.get_status_display()}"
+
+
+class TransitMarkerRemoval(models.Model):
+    """
+    Tombstone of a marker that was merged into another or deleted, so the marker change feed
+    can tell clients to drop it; its tracking rows are repointed or deleted with it.
+    """
+    REASON_CHOICES = [
+        ('merged', 'Merged'),
+        ('deleted', 'Deleted'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Plain ids, since neither marker has to exist any more
+    marker_id = models.UUIDField(unique=True)
+    merged_into = models.UUIDField(null=True, blank=True, help_text="Canonical marker of a merged duplicate")
+    reason = models.CharField(max_length=10, choices=REASON_CHOICES)
+    location = gis_models.PointField(null=True, blank=True, srid=4326)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'navigation_transit_marker_removal'
+        verbose_name_plural = 'Marker Removals'
+        indexes = [
+            # Keyset pagination of the marker change feed, alongside navigation_tracking_feed_idx
+            models.Index(fields=['created_at', 'id'], name='navigation_removal_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f"Marker {self.marker_id} {self.reason}"
+
+
+class TransitPosition(models.Model):
+    # Positions reported during a transit, written in batches by navigation.tracking
+    transit = models.ForeignKey(Transit, on_delete=models.CASCADE, related_name='positions')
+    location = gis_models.PointField(srid=4326)
+    accuracy = models.FloatField(null=True, blank=True, help_text="Reported horizontal accuracy in meters")
+    recorded_at = models.DateTimeField()
+
+    # Where the position snapped onto the transit's route; null when no route was available
+    segment_number = models.IntegerField(null=True, blank=True)
+    distance_from_route = models.FloatField(null=True, blank=True)
+    progress = models.FloatField(null=True, blank=True, help_text="Meters along the route")
+    off_route = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'navigation_transit_position'
+        verbose_name_plural = 'Transit Positions'
+        indexes = [
+            models.Index(fields=['transit', 'recorded_at'], name='navigation_position_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.transit_id} at {self.recorded_at}"
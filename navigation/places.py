@@ -0,0 +1,66 @@
+# navigation/places.py
+from django.contrib.gis.geos import Point
+from django.db import transaction
+
+from geo.models import PLACE_CELL_PRECISION, Place
+from navigation import geohash
+from navigation.tiles import place_versions
+
+
+def place_cell(lat, lng):
+    """The Place.cell_id of the geohash cell containing (lat, lng)."""
+    return geohash.encode(float(lat), float(lng), PLACE_CELL_PRECISION)
+
+
+def upsert_place(name, address, country, state, city, zip_code, lat, lng):
+    """
+    Return the Place of the cell containing (lat, lng), creating it if there is none.
+
+    The insert is an INSERT ... ON CONFLICT DO NOTHING against the unique cell_id index,
+    so concurrent requests for the same spot never create two places or fail on a
+    constraint: whichever insert loses the race reads back the winner's row.
+
+    Parameters:
+        name (str): Name of the place.
+        address (str): Address of the place.
+        country (Country): Country instance.
+        state (State): State instance.
+        city (City): City instance.
+        zip_code (str): Zip code of the place.
+        lat (float or Decimal): Latitude.
+        lng (float or Decimal): Longitude.
+
+    Returns:
+        Place: The Place instance found or created.
+    """
+    cell_id = place_cell(lat, lng)
+    places = Place.objects.select_related('city', 'state', 'country')
+
+    place = places.filter(cell_id=cell_id).first()
+    if place:
+        return place
+
+    location = Point(float(lng), float(lat), srid=4326)
+    place = Place(
+        name=name,
+        address=address,
+        country=country,
+        state=state,
+        city=city,
+        zip_code=zip_code,
+        location=location,
+        cell_id=cell_id,
+    )
+    # bulk_create skips save(), which normally fills in the display address, and post_save
+    place.display_address = place.build_display_address()
+    Place.objects.bulk_create([place], ignore_conflicts=True)
+
+    # Either our row or the one that won the race; a place not yet given a cell by
+    # dedupe_places can also hold the same location under the unique_together constraint
+    stored = places.filter(cell_id=cell_id).first() or places.filter(
+        country=country, state=state, city=city, zip_code=zip_code, location=location,
+    ).first()
+    if stored is not None and stored.id == place.id:
+        # Our insert won; refresh the place tiles as the post_save handler would
+        transaction.on_commit(lambda: place_versions.invalidate_near(location.y, location.x))
+    return stored
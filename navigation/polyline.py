@@ -0,0 +1,94 @@
+# navigation/polyline.py
+import numpy as np
+
+PRECISION = 1e5
+
+
+def decode_many(encoded_polylines, precision=PRECISION):
+    """
+    Decode many Google encoded polylines in one vectorized pass.
+
+    Parameters:
+        encoded_polylines (list[str]): Encoded polylines, e.g. one per route step.
+        precision (float): Coordinate scale factor (1e5 for Google polylines).
+
+    Returns:
+        list[numpy.ndarray]: One (N, 2) float array of (lat, lng) per polyline.
+    """
+    if not encoded_polylines:
+        return []
+
+    encoded = [polyline.encode('ascii') for polyline in encoded_polylines]
+    chars = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.int64) - 63
+    if chars.size == 0:
+        return [np.empty((0, 2)) for _ in encoded]
+
+    # Each value is a run of 5-bit chunks; a chunk without the 0x20 flag ends the value
+    is_last = (chars & 0x20) == 0
+    ends = np.flatnonzero(is_last)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+
+    chunk_position = np.arange(chars.size) - np.repeat(starts, ends - starts + 1)
+    values = np.add.reduceat((chars & 0x1f) << (5 * chunk_position), starts)
+
+    # Undo the zig-zag sign encoding
+    values = np.where(values & 1, ~(values >> 1), values >> 1)
+
+    # Number of values in each polyline, from the terminators falling inside each string
+    lengths = np.fromiter((len(polyline) for polyline in encoded), dtype=np.int64, count=len(encoded))
+    string_ends = np.cumsum(lengths)
+    values_per_polyline = np.searchsorted(ends, string_ends, side='left') - \
+        np.searchsorted(ends, string_ends - lengths, side='left')
+
+    deltas = values.reshape(-1, 2)
+    coordinates = np.cumsum(deltas, axis=0)
+
+    # Restart the running sum at the first point of each polyline
+    point_counts = values_per_polyline // 2
+    offsets = np.concatenate(([0], np.cumsum(point_counts)))
+    result = []
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        base = coordinates[start - 1] if start > 0 else 0
+        result.append((coordinates[start:end] - base) / precision)
+    return result
+
+
+def decode(encoded, precision=PRECISION):
+    """Decode a single encoded polyline into an (N, 2) array of (lat, lng)."""
+    return decode_many([encoded], precision)[0]
+
+
+def encode(coordinates, precision=PRECISION):
+    """
+    Encode an (N, 2) array-like of (lat, lng) into a Google encoded polyline.
+    """
+    return encode_values(np.asarray(coordinates, dtype=np.float64).reshape(-1, 2), precision)
+
+
+def encode_values(values, precision=PRECISION):
+    """
+    Encode an array of coordinate rows of any width (e.g. (lat, lng) pairs or a single
+    elevation column) as delta-encoded, zig-zagged varints in the Google polyline alphabet.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return ''
+
+    scaled = np.round(values * precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, scaled.shape[1]), dtype=np.int64)).ravel()
+    zigzag = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    # Split every value into 5-bit chunks, flagging all but the last chunk with 0x20
+    max_chunks = max(1, int(zigzag.max()).bit_length() // 5 + 1)
+    shifts = 5 * np.arange(max_chunks)
+    chunks = (zigzag[:, None] >> shifts) & 0x1f
+    remaining = zigzag[:, None] >> (shifts + 5)
+    used = np.concatenate((np.ones((zigzag.size, 1), dtype=bool), remaining[:, :-1] > 0), axis=1)
+    chunks = np.where(remaining > 0, chunks | 0x20, chunks) + 63
+
+    return chunks[used].astype(np.uint8).tobytes().decode('ascii')
+
+
+def encode_many(coordinate_arrays, precision=PRECISION):
+    """Encode several coordinate arrays, returning one polyline per array."""
+    return [encode(coordinates, precision) for coordinates in coordinate_arrays]
@@ -0,0 +1,118 @@
+# navigation/provider_health.py
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker over a rolling time window of call outcomes.
+
+    The breaker opens when the error rate over the window crosses `error_threshold`
+    (calls slower than `slow_call_ms` count as errors), rejects calls while open, and
+    after `open_seconds` lets a single probe through (half-open) to decide whether to close.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, window_seconds=60, min_calls=10, error_threshold=0.5,
+                 open_seconds=30, slow_call_ms=None):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_threshold = error_threshold
+        self.open_seconds = open_seconds
+        self.slow_call_ms = slow_call_ms
+
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._samples = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        while self._samples and self._samples[0][0] < now - self.window_seconds:
+            self._samples.popleft()
+
+    def allow(self):
+        """Return True if a call to the provider may go ahead."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record(self, ok, latency_ms):
+        now = time.monotonic()
+        if self.slow_call_ms is not None and latency_ms > self.slow_call_ms:
+            ok = False
+
+        with self._lock:
+            self._samples.append((now, ok, latency_ms))
+            self._trim(now)
+
+            if self.state == self.HALF_OPEN:
+                if ok:
+                    self.state = self.CLOSED
+                    self._samples.clear()
+                else:
+                    self.state = self.OPEN
+                    self._opened_at = now
+                self._probe_in_flight = False
+                return
+
+            if self.state == self.CLOSED and len(self._samples) >= self.min_calls:
+                errors = sum(1 for _, sample_ok, _ in self._samples if not sample_ok)
+                if errors / len(self._samples) >= self.error_threshold:
+                    self.state = self.OPEN
+                    self._opened_at = now
+
+    def snapshot(self):
+        with self._lock:
+            self._trim(time.monotonic())
+            samples = list(self._samples)
+            state = self.state
+
+        latencies = sorted(latency for _, _, latency in samples)
+        errors = sum(1 for _, ok, _ in samples if not ok)
+        return {
+            'state': state,
+            'calls': len(samples),
+            'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+            'p95_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1) if latencies else 0.0,
+        }
+
+
+class ProviderHealth:
+    """Registry of circuit breakers, one per provider, configured from settings.ROUTE_PROVIDERS."""
+
+    def __init__(self, providers):
+        self.providers = providers
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, provider):
+        with self._lock:
+            breaker = self._breakers.get(provider)
+            if breaker is None:
+                config = self.providers.get(provider) or self.providers['default']
+                breaker = CircuitBreaker(provider, **config.get('breaker', {}))
+                self._breakers[provider] = breaker
+            return breaker
+
+    def snapshot(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.snapshot() for name, breaker in breakers.items()}
+
+
+provider_health = ProviderHealth(settings.ROUTE_PROVIDERS)
@@ -0,0 +1,137 @@
+# navigation/providers.py
+import logging
+import threading
+import time
+from collections import deque
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from navigation.provider_health import provider_health
+
+logger = logging.getLogger(__name__)
+
+
+def deadline_in(seconds):
+    """Return an absolute deadline (monotonic clock) `seconds` from now."""
+    return time.monotonic() + seconds
+
+
+class ProviderClient:
+    """
+    Shared HTTP client for the routing and geocoding providers.
+
+    Each provider gets its own keep-alive session whose adapter pools connections per host,
+    its own connect/read timeouts, and latency metrics for every call made through it.
+    A call can also be given an absolute deadline; the read timeout is clamped to the time
+    left and the call is skipped once the budget is spent. Calls are rejected without any
+    network traffic while the provider's circuit breaker is open.
+    """
+
+    def __init__(self, providers):
+        self.providers = providers
+        self._sessions = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _config(self, provider):
+        return self.providers.get(provider) or self.providers['default']
+
+    def _session(self, provider):
+        with self._lock:
+            session = self._sessions.get(provider)
+            if session is None:
+                pool_size = self._config(provider)['pool_size']
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[provider] = session
+            return session
+
+    def _record(self, provider, started, outcome):
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            metrics = self._metrics.setdefault(provider, {
+                'calls': 0, 'errors': 0, 'timeouts': 0, 'skipped': 0, 'rejected': 0,
+                'total_ms': 0.0, 'latencies': deque(maxlen=512),
+            })
+            metrics['calls'] += 1
+            if outcome != 'ok':
+                metrics[outcome] += 1
+            if outcome not in ('skipped', 'rejected'):
+                metrics['total_ms'] += elapsed_ms
+                metrics['latencies'].append(elapsed_ms)
+        logger.debug("%s provider call: %s in %.1f ms", provider, outcome, elapsed_ms)
+
+        if outcome not in ('skipped', 'rejected'):
+            provider_health.breaker(provider).record(outcome == 'ok', elapsed_ms)
+
+    def get(self, provider, url, params=None, headers=None, deadline=None):
+        """
+        Issue a GET request to a provider.
+
+        Parameters:
+            provider (str): Provider name, selects the session, timeouts and metrics bucket.
+            url (str): Request URL.
+            params (dict): Query parameters.
+            headers (dict): Extra request headers.
+            deadline (float): Optional absolute deadline from `deadline_in`.
+
+        Returns:
+            requests.Response: The response, or None on timeout, connection error, spent budget
+            or open circuit.
+        """
+        config = self._config(provider)
+        connect_timeout, read_timeout = config['connect_timeout'], config['read_timeout']
+        started = time.monotonic()
+
+        if deadline is not None:
+            remaining = deadline - started
+            if remaining <= 0:
+                self._record(provider, started, 'skipped')
+                logger.warning("%s provider call skipped: request budget exhausted", provider)
+                return None
+            connect_timeout = min(connect_timeout, remaining)
+            read_timeout = min(read_timeout, remaining)
+
+        if not provider_health.breaker(provider).allow():
+            self._record(provider, started, 'rejected')
+            logger.warning("%s provider call rejected: circuit open", provider)
+            return None
+
+        try:
+            response = self._session(provider).get(
+                url, params=params, headers=headers, timeout=(connect_timeout, read_timeout)
+            )
+        except requests.Timeout:
+            self._record(provider, started, 'timeouts')
+            logger.warning("%s provider call timed out: %s", provider, url)
+            return None
+        except requests.RequestException as e:
+            self._record(provider, started, 'errors')
+            logger.warning("%s provider call failed: %s", provider, e)
+            return None
+
+        self._record(provider, started, 'ok' if response.status_code < 500 else 'errors')
+        return response
+
+    def stats(self):
+        """Return per-provider call counts, latency figures in milliseconds and breaker state."""
+        with self._lock:
+            snapshot = {name: dict(metrics, latencies=sorted(metrics['latencies']))
+                        for name, metrics in self._metrics.items()}
+
+        stats = {}
+        for name, metrics in snapshot.items():
+            latencies = metrics.pop('latencies')
+            measured = metrics['calls'] - metrics['skipped'] - metrics['rejected']
+            metrics['avg_ms'] = round(metrics.pop('total_ms') / measured, 1) if measured else 0.0
+            metrics['p95_ms'] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1) if latencies else 0.0
+            metrics['health'] = provider_health.breaker(name).snapshot()
+            stats[name] = metrics
+        return stats
+
+
+provider_client = ProviderClient(settings.ROUTE_PROVIDERS)
@@ -0,0 +1,97 @@
+# navigation/pubsub.py
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryBroker:
+    """
+    Publish/subscribe inside one process.
+
+    Publishing is synchronous and thread-safe, so views and signals can call it directly;
+    subscribers are asyncio consumers such as the event streams in navigation.push. Only
+    subscribers in the publishing process receive messages, so this is meant for development
+    and single-process servers; RedisBroker has the same interface.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}  # channel -> set of (event loop, asyncio.Queue)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        """Send a JSON-serializable message to the channel's subscribers; returns how many there were."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                # The subscriber's loop has shut down; its generator cleanup removes it
+                pass
+        return len(subscribers)
+
+    @staticmethod
+    def _deliver(queue, message):
+        if queue.full():
+            # A client that stopped reading loses its oldest messages instead of growing the queue
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    async def subscribe(self, channel):
+        """Async iterator over the messages published on `channel` from now on."""
+        queue = asyncio.Queue(self.queue_size)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscriber)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(channel, set())
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    self._subscribers.pop(channel, None)
+
+
+class RedisBroker:
+    """Publish/subscribe over Redis channels, shared by every web and worker process."""
+
+    def __init__(self, url):
+        self.url = url
+        self._client = None
+
+    def publish(self, channel, message):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.url)
+        return self._client.publish(channel, json.dumps(message))
+
+    async def subscribe(self, channel):
+        from redis import asyncio as aioredis
+
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            async for item in pubsub.listen():
+                if item["type"] == "message":
+                    yield json.loads(item["data"])
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+def get_broker():
+    if settings.PUSH_BROKER == 'redis':
+        return RedisBroker(settings.REDIS_URL)
+    return InMemoryBroker()
+
+
+broker = get_broker()
@@ -0,0 +1,174 @@
+# navigation/push.py
+import asyncio
+import json
+import logging
+import re
+import uuid
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from navigation.pubsub import broker
+
+logger = logging.getLogger(__name__)
+
+# Served by rootApp.asgi ahead of Django, since a stream outlives any request/response cycle;
+# matched against the path below the script prefix, see match_transit_events
+TRANSIT_EVENTS_PATH = re.compile(r'^/api/navigation/transits/(?P<transit_id>[0-9a-fA-F-]{36})/events/?$')
+
+END_EVENT = 'end'
+
+
+def match_transit_events(scope):
+    """
+    Match the request path against TRANSIT_EVENTS_PATH once the mount prefix is stripped:
+    the server's root_path, which ASGI servers include in `path`, or FORCE_SCRIPT_NAME when
+    the proxy passes the prefix through.
+    """
+    path = scope['path']
+    for prefix in (scope.get('root_path', ''), settings.FORCE_SCRIPT_NAME or ''):
+        prefix = prefix.rstrip('/')
+        if prefix and (path == prefix or path.startswith(prefix + '/')):
+            path = path[len(prefix):]
+            break
+    return TRANSIT_EVENTS_PATH.match(path)
+
+
+def ticket_key(ticket):
+    return f'transit-events-ticket:{ticket}'
+
+
+def issue_ticket(transit_id, user_id):
+    """
+    Return a single-use ticket opening the event stream of a transit, valid for
+    PUSH_TICKET_TTL seconds. EventSource clients can't send headers, and a ticket in the
+    query string is harmless in access logs where an access token is not.
+    """
+    ticket = uuid.uuid4().hex
+    cache.set(ticket_key(ticket), {"transit_id": str(transit_id), "user_id": user_id}, settings.PUSH_TICKET_TTL)
+    return ticket
+
+
+def redeem_ticket(ticket, transit_id):
+    """Consume a ticket; returns the user id it was issued to, or None if it is invalid or used."""
+    data = cache.get(ticket_key(ticket))
+    # Only the request whose delete() removed the key gets to use it
+    if data is None or not cache.delete(ticket_key(ticket)):
+        return None
+    return data["user_id"] if data["transit_id"] == str(transit_id) else None
+
+
+def transit_channel(transit_id):
+    return f'transit-events:{transit_id}'
+
+
+def push_transit_event(transit_id, event, data=None):
+    """Send an event to the clients following a transit. Failures are logged, never raised."""
+    try:
+        broker.publish(transit_channel(transit_id), {"event": event, "data": data or {}})
+    except Exception as e:
+        logger.error("Could not push '%s' to transit %s: %s", event, transit_id, e)
+
+
+@sync_to_async
+def authorize(scope, transit_id):
+    """
+    Return True if the request is from the user owning the in-progress transit: an access
+    token in the Authorization header, or a `ticket` query parameter from the stream ticket
+    endpoint for EventSource clients. An access token in a `token` query parameter is only
+    accepted with PUSH_ALLOW_QUERY_TOKEN, as it would be written to access logs.
+    """
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+    from navigation.models import Transit
+
+    headers = dict(scope.get('headers') or [])
+    query = parse_qs(scope.get('query_string', b'').decode())
+    raw_token = None
+    authorization = headers.get(b'authorization', b'').split()
+    if len(authorization) == 2 and authorization[0].lower() == b'bearer':
+        raw_token = authorization[1]
+    elif query.get('ticket'):
+        user_id = redeem_ticket(query['ticket'][0], transit_id)
+        return user_id is not None and Transit.objects.filter(id=transit_id, user_id=user_id, status='in_progress').exists()
+    elif query.get('token') and settings.PUSH_ALLOW_QUERY_TOKEN:
+        raw_token = query['token'][0].encode()
+    if not raw_token:
+        return False
+
+    authentication = JWTAuthentication()
+    try:
+        user = authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return False
+    return Transit.objects.filter(id=transit_id, user=user, status='in_progress').exists()
+
+
+async def send_json_error(send, status_code, error):
+    await send({
+        'type': 'http.response.start',
+        'status': status_code,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps({"success": False, "error": error}).encode()})
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def transit_events(scope, receive, send):
+    """
+    ASGI app streaming server-sent events to the user following an in-progress transit:
+    `barrier` when a barrier is reported inside its route corridor, and `end` when the
+    transit is completed or canceled. A comment line is sent every PUSH_KEEPALIVE seconds
+    so proxies keep the connection open.
+    """
+    transit_id = match_transit_events(scope).group('transit_id').lower()
+    if scope['method'] != 'GET':
+        await send_json_error(send, 405, "Method not allowed.")
+        return
+    if not await authorize(scope, transit_id):
+        await send_json_error(send, 404, "No in-progress transit with this ID for the authenticated user.")
+        return
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': b': connected\n\n', 'more_body': True})
+
+    messages = broker.subscribe(transit_channel(transit_id))
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    next_message = asyncio.ensure_future(messages.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait(
+                {next_message, disconnected}, timeout=settings.PUSH_KEEPALIVE, return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnected in done:
+                return
+            if next_message not in done:
+                await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+                continue
+
+            message = next_message.result()
+            body = f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+            await send({'type': 'http.response.body', 'body': body.encode(), 'more_body': message['event'] != END_EVENT})
+            if message['event'] == END_EVENT:
+                return
+            next_message = asyncio.ensure_future(messages.__anext__())
+    finally:
+        disconnected.cancel()
+        next_message.cancel()
+        await asyncio.gather(next_message, return_exceptions=True)
+        await messages.aclose()
@@ -0,0 +1,85 @@
+# navigation/route_assembly.py
+import math
+
+from navigation.models import Route, Segments
+
+# Active curated routes starting near the origin and ending near the destination, closest
+# first. The && filters against a degree box are answered by the GiST indexes on the
+# endpoint columns; ST_DWithin on geography then applies the exact radius in meters.
+CURATED_ROUTE_SQL = """
+    SELECT r.*,
+           ST_Distance(r.start_point::geography, o.point::geography)
+             + ST_Distance(r.end_point::geography, d.point::geography) AS detour
+    FROM {table} r,
+         (SELECT ST_SetSRID(ST_MakePoint(%s, %s), 4326) AS point) o,
+         (SELECT ST_SetSRID(ST_MakePoint(%s, %s), 4326) AS point) d
+    WHERE r.status = 'active'
+      AND r.start_point && ST_Expand(o.point, %s)
+      AND r.end_point && ST_Expand(d.point, %s)
+      AND ST_DWithin(r.start_point::geography, o.point::geography, %s)
+      AND ST_DWithin(r.end_point::geography, d.point::geography, %s)
+      AND EXISTS (SELECT 1 FROM {segments} s WHERE s.route_id = r.id AND s.geometry IS NOT NULL)
+    ORDER BY detour
+    LIMIT 1
+"""
+
+
+def degree_margin(lat, meters):
+    """Degrees spanning at least `meters` in both directions around latitude `lat`."""
+    return meters / (111320 * max(math.cos(math.radians(lat)), 0.01))
+
+
+def nearest_curated_route(origin_lat, origin_lng, destination_lat, destination_lng, radius):
+    """
+    Find the active curated route whose start and end both lie within `radius` meters of the
+    requested origin and destination, with the smallest total detour.
+
+    Returns:
+        Route: The route with a `detour` attribute (meters), or None.
+    """
+    sql = CURATED_ROUTE_SQL.format(table=Route._meta.db_table, segments=Segments._meta.db_table)
+    params = [
+        origin_lng, origin_lat, destination_lng, destination_lat,
+        degree_margin(origin_lat, radius), degree_margin(destination_lat, radius),
+        radius, radius,
+    ]
+    routes = list(Route.objects.raw(sql, params))
+    return routes[0] if routes else None
+
+
+def route_segments(route):
+    """
+    Load the segments of a curated route with their geometry, in one query.
+
+    Every segment row carries its whole polyline as a single LineString, so points arrive
+    grouped and in order; no model instances are built and nothing is matched up in Python.
+
+    Parameters:
+        route (Route | UUID): The route or its id.
+
+    Returns:
+        list[dict]: Segments ordered by segment_number, each {"segment_number", "surface",
+        "travel_mode", "maneuver", "instructions", "distance", "duration", "points"}, with
+        points as [{"latitude", "longitude"}, ...].
+    """
+    rows = Segments.objects.filter(route=route).order_by('segment_number').values_list(
+        'segment_number', 'surface__name', 'travel_mode__name', 'maneuver', 'instructions',
+        'distance', 'duration', 'geometry',
+    )
+
+    return [
+        {
+            "segment_number": segment_number,
+            "surface": surface,
+            "travel_mode": travel_mode,
+            "maneuver": maneuver,
+            "instructions": instructions,
+            "distance": distance,
+            "duration": duration,
+            "points": [
+                {"latitude": coordinate[1], "longitude": coordinate[0]}
+                for coordinate in (geometry.coords if geometry else ())
+            ],
+        }
+        for segment_number, surface, travel_mode, maneuver, instructions, distance, duration, geometry in rows
+    ]
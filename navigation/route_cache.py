@@ -0,0 +1,139 @@
+# navigation/route_cache.py
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from navigation import geohash
+
+# Per-request fields that are never stored with a cached route
+REQUEST_FIELDS = ('transit_id', 'origin_place', 'destination_place')
+
+
+class RouteCache:
+    """
+    Cache of formatted provider routes keyed by the snapped origin/destination cells and provider.
+
+    Entries live in the shared Django cache with a TTL and in a size-bounded in-process LRU.
+    Every entry remembers the version of each coarse index cell its geometry passes through;
+    replacing a cell version (e.g. when a barrier is reported there) invalidates every route
+    crossing that cell without having to enumerate them. Versions are random tokens rather
+    than counters, so a version key that is evicted and recreated never repeats an old value.
+    """
+
+    def __init__(self, precision=8, index_precision=6, ttl=900, max_entries=256):
+        self.precision = precision
+        self.index_precision = index_precision
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, provider, origin_lat, origin_lng, destination_lat, destination_lng):
+        origin_cell = geohash.encode(origin_lat, origin_lng, self.precision)
+        destination_cell = geohash.encode(destination_lat, destination_lng, self.precision)
+        return f"route-cache:{provider}:{origin_cell}:{destination_cell}"
+
+    def _version_key(self, cell):
+        return f"route-cache:cell-version:{cell}"
+
+    def _route_cells(self, payload):
+        cells = set()
+        for segment in payload.get("segments", []):
+            for point in segment.get("points") or []:
+                cells.add(geohash.encode(point["latitude"], point["longitude"], self.index_precision))
+        return cells
+
+    def _current_versions(self, cells):
+        keys = {cell: self._version_key(cell) for cell in cells}
+        stored = cache.get_many(list(keys.values()))
+        missing = [cell for cell, key in keys.items() if key not in stored]
+        if missing:
+            # First use or evicted: start from a fresh token; add() keeps a concurrent worker's
+            for cell in missing:
+                cache.add(keys[cell], uuid.uuid4().hex, None)
+            stored.update(cache.get_many([keys[cell] for cell in missing]))
+        return {cell: stored.get(key) for cell, key in keys.items()}
+
+    def get(self, providers, origin_lat, origin_lng, destination_lat, destination_lng):
+        """
+        Return the first cached route among `providers`, in preference order.
+
+        Returns:
+            tuple: (provider, payload) on a hit, (None, None) otherwise. The payload is a copy
+            without the per-request fields, safe for the caller to modify.
+        """
+        for provider in providers:
+            key = self.key(provider, origin_lat, origin_lng, destination_lat, destination_lng)
+
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry["expires_at"] > time.monotonic():
+                    self._entries.move_to_end(key)
+                else:
+                    self._entries.pop(key, None)
+                    entry = None
+
+            shared = entry is None
+            if shared:
+                entry = cache.get(key)
+                if entry is None:
+                    continue
+
+            if self._current_versions(entry["versions"]) != entry["versions"]:
+                self._discard(key)
+                continue
+
+            if shared:
+                self._remember(key, entry)
+            return provider, copy.deepcopy(entry["payload"])
+
+        return None, None
+
+    def set(self, provider, origin_lat, origin_lng, destination_lat, destination_lng, payload):
+        key = self.key(provider, origin_lat, origin_lng, destination_lat, destination_lng)
+        payload = {name: value for name, value in payload.items() if name not in REQUEST_FIELDS}
+
+        entry = {
+            "payload": copy.deepcopy(payload),
+            "versions": self._current_versions(self._route_cells(payload)),
+            "stored_at": time.time(),
+        }
+        cache.set(key, entry, self.ttl)
+        self._remember(key, entry)
+
+    def invalidate_near(self, lat, lng):
+        """
+        Invalidate every cached route passing through the index cell of (lat, lng) or its neighbours.
+        """
+        for cell in geohash.neighbors(geohash.encode(lat, lng, self.index_precision)):
+            cache.set(self._version_key(cell), uuid.uuid4().hex, None)
+
+    def _remember(self, key, entry):
+        # Expire locally when the shared entry does, not a full TTL after it was last seen
+        remaining = entry.get("stored_at", 0) + self.ttl - time.time()
+        if remaining <= 0:
+            return
+        with self._lock:
+            self._entries[key] = {**entry, "expires_at": time.monotonic() + remaining}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _discard(self, key):
+        cache.delete(key)
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+route_cache = RouteCache(
+    precision=settings.ROUTE_CACHE_PRECISION,
+    index_precision=settings.ROUTE_CACHE_INDEX_PRECISION,
+    ttl=settings.ROUTE_CACHE_TTL,
+    max_entries=settings.ROUTE_CACHE_LOCAL_SIZE,
+)
@@ -0,0 +1,55 @@
+# navigation/route_format.py
+import numpy as np
+
+from navigation import polyline
+
+GEOMETRY_VERBOSE = 'points'
+GEOMETRY_POLYLINE = 'polyline'
+
+
+def requested_geometry(request):
+    """
+    Return the segment geometry format asked for by the client.
+
+    The compact format is selected with `?geometry=polyline` or with a media type
+    parameter in the Accept header, e.g. `Accept: application/json; geometry=polyline`.
+    Anything else keeps the verbose per-point format.
+    """
+    if request.query_params.get('geometry') == GEOMETRY_POLYLINE:
+        return GEOMETRY_POLYLINE
+
+    accepted = (getattr(request, 'accepted_media_type', None) or '').replace(' ', '')
+    if f'geometry={GEOMETRY_POLYLINE}' in accepted.split(';'):
+        return GEOMETRY_POLYLINE
+    return GEOMETRY_VERBOSE
+
+
+def delta_encode(values, precision=1):
+    """
+    Delta-encode a list of numbers: the first value is absolute, the rest are differences
+    from the previous value, all rounded to `precision` decimals.
+
+    None unless every value is known: a partly populated array is dropped as a whole rather
+    than filling the gaps, since any filler would decode as a false climb or drop.
+    """
+    if not values or any(value is None for value in values):
+        return None
+
+    scale = 10 ** precision
+    scaled = np.round(np.array(values, dtype=np.float64) * scale).astype(np.int64)
+    deltas = np.diff(scaled, prepend=0) / scale
+    return deltas.round(precision).tolist()
+
+
+def compact_segments(response_data):
+    """
+    Replace each segment's list of point dicts with an encoded polyline and a
+    delta-encoded elevation array, in place.
+    """
+    for segment in response_data.get("segments", []):
+        points = segment.pop("points", None) or []
+        segment["polyline"] = polyline.encode([(point["latitude"], point["longitude"]) for point in points])
+        segment["elevation"] = delta_encode([point.get("elevation") for point in points])
+
+    response_data["geometry_format"] = GEOMETRY_POLYLINE
+    return response_data
@@ -0,0 +1,94 @@
+# navigation/route_markers.py
+import math
+
+import numpy as np
+from django.conf import settings
+from django.contrib.gis.geos import LineString
+
+from navigation.models import TransitMarker
+from navigation.routing.graph import EARTH_RADIUS, segment_distance
+
+
+def requested_marker_buffer(request):
+    """
+    Return the buffer in meters around the route within which markers are returned, or None.
+
+    Enabled with `?include_markers=true`; `?marker_buffer=<meters>` overrides the default
+    ROUTE_MARKER_BUFFER and is capped at ROUTE_MARKER_MAX_BUFFER.
+    """
+    if str(request.query_params.get('include_markers', '')).lower() not in ('1', 'true', 'yes'):
+        return None
+    try:
+        buffer = float(request.query_params.get('marker_buffer', settings.ROUTE_MARKER_BUFFER))
+    except (TypeError, ValueError):
+        buffer = settings.ROUTE_MARKER_BUFFER
+    return min(max(buffer, 0), settings.ROUTE_MARKER_MAX_BUFFER)
+
+
+def markers_along_route(response_data, buffer):
+    """
+    Attach every detected marker within `buffer` meters of the route as `response_data["markers"]`,
+    each assigned to the segment it lies nearest to, ordered along the route.
+
+    The markers are fetched in a single spatial query against the whole route linestring; the
+    index-friendly degree bound is then tightened to exact meters per segment in memory.
+    """
+    segment_numbers, lat, lng = [], [], []
+    for segment in response_data.get("segments", []):
+        for point in segment.get("points") or []:
+            segment_numbers.append(segment["segment_number"])
+            lat.append(point["latitude"])
+            lng.append(point["longitude"])
+
+    response_data["markers"] = []
+    if len(lat) < 2:
+        return response_data
+
+    segment_numbers = np.array(segment_numbers)
+    lat, lng = np.array(lat, dtype=np.float64), np.array(lng, dtype=np.float64)
+
+    # Degrees spanning `buffer` meters in the least favourable (east-west) direction
+    cos_lat = max(math.cos(math.radians(float(np.abs(lat).max()))), 0.01)
+    degrees = buffer / (math.radians(1) * EARTH_RADIUS * cos_lat)
+
+    line = LineString(list(zip(lng.tolist(), lat.tolist())), srid=4326)
+    markers = TransitMarker.objects.filter(
+        status='detected',
+        location__dwithin=(line, degrees),
+    ).values_list('id', 'marker_category', 'marker_type', 'location', 'created_at')
+
+    # Consecutive points of the same segment form the pieces a marker is measured against
+    same_segment = segment_numbers[:-1] == segment_numbers[1:]
+    start_lat, start_lng = lat[:-1][same_segment], lng[:-1][same_segment]
+    end_lat, end_lng = lat[1:][same_segment], lng[1:][same_segment]
+    piece_segment = segment_numbers[:-1][same_segment]
+    piece_order = np.flatnonzero(same_segment)
+
+    found = []
+    for marker_id, category, marker_type, location, created_at in markers:
+        if piece_segment.size:
+            distances = segment_distance(location.y, location.x, start_lat, start_lng, end_lat, end_lng)
+            nearest = int(np.argmin(distances))
+            distance, segment_number, order = float(distances[nearest]), int(piece_segment[nearest]), int(piece_order[nearest])
+        else:
+            distances = segment_distance(location.y, location.x, lat, lng, lat, lng)
+            nearest = int(np.argmin(distances))
+            distance, segment_number, order = float(distances[nearest]), int(segment_numbers[nearest]), nearest
+        if distance > buffer:
+            continue
+
+        found.append((order, {
+            "id": str(marker_id),
+            "segment_number": segment_number,
+            "marker_category": category,
+            "marker_type": marker_type,
+            "status": 'detected',
+            "latitude": location.y,
+            "longitude": location.x,
+            "distance": round(distance, 1),
+            "created_at": created_at.isoformat(),
+        }))
+
+    found.sort(key=lambda item: (item[0], item[1]["distance"]))
+    response_data["markers"] = [marker for _, marker in found]
+    return response_data
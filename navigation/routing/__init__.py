@@ -0,0 +1,60 @@
+# navigation/routing/__init__.py
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+from navigation.routing.ch import ContractionHierarchy
+from navigation.routing.engine import PROFILES, RoutingEngine
+from navigation.routing.graph import RoutingGraph
+
+logger = logging.getLogger(__name__)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Return the process-wide RoutingEngine, loading the graph from ROUTING_GRAPH_PATH on
+    first use. Returns None when no graph is configured or it cannot be loaded, in which
+    case callers fall back to the external route providers.
+    """
+    global _engine
+    if _engine is None and settings.ROUTING_GRAPH_PATH:
+        with _engine_lock:
+            if _engine is None:
+                try:
+                    graph = RoutingGraph.load(settings.ROUTING_GRAPH_PATH)
+                except (OSError, ValueError, KeyError) as e:
+                    logger.error("Could not load routing graph %s: %s", settings.ROUTING_GRAPH_PATH, e)
+                    return None
+                _engine = RoutingEngine(graph, load_hierarchies(graph))
+    return _engine
+
+
+def load_hierarchies(graph):
+    """
+    Memory-map the contraction hierarchy of every profile found under ROUTING_CH_PATH
+    (one sub-directory per profile). Missing or stale hierarchies are skipped, and those
+    profiles are routed with A*.
+    """
+    hierarchies = {}
+    if not settings.ROUTING_CH_PATH:
+        return hierarchies
+
+    for profile in PROFILES:
+        directory = os.path.join(settings.ROUTING_CH_PATH, profile)
+        if not os.path.isdir(directory):
+            continue
+        try:
+            hierarchy = ContractionHierarchy.load(directory)
+        except (OSError, ValueError) as e:
+            logger.error("Could not load contraction hierarchy %s: %s", directory, e)
+            continue
+        if hierarchy.node_count != graph.node_count:
+            logger.error("Contraction hierarchy %s does not match the routing graph; rebuild it", directory)
+            continue
+        hierarchies[profile] = hierarchy
+    return hierarchies
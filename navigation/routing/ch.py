@@ -0,0 +1,274 @@
+# navigation/routing/ch.py
+import heapq
+import math
+import os
+
+import numpy as np
+
+from navigation.routing.engine import edge_weights
+
+
+class ContractionHierarchy:
+    """
+    Contraction hierarchy over a RoutingGraph for one wheelchair profile.
+
+    Nodes are contracted from least to most important; whenever removing a node would
+    lengthen a shortest path, a shortcut edge is added in its place. A query then only
+    ever moves "up" the hierarchy from both ends, which settles a few hundred nodes
+    instead of a whole city.
+
+    Every hierarchy edge is either an original graph edge (`edge_original` >= 0) or a
+    shortcut made of two hierarchy edges (`edge_first`, `edge_second`). The upward graph
+    holds edges towards more important nodes for the forward search; the downward graph
+    holds, per node, the edges arriving from more important nodes, reversed, for the
+    backward search. All arrays are plain .npy files so workers can memory-map them.
+    """
+
+    ARRAYS = ('up_indptr', 'up_target', 'up_weight', 'up_edge',
+              'down_indptr', 'down_target', 'down_weight', 'down_edge',
+              'edge_first', 'edge_second', 'edge_original')
+
+    # Witness searches give up after settling this many nodes; a missed witness only
+    # costs a redundant shortcut, never a wrong answer.
+    WITNESS_SETTLE_LIMIT = 60
+
+    def __init__(self, **arrays):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @property
+    def node_count(self):
+        return len(self.up_indptr) - 1
+
+    # Persistence --------------------------------------------------------------------
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Memory-map a saved hierarchy; pages are shared between every worker on the host."""
+        # Plain ndarray views over the mapping skip np.memmap's per-slice bookkeeping
+        return cls(**{name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode).view(np.ndarray)
+                      for name in cls.ARRAYS})
+
+    # Construction -------------------------------------------------------------------
+
+    @classmethod
+    def build(cls, graph, profile):
+        """
+        Contract every node of `graph` using the edge costs of `profile`. Impassable edges
+        are left out of the hierarchy entirely.
+        """
+        weights = edge_weights(graph, profile)
+        node_count = graph.node_count
+        sources = np.repeat(np.arange(node_count), np.diff(graph.indptr))
+
+        # Hierarchy edges; replaced edges are marked dead rather than removed
+        edge_source, edge_target, edge_weight = [], [], []
+        edge_first, edge_second, edge_original, alive = [], [], [], []
+
+        # Current (uncontracted) adjacency: node -> {neighbor: hierarchy edge}
+        outgoing = [dict() for _ in range(node_count)]
+        incoming = [dict() for _ in range(node_count)]
+
+        def add_edge(source, target, weight, first=-1, second=-1, original=-1):
+            existing = outgoing[source].get(target)
+            if existing is not None:
+                if edge_weight[existing] <= weight:
+                    return
+                alive[existing] = False
+            edge_id = len(edge_weight)
+            edge_source.append(source)
+            edge_target.append(target)
+            edge_weight.append(weight)
+            edge_first.append(first)
+            edge_second.append(second)
+            edge_original.append(original)
+            alive.append(True)
+            outgoing[source][target] = edge_id
+            incoming[target][source] = edge_id
+
+        for edge in np.flatnonzero(np.isfinite(weights)).tolist():
+            source, target = int(sources[edge]), int(graph.indices[edge])
+            if source != target:
+                add_edge(source, target, float(weights[edge]), original=edge)
+
+        def witness_distances(start, skip, targets, limit):
+            # Bounded Dijkstra from `start` that avoids `skip`
+            distances = {start: 0.0}
+            heap = [(0.0, start)]
+            remaining = set(targets)
+            settled = 0
+            while heap and remaining and settled < cls.WITNESS_SETTLE_LIMIT:
+                cost, node = heapq.heappop(heap)
+                if cost > distances.get(node, math.inf):
+                    continue
+                if cost > limit:
+                    break
+                remaining.discard(node)
+                settled += 1
+                for neighbor, edge_id in outgoing[node].items():
+                    if neighbor == skip:
+                        continue
+                    new_cost = cost + edge_weight[edge_id]
+                    if new_cost < distances.get(neighbor, math.inf):
+                        distances[neighbor] = new_cost
+                        heapq.heappush(heap, (new_cost, neighbor))
+            return distances
+
+        def shortcuts(node):
+            # Shortcuts needed to contract `node`: (source, target, weight, first, second)
+            needed = []
+            targets = outgoing[node]
+            if not targets:
+                return needed
+            max_out = max(edge_weight[edge_id] for edge_id in targets.values())
+            for source, in_edge in incoming[node].items():
+                in_weight = edge_weight[in_edge]
+                distances = witness_distances(source, node, targets.keys(), in_weight + max_out)
+                for target, out_edge in targets.items():
+                    if target == source:
+                        continue
+                    via = in_weight + edge_weight[out_edge]
+                    if distances.get(target, math.inf) > via:
+                        needed.append((source, target, via, in_edge, out_edge))
+            return needed
+
+        contracted_neighbors = [0] * node_count
+
+        def priority(node, needed):
+            # Edge difference plus a term that spreads contraction evenly over the map
+            removed = len(outgoing[node]) + len(incoming[node])
+            return len(needed) - removed + contracted_neighbors[node]
+
+        heap = [(priority(node, shortcuts(node)), node) for node in range(node_count)]
+        heapq.heapify(heap)
+        rank = np.zeros(node_count, dtype=np.int64)
+        contracted = 0
+
+        while heap:
+            _, node = heapq.heappop(heap)
+            # Lazy update: re-queue if the node got less attractive since it was queued
+            needed = shortcuts(node)
+            current = priority(node, needed)
+            if heap and current > heap[0][0]:
+                heapq.heappush(heap, (current, node))
+                continue
+
+            for source, target, weight, first, second in needed:
+                add_edge(source, target, weight, first=first, second=second)
+
+            neighbors = set(outgoing[node]) | set(incoming[node])
+            for neighbor in outgoing[node]:
+                del incoming[neighbor][node]
+            for neighbor in incoming[node]:
+                del outgoing[neighbor][node]
+            outgoing[node], incoming[node] = {}, {}
+            for neighbor in neighbors:
+                contracted_neighbors[neighbor] += 1
+
+            rank[node] = contracted
+            contracted += 1
+
+        alive = np.array(alive, dtype=bool)
+        ids = np.flatnonzero(alive)
+        edge_source = np.array(edge_source, dtype=np.int64)[ids]
+        edge_target = np.array(edge_target, dtype=np.int64)[ids]
+        weight = np.array(edge_weight, dtype=np.float64)[ids]
+
+        upward = rank[edge_target] > rank[edge_source]
+
+        def csr(nodes, targets, edge_weights_, edge_ids):
+            order = np.argsort(nodes, kind='stable')
+            indptr = np.zeros(node_count + 1, dtype=np.int64)
+            np.add.at(indptr, nodes + 1, 1)
+            return (np.cumsum(indptr), targets[order].astype(np.int32),
+                    edge_weights_[order], edge_ids[order].astype(np.int64))
+
+        up = csr(edge_source[upward], edge_target[upward], weight[upward], ids[upward])
+        down = csr(edge_target[~upward], edge_source[~upward], weight[~upward], ids[~upward])
+
+        return cls(
+            up_indptr=up[0], up_target=up[1], up_weight=up[2], up_edge=up[3],
+            down_indptr=down[0], down_target=down[1], down_weight=down[2], down_edge=down[3],
+            edge_first=np.array(edge_first, dtype=np.int64),
+            edge_second=np.array(edge_second, dtype=np.int64),
+            edge_original=np.array(edge_original, dtype=np.int64),
+        )
+
+    # Queries ------------------------------------------------------------------------
+
+    def _neighbors(self, indptr, target, weight, edge, node):
+        start, end = int(indptr[node]), int(indptr[node + 1])
+        return zip(target[start:end].tolist(), weight[start:end].tolist(), edge[start:end].tolist())
+
+    def shortest_path(self, source, target):
+        """
+        Bidirectional upward Dijkstra from `source` to `target`.
+
+        Returns:
+            list: Original graph edges along the cheapest path, or None if `target` is unreachable.
+        """
+        if source == target:
+            return []
+
+        searches = (
+            ({source: 0.0}, {}, [(0.0, source)], (self.up_indptr, self.up_target, self.up_weight, self.up_edge)),
+            ({target: 0.0}, {}, [(0.0, target)], (self.down_indptr, self.down_target, self.down_weight, self.down_edge)),
+        )
+        best, meeting = math.inf, None
+
+        while any(heap and heap[0][0] < best for _, _, heap, _ in searches):
+            for side, (distances, parents, heap, arrays) in enumerate(searches):
+                if not heap or heap[0][0] >= best:
+                    continue
+                cost, node = heapq.heappop(heap)
+                if cost > distances.get(node, math.inf):
+                    continue
+
+                other = searches[1 - side][0]
+                if node in other and cost + other[node] < best:
+                    best, meeting = cost + other[node], node
+
+                for neighbor, weight, edge_id in self._neighbors(*arrays, node):
+                    new_cost = cost + weight
+                    if new_cost < distances.get(neighbor, math.inf):
+                        distances[neighbor] = new_cost
+                        parents[neighbor] = (node, edge_id)
+                        heapq.heappush(heap, (new_cost, neighbor))
+
+        if meeting is None:
+            return None
+
+        forward_parents, backward_parents = searches[0][1], searches[1][1]
+        hierarchy_edges = []
+        node = meeting
+        while node != source:
+            node, edge_id = forward_parents[node]
+            hierarchy_edges.append(edge_id)
+        hierarchy_edges.reverse()
+        node = meeting
+        while node != target:
+            node, edge_id = backward_parents[node]
+            hierarchy_edges.append(edge_id)
+
+        edges = []
+        for edge_id in hierarchy_edges:
+            edges.extend(self.unpack(edge_id))
+        return edges
+
+    def unpack(self, edge_id):
+        """Expand a hierarchy edge into the original graph edges it stands for."""
+        edges, stack = [], [edge_id]
+        while stack:
+            edge_id = stack.pop()
+            original = int(self.edge_original[edge_id])
+            if original >= 0:
+                edges.append(original)
+            else:
+                stack.append(int(self.edge_second[edge_id]))
+                stack.append(int(self.edge_first[edge_id]))
+        return edges
@@ -0,0 +1,240 @@
+# navigation/routing/engine.py
+import heapq
+import math
+
+import numpy as np
+
+from navigation.routing.graph import SURFACES, FLAG_STEPS, FLAG_NO_WHEELCHAIR, EARTH_RADIUS
+
+FEET_PER_METER = 3.28084
+
+# Cost model per wheelchair profile. Edge cost = length * surface factor * grade factor;
+# edges steeper than max_incline, steps and wheelchair=no ways are impassable.
+PROFILES = {
+    'manual': {
+        'max_incline': 0.083,  # ADA 1:12 ramp
+        'uphill_penalty': 12.0,
+        'downhill_penalty': 4.0,
+        'surface_factors': {'unknown': 1.2, 'paved': 1.0, 'rough': 1.8, 'loose': 2.5, 'unpaved': 4.0},
+    },
+    'power': {
+        'max_incline': 0.12,
+        'uphill_penalty': 3.0,
+        'downhill_penalty': 2.0,
+        'surface_factors': {'unknown': 1.1, 'paved': 1.0, 'rough': 1.3, 'loose': 1.6, 'unpaved': 2.5},
+    },
+}
+DEFAULT_PROFILE = 'manual'
+
+
+def edge_weights(graph, profile):
+    """
+    Compute the traversal cost of every edge of `graph` for a profile, with np.inf
+    marking impassable edges. Costs are never below the edge length, which keeps
+    straight-line distance an admissible A* heuristic.
+    """
+    config = PROFILES[profile]
+    surface_factors = np.array([config['surface_factors'][name] for name in SURFACES], dtype=np.float64)
+
+    uphill = np.clip(graph.edge_incline, 0, None)
+    downhill = np.clip(-graph.edge_incline, 0, None)
+    grade_factor = 1 + config['uphill_penalty'] * uphill + config['downhill_penalty'] * downhill
+
+    weights = graph.edge_length * surface_factors[graph.edge_surface] * grade_factor
+    impassable = (np.abs(graph.edge_incline) > config['max_incline']) | \
+        ((graph.edge_flags & (FLAG_STEPS | FLAG_NO_WHEELCHAIR)) != 0)
+    return np.where(impassable, np.inf, weights)
+
+
+def bearing(lat1, lng1, lat2, lng2):
+    lat1, lat2 = math.radians(lat1), math.radians(lat2)
+    d_lng = math.radians(lng2 - lng1)
+    x = math.sin(d_lng) * math.cos(lat2)
+    y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(d_lng)
+    return (math.degrees(math.atan2(x, y)) + 360) % 360
+
+
+def turn_instruction(turn, name):
+    """Describe a change of heading (degrees, positive = right) onto a street."""
+    if abs(turn) < 20:
+        action = "Continue"
+    elif abs(turn) < 45:
+        action = "Turn slight right" if turn > 0 else "Turn slight left"
+    elif abs(turn) < 135:
+        action = "Turn right" if turn > 0 else "Turn left"
+    else:
+        action = "Turn sharp right" if turn > 0 else "Turn sharp left"
+    return f"{action} onto {name}" if name else action
+
+
+def heading_name(degrees):
+    return ['north', 'northeast', 'east', 'southeast', 'south', 'southwest', 'west', 'northwest'][int((degrees + 22.5) // 45) % 8]
+
+
+class RoutingEngine:
+    """
+    In-process wheelchair-aware router over a RoutingGraph.
+
+    Answers queries with per-profile edge costs and returns the route as the list of legs
+    `formatedOsmRoute` consumes: start/end location, points with elevation, distance in feet,
+    maneuver text, surface and steepest grade. Profiles with a precomputed contraction
+    hierarchy are answered from it; the others, and queries whose path crosses a penalized
+    edge, fall back to A*.
+    """
+
+    # Legs are split where the heading changes by more than this many degrees
+    TURN_THRESHOLD = 40
+
+    def __init__(self, graph, hierarchies=None):
+        self.graph = graph
+        self.hierarchies = hierarchies or {}
+        self._indptr = graph.indptr.tolist()
+        self._indices = graph.indices.tolist()
+        self._lat = graph.node_lat.tolist()
+        self._lng = graph.node_lng.tolist()
+        self._weights = {}
+
+    def weights(self, profile):
+        if profile not in self._weights:
+            self._weights[profile] = edge_weights(self.graph, profile).tolist()
+        return self._weights[profile]
+
+    def shortest_path(self, source, target, weights, edge_penalties=None):
+        """
+        A* search from `source` to `target`.
+
+        Parameters:
+            weights (list[float]): Cost per edge.
+            edge_penalties (dict): Optional {edge: multiplier} applied on top of `weights`.
+
+        Returns:
+            tuple: (nodes, edges) along the cheapest path, or (None, None) if unreachable.
+        """
+        indptr, indices, lat, lng = self._indptr, self._indices, self._lat, self._lng
+        target_lat, target_lng = lat[target], lng[target]
+        cos_lat = math.cos(math.radians(target_lat))
+        meters_per_degree = math.radians(1) * EARTH_RADIUS * 0.999
+
+        def heuristic(node):
+            return meters_per_degree * math.hypot(lat[node] - target_lat, (lng[node] - target_lng) * cos_lat)
+
+        best = {source: 0.0}
+        came_from = {}
+        heap = [(heuristic(source), 0.0, source)]
+        settled = set()
+
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == target:
+                break
+            if node in settled:
+                continue
+            settled.add(node)
+
+            for edge in range(indptr[node], indptr[node + 1]):
+                weight = weights[edge]
+                if edge_penalties and edge in edge_penalties:
+                    weight *= edge_penalties[edge]
+                if weight == math.inf:
+                    continue
+                neighbor = indices[edge]
+                new_cost = cost + weight
+                if new_cost < best.get(neighbor, math.inf):
+                    best[neighbor] = new_cost
+                    came_from[neighbor] = (node, edge)
+                    heapq.heappush(heap, (new_cost + heuristic(neighbor), new_cost, neighbor))
+        else:
+            return None, None
+
+        nodes, edges = [target], []
+        while nodes[-1] != source:
+            previous, edge = came_from[nodes[-1]]
+            nodes.append(previous)
+            edges.append(edge)
+        return nodes[::-1], edges[::-1]
+
+    def route(self, origin_lat, origin_lng, destination_lat, destination_lng,
+              profile=DEFAULT_PROFILE, edge_penalties=None):
+        """
+        Route between two coordinates.
+
+        Returns:
+            dict: {"points": [leg, ...]} in the OSM route service format, or None if either
+            end is off the network or the destination is unreachable for the profile.
+        """
+        source, _ = self.graph.nearest_node(origin_lat, origin_lng)
+        target, _ = self.graph.nearest_node(destination_lat, destination_lng)
+        if source is None or target is None:
+            return None
+
+        nodes, edges = None, None
+        hierarchy = self.hierarchies.get(profile)
+        if hierarchy is not None:
+            edges = hierarchy.shortest_path(source, target)
+            if edges is None:
+                return None
+            # The hierarchy is built without penalties; re-route with A* if the path is affected
+            if not (edge_penalties and any(edge in edge_penalties for edge in edges)):
+                nodes = [source] + [self._indices[edge] for edge in edges]
+        if nodes is None:
+            nodes, edges = self.shortest_path(source, target, self.weights(profile), edge_penalties)
+
+        if nodes is None or not edges:
+            return None
+        return {"points": self.build_legs(nodes, edges)}
+
+    def build_legs(self, nodes, edges):
+        graph = self.graph
+        lat, lng = self._lat, self._lng
+
+        # Group consecutive edges into legs, breaking on street-name changes and turns
+        groups = [[0]]
+        for i in range(1, len(edges)):
+            before = bearing(lat[nodes[i - 1]], lng[nodes[i - 1]], lat[nodes[i]], lng[nodes[i]])
+            after = bearing(lat[nodes[i]], lng[nodes[i]], lat[nodes[i + 1]], lng[nodes[i + 1]])
+            turn = (after - before + 540) % 360 - 180
+            same_street = graph.edge_name[edges[i]] == graph.edge_name[edges[i - 1]]
+            if same_street and abs(turn) <= self.TURN_THRESHOLD:
+                groups[-1].append(i)
+            else:
+                groups.append([i])
+
+        legs = []
+        previous_heading = None
+        for group in groups:
+            leg_nodes = nodes[group[0]:group[-1] + 2]
+            leg_edges = [edges[i] for i in group]
+
+            lengths = graph.edge_length[leg_edges]
+            surfaces = np.bincount(graph.edge_surface[leg_edges], weights=lengths, minlength=len(SURFACES))
+            inclines = graph.edge_incline[leg_edges]
+            name = graph.names[graph.edge_name[leg_edges[0]]]
+
+            heading = bearing(lat[leg_nodes[0]], lng[leg_nodes[0]], lat[leg_nodes[1]], lng[leg_nodes[1]])
+            if previous_heading is None:
+                maneuver = f"Head {heading_name(heading)}" + (f" on {name}" if name else "")
+            else:
+                maneuver = turn_instruction((heading - previous_heading + 540) % 360 - 180, name)
+            last = leg_nodes[-2], leg_nodes[-1]
+            previous_heading = bearing(lat[last[0]], lng[last[0]], lat[last[1]], lng[last[1]])
+
+            distance_feet = float(lengths.sum()) * FEET_PER_METER
+            points = [
+                {
+                    "latitude": lat[node],
+                    "longitude": lng[node],
+                    "elevation": None if np.isnan(graph.node_ele[node]) else round(float(graph.node_ele[node]), 2),
+                }
+                for node in leg_nodes
+            ]
+            legs.append({
+                "start_location": {"latitude": points[0]["latitude"], "longitude": points[0]["longitude"]},
+                "end_location": {"latitude": points[-1]["latitude"], "longitude": points[-1]["longitude"]},
+                "points": points,
+                "distance": {"text": f"{round(distance_feet)} ft", "value": distance_feet},
+                "maneuver": maneuver,
+                "surface": SURFACES[int(np.argmax(surfaces))],
+                "incline": round(float(np.abs(inclines).max()) * 100, 1),
+            })
+
+        return legs
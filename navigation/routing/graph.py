@@ -0,0 +1,313 @@
+# navigation/routing/graph.py
+import re
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+EARTH_RADIUS = 6371000  # meters
+
+# Highway types a wheelchair user may travel along
+PEDESTRIAN_HIGHWAYS = {
+    'footway', 'pedestrian', 'path', 'sidewalk', 'crossing', 'living_street', 'residential',
+    'service', 'unclassified', 'tertiary', 'tertiary_link', 'secondary', 'secondary_link',
+    'track', 'cycleway', 'corridor', 'elevator', 'steps',
+}
+EXCLUDED_ACCESS = {'no', 'private'}
+
+# Surface classes; the index is the code stored per edge
+SURFACES = ['unknown', 'paved', 'rough', 'loose', 'unpaved']
+SURFACE_CLASSES = {
+    'paved': 'paved', 'asphalt': 'paved', 'concrete': 'paved', 'concrete:plates': 'paved',
+    'paving_stones': 'paved', 'metal': 'paved', 'wood': 'paved', 'rubber': 'paved',
+    'sett': 'rough', 'cobblestone': 'rough', 'unhewn_cobblestone': 'rough', 'concrete:lanes': 'rough',
+    'compacted': 'loose', 'fine_gravel': 'loose', 'gravel': 'loose', 'pebblestone': 'loose',
+    'unpaved': 'unpaved', 'dirt': 'unpaved', 'earth': 'unpaved', 'ground': 'unpaved',
+    'grass': 'unpaved', 'sand': 'unpaved', 'mud': 'unpaved', 'woodchips': 'unpaved',
+}
+
+# Edge flags
+FLAG_STEPS = 1
+FLAG_NO_WHEELCHAIR = 2
+
+# Grade assumed for ways only tagged incline=up/down
+DEFAULT_TAGGED_INCLINE = 0.05
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """Vectorized great-circle distance in meters."""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+
+def segment_projection(lat, lng, lat1, lng1, lat2, lng2):
+    """
+    Vectorized projection of (lat, lng) onto the segments (lat1, lng1)-(lat2, lng2), on a
+    local plane centred on the point; accurate for segments up to a few hundred meters.
+
+    Returns:
+        tuple: (distance in meters to each segment, fraction 0..1 along each segment of the closest point).
+    """
+    meters_per_degree = np.radians(1) * EARTH_RADIUS
+    cos_lat = np.cos(np.radians(lat))
+    ax = (np.asarray(lng1) - lng) * cos_lat * meters_per_degree
+    ay = (np.asarray(lat1) - lat) * meters_per_degree
+    dx = (np.asarray(lng2) - lng) * cos_lat * meters_per_degree - ax
+    dy = (np.asarray(lat2) - lat) * meters_per_degree - ay
+    t = np.clip(-(ax * dx + ay * dy) / np.maximum(dx * dx + dy * dy, 1e-9), 0, 1)
+    return np.hypot(ax + t * dx, ay + t * dy), t
+
+
+def segment_distance(lat, lng, lat1, lng1, lat2, lng2):
+    """Vectorized distance in meters from (lat, lng) to the segments (lat1, lng1)-(lat2, lng2)."""
+    return segment_projection(lat, lng, lat1, lng1, lat2, lng2)[0]
+
+
+def parse_incline(value):
+    """Parse an OSM incline tag into a signed grade (0.05 == 5%), or None."""
+    if not value:
+        return None
+    value = value.strip().lower()
+    if value == 'up':
+        return DEFAULT_TAGGED_INCLINE
+    if value == 'down':
+        return -DEFAULT_TAGGED_INCLINE
+    match = re.match(r'^(-?\d+(?:\.\d+)?)\s*(%|°)?$', value)
+    if not match:
+        return None
+    number, unit = float(match.group(1)), match.group(2)
+    if unit == '°':
+        return float(np.tan(np.radians(number)))
+    return number / 100
+
+
+class RoutingGraph:
+    """
+    Pedestrian/sidewalk network in compressed sparse row (CSR) form.
+
+    Outgoing edges of node `n` are `indptr[n]:indptr[n + 1]`; for each edge the arrays hold
+    its target node, length in meters, signed grade in the direction of travel, surface code,
+    flags and street-name index. Node arrays hold coordinates and (optional) elevation.
+    """
+
+    ARRAYS = ('node_lat', 'node_lng', 'node_ele', 'indptr', 'indices',
+              'edge_length', 'edge_incline', 'edge_surface', 'edge_flags', 'edge_name')
+
+    def __init__(self, node_lat, node_lng, node_ele, indptr, indices, edge_length,
+                 edge_incline, edge_surface, edge_flags, edge_name, names):
+        self.node_lat = node_lat
+        self.node_lng = node_lng
+        self.node_ele = node_ele
+        self.indptr = indptr
+        self.indices = indices
+        self.edge_length = edge_length
+        self.edge_incline = edge_incline
+        self.edge_surface = edge_surface
+        self.edge_flags = edge_flags
+        self.edge_name = edge_name
+        self.names = list(names)
+
+        self._build_node_index()
+
+    @property
+    def node_count(self):
+        return len(self.node_lat)
+
+    @property
+    def edge_count(self):
+        return len(self.indices)
+
+    # Spatial lookup -----------------------------------------------------------------
+
+    CELL_SIZE = 0.002  # degrees, roughly 200 m
+
+    def _cell_keys(self, lat, lng):
+        row = np.floor((np.asarray(lat) + 90) / self.CELL_SIZE).astype(np.int64)
+        col = np.floor((np.asarray(lng) + 180) / self.CELL_SIZE).astype(np.int64)
+        return row * 1_000_000 + col
+
+    def _build_node_index(self):
+        keys = self._cell_keys(self.node_lat, self.node_lng)
+        self._node_order = np.argsort(keys, kind='stable')
+        self._sorted_keys = keys[self._node_order]
+
+    def _nodes_around(self, lat, lng):
+        # Nodes in the grid cell of (lat, lng) and its eight neighbours
+        key = int(self._cell_keys(lat, lng))
+        candidates = []
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                cell = key + d_row * 1_000_000 + d_col
+                start = np.searchsorted(self._sorted_keys, cell, side='left')
+                end = np.searchsorted(self._sorted_keys, cell, side='right')
+                candidates.append(self._node_order[start:end])
+        return np.concatenate(candidates)
+
+    def nearest_node(self, lat, lng, max_distance=250):
+        """
+        Return (node, distance_m) of the graph node nearest to (lat, lng), or (None, None)
+        when no node lies within the surrounding grid cells or `max_distance`.
+        """
+        candidates = self._nodes_around(lat, lng)
+        if candidates.size == 0:
+            return None, None
+
+        distances = haversine(lat, lng, self.node_lat[candidates], self.node_lng[candidates])
+        best = int(np.argmin(distances))
+        if distances[best] > max_distance:
+            return None, None
+        return int(candidates[best]), float(distances[best])
+
+    def edges_near(self, lat, lng, radius):
+        """
+        Return the ids of the edges passing within `radius` meters of (lat, lng), in both
+        directions of travel.
+        """
+        candidates = self._nodes_around(lat, lng)
+        if candidates.size == 0:
+            return []
+
+        starts, ends = self.indptr[candidates], self.indptr[candidates + 1]
+        edges = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+        if edges.size == 0:
+            return []
+        sources = np.repeat(candidates, ends - starts)
+        targets = self.indices[edges]
+
+        near = segment_distance(lat, lng, self.node_lat[sources], self.node_lng[sources],
+                                self.node_lat[targets], self.node_lng[targets]) <= radius
+
+        result = set(edges[near].tolist())
+        for source, target in zip(sources[near].tolist(), targets[near].tolist()):
+            # The reverse edge starts at `target`, which may lie outside the candidate cells
+            start, end = self.indptr[target], self.indptr[target + 1]
+            result.update((start + np.flatnonzero(self.indices[start:end] == source)).tolist())
+        return sorted(result)
+
+    # Persistence --------------------------------------------------------------------
+
+    def save(self, path):
+        np.savez_compressed(path, names=np.array(self.names, dtype=object),
+                            **{name: getattr(self, name) for name in self.ARRAYS})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=True) as data:
+            arrays = {name: data[name] for name in cls.ARRAYS}
+            names = data['names'].tolist()
+        return cls(names=names, **arrays)
+
+    # Construction -------------------------------------------------------------------
+
+    @classmethod
+    def from_edges(cls, node_lat, node_lng, node_ele, sources, targets, incline, surface, flags, name, names):
+        """
+        Build a CSR graph from per-edge arrays. Every edge is added in both directions,
+        with the grade negated on the reverse edge.
+        """
+        sources, targets = np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+        length = haversine(node_lat[sources], node_lng[sources], node_lat[targets], node_lng[targets])
+
+        incline = np.asarray(incline, dtype=np.float64)
+        # Fill unknown grades from node elevations where both ends have one
+        rise = node_ele[targets] - node_ele[sources]
+        from_elevation = np.where(length > 0, rise / np.maximum(length, 1e-9), 0.0)
+        incline = np.where(np.isnan(incline), np.nan_to_num(from_elevation, nan=0.0), incline)
+
+        all_sources = np.concatenate((sources, targets))
+        all_targets = np.concatenate((targets, sources))
+        order = np.argsort(all_sources, kind='stable')
+
+        def both(values):
+            values = np.asarray(values)
+            return np.concatenate((values, values))[order]
+
+        indptr = np.zeros(len(node_lat) + 1, dtype=np.int64)
+        np.add.at(indptr, all_sources + 1, 1)
+        indptr = np.cumsum(indptr)
+
+        return cls(
+            node_lat=np.asarray(node_lat, dtype=np.float64),
+            node_lng=np.asarray(node_lng, dtype=np.float64),
+            node_ele=np.asarray(node_ele, dtype=np.float32),
+            indptr=indptr,
+            indices=all_targets[order].astype(np.int32),
+            edge_length=both(length).astype(np.float32),
+            edge_incline=np.concatenate((incline, -incline))[order].astype(np.float32),
+            edge_surface=both(surface).astype(np.uint8),
+            edge_flags=both(flags).astype(np.uint8),
+            edge_name=both(name).astype(np.int32),
+            names=names,
+        )
+
+    @classmethod
+    def from_osm(cls, path):
+        """
+        Build the graph from an OSM XML extract (.osm).
+
+        The file is read twice: first for the walkable ways and the node ids they use,
+        then for the coordinates of only those nodes, to keep memory bounded.
+        """
+        ways = []
+        used_nodes = set()
+        for _, element in ET.iterparse(path, events=('end',)):
+            if element.tag == 'way':
+                tags = {tag.get('k'): tag.get('v') for tag in element.iter('tag')}
+                node_refs = [int(nd.get('ref')) for nd in element.iter('nd')]
+                if cls._is_walkable(tags) and len(node_refs) > 1:
+                    ways.append((node_refs, tags))
+                    used_nodes.update(node_refs)
+            if element.tag in ('node', 'way', 'relation'):
+                element.clear()
+
+        node_ids, lat, lng, ele = [], [], [], []
+        for _, element in ET.iterparse(path, events=('end',)):
+            if element.tag == 'node' and int(element.get('id')) in used_nodes:
+                tags = {tag.get('k'): tag.get('v') for tag in element.iter('tag')}
+                node_ids.append(int(element.get('id')))
+                lat.append(float(element.get('lat')))
+                lng.append(float(element.get('lon')))
+                try:
+                    ele.append(float(tags.get('ele')))
+                except (TypeError, ValueError):
+                    ele.append(np.nan)
+            if element.tag in ('node', 'way', 'relation'):
+                element.clear()
+
+        node_index = {node_id: index for index, node_id in enumerate(node_ids)}
+        names = ['']
+        name_index = {'': 0}
+
+        sources, targets, incline, surface, flags, name = [], [], [], [], [], []
+        for node_refs, tags in ways:
+            refs = [node_index[ref] for ref in node_refs if ref in node_index]
+            way_name = tags.get('name') or tags.get('highway', '')
+            if way_name not in name_index:
+                name_index[way_name] = len(names)
+                names.append(way_name)
+
+            way_incline = parse_incline(tags.get('incline'))
+            way_surface = SURFACES.index(SURFACE_CLASSES.get(tags.get('surface'), 'unknown'))
+            way_flags = (FLAG_STEPS if tags.get('highway') == 'steps' else 0) | \
+                (FLAG_NO_WHEELCHAIR if tags.get('wheelchair') == 'no' else 0)
+
+            for source, target in zip(refs[:-1], refs[1:]):
+                sources.append(source)
+                targets.append(target)
+                incline.append(np.nan if way_incline is None else way_incline)
+                surface.append(way_surface)
+                flags.append(way_flags)
+                name.append(name_index[way_name])
+
+        return cls.from_edges(
+            np.array(lat), np.array(lng), np.array(ele), sources, targets,
+            incline, surface, flags, name, names,
+        )
+
+    @staticmethod
+    def _is_walkable(tags):
+        if tags.get('highway') not in PEDESTRIAN_HIGHWAYS:
+            return False
+        if tags.get('foot') in EXCLUDED_ACCESS:
+            return False
+        return tags.get('access') not in EXCLUDED_ACCESS or tags.get('foot') in ('yes', 'designated')
@@ -44,6 +44,65 @@ class MarkerCreateSerializer(serializers.ModelSerializer):
         return obj.location.x if obj.location else None
 
 
+class NearbyMarkerSerializer(MarkerCreateSerializer):
+    distance = serializers.SerializerMethodField()
+
+    class Meta(MarkerCreateSerializer.Meta):
+        fields = ['id'] + MarkerCreateSerializer.Meta.fields + ['confirmation_count', 'distance']
+
+    def get_distance(self, obj):
+        return round(obj.distance, 1) if getattr(obj, 'distance', None) is not None else None
+
+
+class MarkerSyncItemSerializer(serializers.Serializer):
+    client_id = serializers.UUIDField()
+    transit_id = serializers.UUIDField()
+    segment_number = serializers.IntegerField(default=1)
+    marker_category = serializers.ChoiceField(choices=TransitMarker.MARKER_CATEGORIES)
+    marker_type = serializers.ChoiceField(choices=TransitMarker.MARKER_TYPES)
+    marker_lat = serializers.FloatField(min_value=-90, max_value=90)
+    marker_lng = serializers.FloatField(min_value=-180, max_value=180)
+
+
+class MarkerSyncSerializer(serializers.Serializer):
+    markers = MarkerSyncItemSerializer(many=True, allow_empty=False)
+
+    def validate_markers(self, markers):
+        max_batch = self.context.get('max_batch')
+        if max_batch and len(markers) > max_batch:
+            raise serializers.ValidationError(f"At most {max_batch} markers per request.")
+
+        client_ids = [marker['client_id'] for marker in markers]
+        if len(set(client_ids)) != len(client_ids):
+            raise serializers.ValidationError("client_id values must be unique within a batch.")
+
+        # One query for every transit referenced by the batch
+        transit_ids = {marker['transit_id'] for marker in markers}
+        known = set(Transit.objects.filter(id__in=transit_ids).values_list('id', flat=True))
+        missing = sorted(str(transit_id) for transit_id in transit_ids - known)
+        if missing:
+            raise serializers.ValidationError(f"Unknown transit_id: {', '.join(missing)}")
+        return markers
+
+
+class TransitPositionItemSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    recorded_at = serializers.DateTimeField(default=timezone.now)
+    accuracy = serializers.FloatField(min_value=0, required=False, allow_null=True)
+
+
+class TransitPositionSerializer(serializers.Serializer):
+    transit_id = serializers.UUIDField()
+    positions = TransitPositionItemSerializer(many=True, allow_empty=False)
+
+    def validate_positions(self, positions):
+        max_batch = self.context.get('max_batch')
+        if max_batch and len(positions) > max_batch:
+            raise serializers.ValidationError(f"At most {max_batch} positions per request.")
+        return positions
+
+
 class MarkerSearchInputSerializer(serializers.Serializer):
     segment_start_lat = serializers.DecimalField(max_digits=10, decimal_places=7)
     segment_start_lng = serializers.DecimalField(max_digits=10, decimal_places=7)
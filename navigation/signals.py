@@ -0,0 +1,68 @@
+# navigation/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from geo.models import Place
+from navigation.barriers import barrier_overlay
+from navigation.corridors import transit_corridors
+from navigation.models import TransitMarker, TransitMarkerRemoval
+from navigation.push import push_transit_event
+from navigation.route_cache import route_cache
+from navigation.tiles import marker_versions, place_versions
+
+
+def barrier_reported(marker):
+    """Push a new barrier to the in-progress transits whose route corridor it lies in."""
+    for transit_id, distance in transit_corridors.transits_near(marker.location.y, marker.location.x):
+        if transit_id == str(marker.transit_id):
+            continue  # Reported by this transit's own user
+        push_transit_event(transit_id, 'barrier', {
+            "id": str(marker.id),
+            "marker_type": marker.marker_type,
+            "latitude": marker.location.y,
+            "longitude": marker.location.x,
+            "distance": round(distance, 1),
+        })
+
+
+def markers_changed(markers, deleted=False, created=False):
+    """
+    Propagate marker changes to the in-memory and cached views of markers: the barrier
+    overlay, cached routes and map tiles, and for new barriers the transits nearby. Called
+    from the model signals, and directly by bulk writes (bulk_create, update) that bypass them.
+    """
+    for marker in markers:
+        if created and marker.marker_category == 'Barrier' and marker.status == 'detected' and marker.location:
+            barrier_reported(marker)
+        if marker.marker_category == 'Barrier':
+            if deleted:
+                barrier_overlay.marker_deleted(marker)
+            else:
+                barrier_overlay.marker_changed(marker)
+            if marker.location:
+                # Cached routes through this area may now lead into (or needlessly avoid) the barrier
+                route_cache.invalidate_near(marker.location.y, marker.location.x)
+        if marker.location:
+            marker_versions.invalidate_near(marker.location.y, marker.location.x)
+
+
+@receiver(post_save, sender=TransitMarker)
+def marker_saved(sender, instance, created=False, **kwargs):
+    markers_changed([instance], created=created)
+
+
+@receiver(post_delete, sender=TransitMarker)
+def marker_deleted(sender, instance, **kwargs):
+    # Tombstone for the change feed; merge_duplicates has already written a 'merged' one
+    TransitMarkerRemoval.objects.bulk_create(
+        [TransitMarkerRemoval(marker_id=instance.id, reason='deleted', location=instance.location)],
+        ignore_conflicts=True,
+    )
+    markers_changed([instance], deleted=True)
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def place_tiles_changed(sender, instance, **kwargs):
+    if instance.location:
+        place_versions.invalidate_near(instance.location.y, instance.location.x)
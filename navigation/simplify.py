@@ -0,0 +1,114 @@
+# navigation/simplify.py
+import math
+
+import numpy as np
+
+EARTH_RADIUS = 6371000  # meters
+MAX_ZOOM = 22
+
+
+def to_local_meters(coordinates):
+    """
+    Project (lat, lng) rows onto a local equirectangular plane in meters, which is
+    accurate enough over the length of a route segment.
+    """
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    lat0 = np.radians(coordinates[:, 0].mean())
+    y = np.radians(coordinates[:, 0]) * EARTH_RADIUS
+    x = np.radians(coordinates[:, 1]) * EARTH_RADIUS * np.cos(lat0)
+    return np.column_stack((x, y))
+
+
+def zoom_tolerance(zoom, latitude):
+    """
+    Return the ground size in meters of one screen pixel at a web-map zoom level,
+    which is the largest error that stays invisible at that zoom.
+    """
+    return 156543.03392 * math.cos(math.radians(latitude)) / (2 ** zoom)
+
+
+def requested_tolerance(request, latitude):
+    """
+    Return the simplification tolerance in meters asked for by the client, or None.
+
+    `?simplify=<meters>` gives the tolerance directly; `?zoom=<level>` derives it from the
+    pixel size at that map zoom. Missing or malformed values disable simplification.
+    """
+    try:
+        if request.query_params.get('simplify') is not None:
+            tolerance = float(request.query_params['simplify'])
+            return tolerance if tolerance > 0 else None
+        if request.query_params.get('zoom') is not None:
+            zoom = min(max(int(request.query_params['zoom']), 0), MAX_ZOOM)
+            return zoom_tolerance(zoom, latitude)
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def douglas_peucker(points, tolerance):
+    """
+    Douglas-Peucker simplification of a projected polyline.
+
+    Parameters:
+        points (numpy.ndarray): (N, 2) array of planar coordinates in meters.
+        tolerance (float): Maximum allowed deviation in meters.
+
+    Returns:
+        numpy.ndarray: Boolean mask of the points to keep. The first and last points are always kept.
+    """
+    count = len(points)
+    keep = np.zeros(count, dtype=bool)
+    if count == 0:
+        return keep
+    keep[0] = keep[-1] = True
+
+    stack = [(0, count - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        # Distance of every interior point to the segment start-end, in one vectorized step.
+        # The projection is clamped to the segment: measured to the infinite line, the far
+        # end of an out-and-back spur or a switchback lies on it and would be dropped
+        chord = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        chord_squared = chord[0] ** 2 + chord[1] ** 2
+        if chord_squared == 0:
+            t = np.zeros(len(offsets))
+        else:
+            t = np.clip((offsets[:, 0] * chord[0] + offsets[:, 1] * chord[1]) / chord_squared, 0.0, 1.0)
+        distances = np.hypot(offsets[:, 0] - t * chord[0], offsets[:, 1] - t * chord[1])
+
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return keep
+
+
+def simplify_segments(response_data, tolerance):
+    """
+    Simplify every segment's points in place. Segment start/end points, which are the
+    maneuver vertices of the route, are always kept.
+
+    Returns:
+        dict: The tolerance used and the point counts before and after simplification.
+    """
+    before = after = 0
+    for segment in response_data.get("segments", []):
+        points = segment.get("points") or []
+        before += len(points)
+        if len(points) > 2:
+            projected = to_local_meters([(point["latitude"], point["longitude"]) for point in points])
+            keep = douglas_peucker(projected, tolerance)
+            segment["points"] = [point for point, kept in zip(points, keep) if kept]
+        after += len(segment.get("points") or [])
+
+    summary = {"tolerance_m": round(tolerance, 2), "points_before": before, "points_after": after}
+    response_data["simplification"] = summary
+    return summary
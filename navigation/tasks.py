@@ -0,0 +1,77 @@
+# navigation/tasks.py
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.core.cache import cache
+from django.utils import timezone
+
+from navigation import geohash
+from navigation.markers import find_duplicates, merge_cells, merge_duplicates
+from navigation.models import TransitMarker
+
+CONSOLIDATION_WATERMARK_KEY = 'marker-consolidation:watermark'
+
+# Markers younger than this are left for the next run, so rows from transactions still in
+# flight when the job reads can't slip in behind the watermark
+CONSOLIDATION_LAG = timedelta(minutes=1)
+
+
+def cell_area(cells):
+    """The union of geohash cells as one MultiPolygon, for a single indexed spatial filter."""
+    polygons = []
+    for cell in cells:
+        min_lat, min_lng, max_lat, max_lng = geohash.bounds(cell)
+        polygons.append(Polygon.from_bbox((min_lng, min_lat, max_lng, max_lat)))
+    return MultiPolygon(*polygons, srid=4326)
+
+
+@shared_task
+def consolidate_duplicate_markers():
+    """
+    Merge near-duplicate detected markers reported since the previous run.
+
+    Only markers created after the watermark are loaded. The earlier markers they may
+    duplicate are fetched with one spatial query on the cells around the new markers and
+    the merge window before them, so a run costs in proportion to the new markers rather
+    than the window. The watermark of the last processed creation time is kept in the
+    shared cache (if it is lost, the whole window is processed again, which is harmless).
+    """
+    distance = settings.MARKER_MERGE_DISTANCE
+    window = timedelta(hours=settings.MARKER_MERGE_WINDOW_HOURS)
+    until = timezone.now() - CONSOLIDATION_LAG
+    since = cache.get(CONSOLIDATION_WATERMARK_KEY) or until - window
+    if since >= until:
+        return {"merged": 0, "clusters": 0}
+
+    detected = TransitMarker.objects.filter(status='detected', location__isnull=False)
+    new_markers = [
+        (marker_id, marker_type, location.y, location.x, created_at)
+        for marker_id, marker_type, location, created_at in detected.filter(
+            created_at__gt=since,
+            created_at__lte=until,
+        ).order_by('created_at').values_list('id', 'marker_type', 'location', 'created_at')
+    ]
+    if not new_markers:
+        cache.set(CONSOLIDATION_WATERMARK_KEY, until, None)
+        return {"merged": 0, "clusters": 0}
+
+    cells = set()
+    for _, _, lat, lng, _ in new_markers:
+        cells.update(merge_cells(lat, lng, distance)[1])
+    candidates = [
+        (marker_id, marker_type, location.y, location.x, created_at)
+        for marker_id, marker_type, location, created_at in detected.filter(
+            marker_type__in={marker[1] for marker in new_markers},
+            created_at__gte=new_markers[0][4] - window,
+            created_at__lte=since,
+            location__within=cell_area(cells),
+        ).order_by('created_at').values_list('id', 'marker_type', 'location', 'created_at')
+    ]
+
+    duplicates = find_duplicates(candidates + new_markers, distance, window, since=since)
+    merged = merge_duplicates(duplicates)
+
+    cache.set(CONSOLIDATION_WATERMARK_KEY, until, None)
+    return {"merged": merged, "clusters": len(duplicates), "new": len(new_markers), "candidates": len(candidates)}
@@ -1,3 +1,152 @@
-from django.test import TestCase
+import tempfile
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase
+
+from navigation import polyline, simplify
+from navigation.routing.ch import ContractionHierarchy
+from navigation.routing.engine import RoutingEngine
+from navigation.routing.graph import RoutingGraph
+
+
+class PolylineTests(SimpleTestCase):
+    # Example from Google's encoded polyline algorithm documentation
+    GOOGLE_POINTS = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    GOOGLE_ENCODED = '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+
+    def test_encode_matches_reference(self):
+        self.assertEqual(polyline.encode(self.GOOGLE_POINTS), self.GOOGLE_ENCODED)
+
+    def test_decode_matches_reference(self):
+        np.testing.assert_allclose(polyline.decode(self.GOOGLE_ENCODED), self.GOOGLE_POINTS)
+
+    def test_round_trip(self):
+        rng = np.random.default_rng(6)
+        points = np.column_stack((rng.uniform(-89, 89, 500), rng.uniform(-179, 179, 500)))
+        decoded = polyline.decode(polyline.encode(points))
+        self.assertEqual(decoded.shape, points.shape)
+        np.testing.assert_allclose(decoded, points, atol=0.5e-5 + 1e-9)
+
+    def test_decode_many_restarts_each_polyline(self):
+        first = [(40.7, -74.0), (40.71, -74.01)]
+        second = [(51.5, -0.12)]
+        decoded = polyline.decode_many([polyline.encode(first), '', polyline.encode(second)])
+        self.assertEqual([len(points) for points in decoded], [2, 0, 1])
+        np.testing.assert_allclose(decoded[0], first)
+        np.testing.assert_allclose(decoded[2], second)
+
+    def test_empty(self):
+        self.assertEqual(polyline.encode([]), '')
+        self.assertEqual(polyline.decode_many([]), [])
+        self.assertEqual(len(polyline.decode('')), 0)
+
+
+class DouglasPeuckerTests(SimpleTestCase):
+    def test_keeps_endpoints(self):
+        points = np.column_stack((np.arange(10.0), np.zeros(10)))
+        keep = simplify.douglas_peucker(points, 1.0)
+        self.assertEqual(keep.tolist(), [True] + [False] * 8 + [True])
+
+    def test_drops_noise_below_tolerance(self):
+        rng = np.random.default_rng(8)
+        points = np.column_stack((np.linspace(0, 1000, 200), rng.uniform(-0.5, 0.5, 200)))
+        keep = simplify.douglas_peucker(points, 1.0)
+        self.assertEqual(np.flatnonzero(keep).tolist(), [0, 199])
+
+    def test_keeps_deviation_above_tolerance(self):
+        points = np.array([[0, 0], [50, 0.5], [100, 5], [150, 0.5], [200, 0]], dtype=float)
+        keep = simplify.douglas_peucker(points, 2.0)
+        self.assertEqual(np.flatnonzero(keep).tolist(), [0, 2, 4])
+
+    def test_keeps_tip_of_out_and_back_spur(self):
+        # The tip lies on the line through the endpoints but far beyond the segment
+        # between them, so only its distance to the segment shows the deviation
+        points = np.array([[0, 0], [100, 0], [500, 0], [100, 0.1], [200, 0]], dtype=float)
+        keep = simplify.douglas_peucker(points, 5.0)
+        self.assertTrue(keep[2])
+
+    def test_simplify_segments_counts(self):
+        straight = [{"latitude": 40.0, "longitude": -74.0 + i * 1e-4} for i in range(20)]
+        short = [{"latitude": 40.0, "longitude": -74.0}, {"latitude": 40.001, "longitude": -74.0}]
+        response_data = {"segments": [{"points": straight}, {"points": short}, {}]}
+
+        summary = simplify.simplify_segments(response_data, 1.0)
+
+        self.assertEqual(summary, {"tolerance_m": 1.0, "points_before": 22, "points_after": 4})
+        self.assertEqual(response_data["simplification"], summary)
+        self.assertEqual(response_data["segments"][0]["points"], [straight[0], straight[-1]])
+        self.assertEqual(response_data["segments"][1]["points"], short)
+
+
+class ContractionHierarchyTests(SimpleTestCase):
+    SIZE = 12
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(10)
+        size = cls.SIZE
+        ids = np.arange(size * size).reshape(size, size)
+        # A jittered street grid plus two nodes joined only to each other
+        lat = np.append(40.7 + np.repeat(np.arange(size), size) * 0.0009, [40.8, 40.8001])
+        lng = np.append(-74.0 + np.tile(np.arange(size), size) * 0.0012, [-74.0, -74.0])
+        lat[:size * size] += rng.normal(0, 0.0001, size * size)
+        lng[:size * size] += rng.normal(0, 0.0001, size * size)
+        ele = np.cumsum(rng.normal(0, 0.3, len(lat)))
+
+        sources, targets = [size * size], [size * size + 1]
+        for row in range(size):
+            for col in range(size):
+                if col + 1 < size:
+                    sources.append(ids[row, col])
+                    targets.append(ids[row, col + 1])
+                if row + 1 < size and rng.random() < 0.8:
+                    sources.append(ids[row, col])
+                    targets.append(ids[row + 1, col])
+        count = len(sources)
+        # Steps on about a tenth of the edges make them impassable
+        flags = (rng.random(count) < 0.1).astype(int)
+
+        cls.graph = RoutingGraph.from_edges(
+            lat, lng, ele, sources, targets, np.full(count, np.nan),
+            rng.integers(0, 5, count), flags, np.zeros(count, int), [''],
+        )
+        cls.hierarchy = ContractionHierarchy.build(cls.graph, 'manual')
+        cls.engine = RoutingEngine(cls.graph, {'manual': cls.hierarchy})
+        cls.weights = cls.engine.weights('manual')
+        cls.pairs = [tuple(int(node) for node in pair) for pair in rng.integers(0, len(lat), (150, 2))]
+
+    def assert_matches_astar(self, hierarchy):
+        reachable = 0
+        for source, target in self.pairs:
+            edges = hierarchy.shortest_path(source, target)
+            nodes, astar_edges = self.engine.shortest_path(source, target, self.weights)
+            self.assertEqual(edges is None, nodes is None, (source, target))
+            if edges is None:
+                continue
+            reachable += 1
+
+            node = source
+            for edge in edges:
+                self.assertTrue(self.graph.indptr[node] <= edge < self.graph.indptr[node + 1])
+                node = int(self.graph.indices[edge])
+            self.assertEqual(node, target)
+
+            self.assertAlmostEqual(
+                sum(self.weights[edge] for edge in edges),
+                sum(self.weights[edge] for edge in astar_edges),
+                places=6,
+            )
+        # Both outcomes must actually be exercised
+        self.assertTrue(0 < reachable < len(self.pairs))
+
+    def test_matches_astar(self):
+        self.assert_matches_astar(self.hierarchy)
+
+    def test_save_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.hierarchy.save(directory)
+            loaded = ContractionHierarchy.load(directory)
+            self.assertEqual(loaded.node_count, self.hierarchy.node_count)
+            self.assert_matches_astar(loaded)
+            del loaded
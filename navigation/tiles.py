@@ -0,0 +1,265 @@
+# navigation/tiles.py
+import hashlib
+import math
+
+from django.conf import settings
+from django.contrib.gis.geos import Polygon
+from django.core.cache import cache
+from django.db import connection
+
+from geo.models import Place
+from navigation.models import TransitMarker
+
+MAX_ZOOM = 22
+
+
+def tile_bounds(z, x, y):
+    """Return (west, south, east, north) in degrees of a web-mercator (slippy map) tile."""
+    n = 2 ** z
+
+    def latitude(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360 - 180, latitude(y + 1), (x + 1) / n * 360 - 180, latitude(y)
+
+
+def tile_for(lat, lng, z):
+    """Return the (x, y) of the zoom-`z` tile containing (lat, lng)."""
+    n = 2 ** z
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lng + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_covering(west, south, east, north, z):
+    """Return the (x, y) of every zoom-`z` tile intersecting a bounding box."""
+    min_x, min_y = tile_for(north, west, z)
+    max_x, max_y = tile_for(south, east, z)
+    return [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)]
+
+
+# Markers are clustered on a GRID_SIZE x GRID_SIZE grid aligned to the tile, so clusters never
+# straddle tile edges and neighbouring tiles can be cached independently
+CLUSTER_SQL = """
+    SELECT count(*) AS count,
+           ST_Y(ST_Centroid(ST_Collect(location))) AS latitude,
+           ST_X(ST_Centroid(ST_Collect(location))) AS longitude,
+           count(*) FILTER (WHERE marker_category = 'Barrier') AS barriers,
+           count(*) FILTER (WHERE marker_category = 'Facility') AS facilities,
+           CASE WHEN count(*) = 1 THEN min(id::text) END AS marker_id
+    FROM {table}
+    WHERE status = 'detected'
+      AND location && ST_MakeEnvelope(%s, %s, %s, %s, 4326)
+    GROUP BY ST_SnapToGrid(location, %s, %s, %s, %s)
+"""
+
+
+class TileVersions:
+    """
+    Version counters for cached tiles, kept in the shared Django cache.
+
+    A tile carries the version of its ancestor tile at `version_zoom` (or of itself when
+    coarser). A change at a coordinate bumps the versions of the tiles containing it at every
+    zoom up to `version_zoom`, which invalidates exactly the cached tiles that could show it.
+    """
+
+    def __init__(self, namespace, version_zoom=12):
+        self.namespace = namespace
+        self.version_zoom = version_zoom
+
+    def _key(self, z, x, y):
+        if z > self.version_zoom:
+            shift = z - self.version_zoom
+            z, x, y = self.version_zoom, x >> shift, y >> shift
+        return f"{self.namespace}:version:{z}:{x}:{y}"
+
+    def get(self, z, x, y):
+        return cache.get(self._key(z, x, y), 0)
+
+    def invalidate_near(self, lat, lng):
+        """Invalidate every cached tile, at any zoom, containing (lat, lng)."""
+        for z in range(self.version_zoom + 1):
+            version_key = self._key(z, *tile_for(lat, lng, z))
+            cache.add(version_key, 0, None)
+            try:
+                cache.incr(version_key)
+            except ValueError:
+                cache.set(version_key, 1, None)
+
+
+marker_versions = TileVersions('marker-tiles', settings.MARKER_TILE_VERSION_ZOOM)
+place_versions = TileVersions('place-tiles', settings.MARKER_TILE_VERSION_ZOOM)
+
+
+class MarkerTiles:
+    """
+    Marker clusters and markers per map tile, cached per tile key.
+
+    Below `cluster_max_zoom` markers are aggregated in SQL onto a grid aligned to the tile;
+    from that zoom on, the individual markers are returned. Cached tiles are invalidated
+    through `marker_versions` when markers change.
+    """
+
+    GRID_SIZE = 8
+
+    def __init__(self, cluster_max_zoom=16, ttl=3600):
+        self.cluster_max_zoom = cluster_max_zoom
+        self.ttl = ttl
+
+    def get(self, z, x, y):
+        """Return the tile's payload: {"zoom", "x", "y", "clustered", "clusters"|"markers"}."""
+        key = f"marker-tiles:{marker_versions.get(z, x, y)}:{z}:{x}:{y}"
+        payload = cache.get(key)
+        if payload is None:
+            payload = self.build(z, x, y)
+            cache.set(key, payload, self.ttl)
+        return payload
+
+    def build(self, z, x, y):
+        west, south, east, north = tile_bounds(z, x, y)
+        payload = {"zoom": z, "x": x, "y": y, "clustered": z < self.cluster_max_zoom}
+
+        if payload["clustered"]:
+            size_x, size_y = (east - west) / self.GRID_SIZE, (north - south) / self.GRID_SIZE
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    CLUSTER_SQL.format(table=TransitMarker._meta.db_table),
+                    [west, south, east, north, west, south, size_x, size_y],
+                )
+                columns = [column[0] for column in cursor.description]
+                payload["clusters"] = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return payload
+
+        markers = TransitMarker.objects.filter(
+            status='detected',
+            location__bboverlaps=Polygon.from_bbox((west, south, east, north)),
+        ).values_list('id', 'marker_category', 'marker_type', 'segment_number', 'confirmation_count', 'location', 'created_at')
+        payload["markers"] = [
+            {
+                "id": str(marker_id),
+                "marker_category": category,
+                "marker_type": marker_type,
+                "segment_number": segment_number,
+                "confirmation_count": confirmation_count,
+                "latitude": location.y,
+                "longitude": location.x,
+                "created_at": created_at.isoformat(),
+            }
+            for marker_id, category, marker_type, segment_number, confirmation_count, location, created_at in markers
+        ]
+        return payload
+
+
+marker_tiles = MarkerTiles(
+    cluster_max_zoom=settings.MARKER_CLUSTER_MAX_ZOOM,
+    ttl=settings.MARKER_TILE_CACHE_TTL,
+)
+
+
+# Vector tile layers: source table, row filter, the attributes a client may select (name -> SQL
+# expression) and the ones sent by default
+MVT_LAYERS = {
+    'markers': {
+        'table': TransitMarker._meta.db_table,
+        'where': "t.status = 'detected'",
+        'versions': marker_versions,
+        'min_zoom': 10,
+        'fields': {
+            'id': 't.id::text',
+            'category': 't.marker_category',
+            'type': 't.marker_type',
+            'segment_number': 't.segment_number',
+            'confirmations': 't.confirmation_count',
+            'created_at': 'extract(epoch from t.created_at)::bigint',
+        },
+        'default_fields': ('id', 'category', 'type'),
+    },
+    'places': {
+        'table': Place._meta.db_table,
+        'where': 'TRUE',
+        'versions': place_versions,
+        'min_zoom': 12,
+        'fields': {
+            'id': 't.id::text',
+            'name': 't.name',
+            'address': 't.address',
+            'zip_code': 't.zip_code',
+        },
+        'default_fields': ('id', 'name'),
+    },
+}
+
+MVT_SQL = """
+    WITH bounds AS (SELECT ST_TileEnvelope(%s, %s, %s) AS tile)
+    SELECT ST_AsMVT(tile_rows, %s, {extent}, 'geom')
+    FROM (
+        SELECT ST_AsMVTGeom(ST_Transform(t.location, 3857), bounds.tile, {extent}, {buffer}, true) AS geom{fields}
+        FROM {table} t, bounds
+        WHERE t.location && ST_Transform(bounds.tile, 4326)
+          AND {where}
+    ) tile_rows
+"""
+
+
+class VectorTiles:
+    """
+    Mapbox Vector Tiles rendered by PostGIS (ST_AsMVT), cached per layer, attribute set and tile.
+
+    Cached tiles are stored with an ETag (a hash of the tile bytes) and share the version
+    counters of the JSON tiles, so marker and place changes invalidate them as well.
+    """
+
+    EXTENT = 4096
+    BUFFER = 64
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+
+    def fields(self, layer, requested=None):
+        """
+        Return the attribute names to render for `layer`: the requested subset of its
+        whitelist, or its defaults. Raises ValueError for unknown attributes.
+        """
+        config = MVT_LAYERS[layer]
+        if not requested:
+            return tuple(config['default_fields'])
+        names = tuple(sorted({name.strip() for name in requested.split(',') if name.strip()}))
+        unknown = [name for name in names if name not in config['fields']]
+        if unknown:
+            raise ValueError(f"Unknown fields for layer '{layer}': {', '.join(unknown)}")
+        return names
+
+    def get(self, layer, z, x, y, fields):
+        """
+        Returns:
+            tuple: (tile bytes, etag).
+        """
+        version = MVT_LAYERS[layer]['versions'].get(z, x, y)
+        key = f"mvt:{layer}:{','.join(fields)}:{version}:{z}:{x}:{y}"
+        entry = cache.get(key)
+        if entry is None:
+            data = self.render(layer, z, x, y, fields)
+            entry = (data, hashlib.md5(data).hexdigest())
+            cache.set(key, entry, self.ttl)
+        return entry
+
+    def render(self, layer, z, x, y, fields):
+        config = MVT_LAYERS[layer]
+        if z < config['min_zoom']:
+            return b''
+
+        sql = MVT_SQL.format(
+            extent=self.EXTENT,
+            buffer=self.BUFFER,
+            table=config['table'],
+            where=config['where'],
+            fields=''.join(f", {config['fields'][name]} AS {name}" for name in fields),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [z, x, y, layer])
+            row = cursor.fetchone()
+        return bytes(row[0]) if row and row[0] else b''
+
+
+vector_tiles = VectorTiles(ttl=settings.MARKER_TILE_CACHE_TTL)
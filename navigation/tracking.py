@@ -0,0 +1,378 @@
+# navigation/tracking.py
+import atexit
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.db import DatabaseError, OperationalError
+
+from navigation.corridors import route_key
+from navigation.executor import submit
+from navigation.push import push_transit_event
+from navigation.routing.graph import haversine, segment_projection
+
+logger = logging.getLogger(__name__)
+
+
+def progress_key(transit_id):
+    return f'transit-progress:{transit_id}'
+
+
+def progress_lock_key(transit_id):
+    return f'transit-progress-lock:{transit_id}'
+
+
+class TrackingBusy(Exception):
+    """Another worker held a transit's progress lock for longer than the wait allowed."""
+
+
+class RouteGeometry:
+    """A transit's route polyline with cumulative distances, for snapping positions onto it."""
+
+    def __init__(self, points):
+        if len(points) == 1:
+            points = points * 2
+        self.lat = np.array([point[0] for point in points], dtype=np.float64)
+        self.lng = np.array([point[1] for point in points], dtype=np.float64)
+        self.segment_numbers = [point[2] for point in points]
+        self.cumulative = np.concatenate(([0.0], np.cumsum(haversine(self.lat[:-1], self.lng[:-1], self.lat[1:], self.lng[1:]))))
+
+    @property
+    def length(self):
+        return float(self.cumulative[-1])
+
+    def snap(self, lat, lng, leg=None, window=25, tolerance=50):
+        """
+        Snap a position onto the route.
+
+        The legs just behind and ahead of the previous match (`leg`) are searched first, so
+        a position costs a few dozen segment projections; the whole route is searched when
+        there is no previous match or nothing in the window is within `tolerance` meters.
+
+        Returns:
+            tuple: (leg index, segment number, distance from the route in meters, meters along the route).
+        """
+        legs = len(self.lat) - 1
+        start, end = (max(leg - 2, 0), min(leg + window, legs)) if leg is not None else (0, legs)
+        distances, fractions = segment_projection(
+            lat, lng, self.lat[start:end], self.lng[start:end], self.lat[start + 1:end + 1], self.lng[start + 1:end + 1]
+        )
+        best = int(np.argmin(distances))
+        if distances[best] > tolerance and (start, end) != (0, legs):
+            return self.snap(lat, lng, None, window, tolerance)
+
+        index = start + best
+        progress = self.cumulative[index] + fractions[best] * (self.cumulative[index + 1] - self.cumulative[index])
+        return index, self.segment_numbers[index], float(distances[best]), float(progress)
+
+
+class PositionTracker:
+    """
+    Ingests live positions of in-progress transits.
+
+    The running state of each transit (last position, snapped leg, distance travelled,
+    off-route streak) lives in the shared Django cache, so consecutive updates may reach any
+    worker; a short lock in the same cache keeps two batches of one transit from being
+    applied at once and overwriting each other's state. Raw positions go to a per-transit ring buffer in process memory and are written
+    with one bulk INSERT once `flush_size` positions are pending or the oldest has waited
+    `flush_interval` seconds; a background thread checks the latter even when no positions
+    arrive, and the buffers are flushed when the process exits. Route geometries are kept
+    in a small per-process LRU.
+    """
+
+    def __init__(self, buffer_size=120, flush_size=500, flush_interval=5, off_route_distance=40,
+                 off_route_count=3, max_speed=15, route_ttl=21600, max_routes=2048, lock_timeout=10, lock_wait=3):
+        self.buffer_size = buffer_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.off_route_distance = off_route_distance
+        self.off_route_count = off_route_count
+        self.max_speed = max_speed
+        self.route_ttl = route_ttl
+        self.max_routes = max_routes
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+
+        self._buffers = {}  # transit id -> deque of pending TransitPosition rows
+        self._pending = 0
+        self._oldest = None  # monotonic time of the oldest pending position
+        self._flushing = False  # A flush is scheduled on the pool
+        self._write_lock = threading.Lock()  # Serializes the bulk INSERTs
+        self._timer = None
+        self._stats = {'written': 0, 'evicted': 0, 'lost': 0}
+        self._routes = OrderedDict()  # transit id -> RouteGeometry or None
+        self._lock = threading.Lock()
+
+    def _route(self, transit_id):
+        with self._lock:
+            if transit_id in self._routes:
+                self._routes.move_to_end(transit_id)
+                return self._routes[transit_id]
+
+        points = cache.get(route_key(transit_id))
+        route = RouteGeometry(points) if points else None
+        with self._lock:
+            self._routes[transit_id] = route
+            while len(self._routes) > self.max_routes:
+                self._routes.popitem(last=False)
+        return route
+
+    def state(self, transit_id):
+        return cache.get(progress_key(transit_id))
+
+    def start(self, transit):
+        """Begin tracking a transit that was just started."""
+        cache.set(progress_key(transit.id), {
+            "user_id": transit.user_id,
+            "leg": None,
+            "segment_number": None,
+            "distance_from_route": None,
+            "progress": None,
+            "distance": 0.0,
+            "first_at": None,
+            "last_at": None,
+            "last_position": None,
+            "off_route": False,
+            "off_route_streak": 0,
+        }, self.route_ttl)
+
+    @contextmanager
+    def _locked(self, transit_id):
+        """Hold the transit's progress lock; raises TrackingBusy after `lock_wait` seconds."""
+        key, token = progress_lock_key(transit_id), uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_wait
+        # The timeout frees the lock of a worker that died holding it
+        while not cache.add(key, token, self.lock_timeout):
+            if time.monotonic() > deadline:
+                raise TrackingBusy(transit_id)
+            time.sleep(0.02)
+        try:
+            yield
+        finally:
+            if cache.get(key) == token:
+                cache.delete(key)
+
+    def record(self, transit_id, positions):
+        """
+        Apply a batch of positions, oldest first, to a transit's state.
+
+        The state is read and written back under the transit's progress lock, so concurrent
+        batches on different workers are applied one after the other.
+
+        Parameters:
+            transit_id (str): The transit.
+            positions (list[dict]): {"latitude", "longitude", "recorded_at", "accuracy"} items.
+
+        Returns:
+            dict: The updated state, or None if the transit is no longer tracked.
+
+        Raises:
+            TrackingBusy: The lock could not be taken within `lock_wait` seconds.
+        """
+        with self._locked(transit_id):
+            state = cache.get(progress_key(transit_id))
+            if state is None:
+                return None
+            rows = self._apply(transit_id, state, positions)
+            cache.set(progress_key(transit_id), state, self.route_ttl)
+        self._buffer(transit_id, rows)
+        return state
+
+    def _apply(self, transit_id, state, positions):
+        from navigation.models import TransitPosition
+
+        route = self._route(transit_id)
+        rows = []
+        for position in sorted(positions, key=lambda item: item["recorded_at"]):
+            lat, lng, recorded_at = position["latitude"], position["longitude"], position["recorded_at"].timestamp()
+            if state["last_at"] is not None and recorded_at <= state["last_at"]:
+                continue  # Resent or out-of-order position
+
+            if state["last_position"] is not None:
+                step = float(haversine(lat, lng, *state["last_position"]))
+                # GPS jumps faster than any wheelchair are ignored for the distance, not the position
+                if step <= self.max_speed * (recorded_at - state["last_at"]):
+                    state["distance"] += step
+            state["first_at"] = state["first_at"] or recorded_at
+            state["last_at"] = recorded_at
+            state["last_position"] = (lat, lng)
+
+            if route is not None:
+                leg, segment_number, distance_from_route, progress = route.snap(lat, lng, state["leg"], tolerance=self.off_route_distance)
+                off_route = distance_from_route > self.off_route_distance
+                state["off_route_streak"] = state["off_route_streak"] + 1 if off_route else 0
+                if not off_route:
+                    state.update(leg=leg, segment_number=segment_number, progress=progress)
+                state["distance_from_route"] = distance_from_route
+                self._route_status_changed(transit_id, state, lat, lng)
+
+            rows.append(TransitPosition(
+                transit_id=transit_id,
+                location=Point(lng, lat, srid=4326),
+                accuracy=position.get("accuracy"),
+                recorded_at=position["recorded_at"],
+                segment_number=state["segment_number"],
+                distance_from_route=state["distance_from_route"],
+                progress=state["progress"],
+                off_route=state["off_route"],
+            ))
+
+        return rows
+
+    def _route_status_changed(self, transit_id, state, lat, lng):
+        # A streak of far positions is needed to go off route, one close position to return
+        off_route = state["off_route_streak"] >= self.off_route_count or (state["off_route"] and state["off_route_streak"] > 0)
+        if off_route == state["off_route"]:
+            return
+        state["off_route"] = off_route
+        push_transit_event(transit_id, 'off_route' if off_route else 'on_route', {
+            "latitude": lat,
+            "longitude": lng,
+            "distance_from_route": round(state["distance_from_route"], 1),
+            "segment_number": state["segment_number"],
+        })
+
+    def summary(self, transit_id, state):
+        route = self._route(transit_id)
+        length = route.length if route is not None else None
+        return {
+            "segment_number": state["segment_number"],
+            "distance_from_route": round(state["distance_from_route"], 1) if state["distance_from_route"] is not None else None,
+            "off_route": state["off_route"],
+            "distance": round(state["distance"], 1),
+            "progress": round(state["progress"], 1) if state["progress"] is not None else None,
+            "progress_ratio": round(state["progress"] / length, 3) if state["progress"] is not None and length else None,
+            "remaining": round(length - state["progress"], 1) if state["progress"] is not None and length is not None else None,
+        }
+
+    def finish(self, transit_id):
+        """
+        Stop tracking a transit; returns its final state, or None if it was never tracked.
+        Its buffered positions are written on the pool, without waiting for other transits'.
+        """
+        transit_id = str(transit_id)
+        try:
+            with self._locked(transit_id):
+                state = cache.get(progress_key(transit_id))
+                cache.delete(progress_key(transit_id))
+        except TrackingBusy:
+            # A batch still holds the lock; the transit is over either way
+            state = cache.get(progress_key(transit_id))
+            cache.delete(progress_key(transit_id))
+        with self._lock:
+            self._routes.pop(transit_id, None)
+            buffer = self._buffers.pop(transit_id, None)
+            if buffer:
+                self._pending -= len(buffer)
+        if buffer:
+            submit(self._write, {transit_id: buffer})
+        return state
+
+    # Ring buffers -------------------------------------------------------------------
+
+    def _buffer(self, transit_id, rows, requeued=False):
+        if not rows:
+            return
+        with self._lock:
+            buffer = self._buffers.setdefault(transit_id, deque(maxlen=self.buffer_size))
+            dropped = max(len(buffer) + len(rows) - self.buffer_size, 0)
+            if requeued:
+                # Rows from a failed flush are older than anything buffered since; a bounded
+                # deque built from both keeps the newest
+                self._buffers[transit_id] = deque([*rows, *buffer], maxlen=self.buffer_size)
+            else:
+                buffer.extend(rows)
+            self._pending += len(rows) - dropped
+            self._oldest = self._oldest or time.monotonic()
+            self._stats['evicted'] += dropped
+            self._start_timer()
+            if not requeued:
+                self._flush_if_due()
+        if dropped:
+            logger.warning("Ring buffer of transit %s full, dropped its %d oldest positions", transit_id, dropped)
+
+    def _flush_if_due(self):
+        # Called with the lock held
+        due = self._pending >= self.flush_size or (
+            self._oldest is not None and time.monotonic() - self._oldest >= self.flush_interval
+        )
+        if due and not self._flushing:
+            submit(self._scheduled_flush)
+            self._flushing = True
+
+    def _start_timer(self):
+        # Called with the lock held; one flush thread per process, started with the first position
+        if self._timer is None:
+            self._timer = threading.Thread(target=self._run_timer, name='position-flush', daemon=True)
+            self._timer.start()
+            atexit.register(self.flush)
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                with self._lock:
+                    self._flush_if_due()
+            except RuntimeError:
+                return  # The executor has shut down; the atexit flush takes over
+
+    def _scheduled_flush(self):
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                self._flushing = False
+
+    def flush(self):
+        """Write every pending position with one bulk INSERT."""
+        with self._lock:
+            buffers = self._buffers
+            self._buffers, self._pending, self._oldest = {}, 0, None
+        self._write(buffers)
+
+    def _write(self, buffers):
+        """
+        Insert the rows of {transit id: buffer}. Rows are put back in their buffers when the
+        database is unreachable, and counted as lost when the insert itself is rejected.
+        """
+        from navigation.models import TransitPosition
+
+        rows = [row for buffer in buffers.values() for row in buffer]
+        if not rows:
+            return
+        with self._write_lock:
+            try:
+                TransitPosition.objects.bulk_create(rows, batch_size=self.flush_size)
+                with self._lock:
+                    self._stats['written'] += len(rows)
+            except OperationalError as e:
+                logger.error("Could not store %d transit positions, keeping them for the next flush: %s", len(rows), e)
+                for transit_id, buffer in buffers.items():
+                    self._buffer(transit_id, list(buffer), requeued=True)
+            except DatabaseError as e:
+                with self._lock:
+                    self._stats['lost'] += len(rows)
+                logger.error("Could not store %d transit positions, dropping them: %s", len(rows), e)
+
+    def stats(self):
+        """Counts of positions written, evicted from full ring buffers and lost to failed inserts."""
+        with self._lock:
+            return dict(self._stats, pending=self._pending)
+
+
+position_tracker = PositionTracker(
+    buffer_size=settings.POSITION_BUFFER_SIZE,
+    flush_size=settings.POSITION_FLUSH_SIZE,
+    flush_interval=settings.POSITION_FLUSH_INTERVAL,
+    off_route_distance=settings.OFF_ROUTE_DISTANCE,
+    off_route_count=settings.OFF_ROUTE_COUNT,
+    max_speed=settings.POSITION_MAX_SPEED,
+    route_ttl=settings.TRANSIT_ROUTE_TTL,
+)
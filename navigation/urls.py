@@ -1,19 +1,30 @@
 
 from django.urls import path
-from django.views.decorators.cache import cache_page
 
 from navigation.views import RouteAPI, TransitCreateAPI, TransitCancelAPI, TransitCompleteAPI, \
-    MarkerCreateAPI, MarkerSearchAPI, MarkerStatusUpdateAPI
+    MarkerCreateAPI, MarkerSearchAPI, MarkerStatusUpdateAPI, MarkerNearbyAPI, MarkerClusterAPI, MarkerClusterTileAPI, \
+    VectorTileAPI, MarkerSyncAPI, MarkerChangesAPI, TransitPositionAPI, TransitEventTicketAPI, \
+    ProviderStatusAPI
 
 urlpatterns = [
-    path('route/', cache_page(60 * 15)(RouteAPI.as_view()), name='route'),
+    path('route/', RouteAPI.as_view(), name='route'),
+    path('status/providers/', ProviderStatusAPI.as_view(), name='navigation-provider-status'),
 
     path('transits/create/', TransitCreateAPI.as_view(), name='create-navigation-transit'),
+    path('transits/positions/', TransitPositionAPI.as_view(), name='navigation-transit-positions'),
+    path('transits/<uuid:transit_id>/events/ticket/', TransitEventTicketAPI.as_view(), name='navigation-transit-event-ticket'),
     path('transits/complete/', TransitCompleteAPI.as_view(), name='complete-navigation-transit'),
     path('transits/cancel/', TransitCancelAPI.as_view(), name='cancel-navigation-transit'),
 
     path('markers/create/', MarkerCreateAPI.as_view(), name='create-marker'),
+    path('markers/sync/', MarkerSyncAPI.as_view(), name='sync-markers'),
+    path('markers/changes/', MarkerChangesAPI.as_view(), name='marker-changes'),
     path('markers/search/', MarkerSearchAPI.as_view(), name='marker-search'),
+    path('markers/nearby/', MarkerNearbyAPI.as_view(), name='marker-nearby'),
+    path('markers/clusters/', MarkerClusterAPI.as_view(), name='marker-clusters'),
+    path('markers/clusters/<int:z>/<int:x>/<int:y>/', MarkerClusterTileAPI.as_view(), name='marker-cluster-tile'),
+
+    path('tiles/<str:layer>/<int:z>/<int:x>/<int:y>.mvt', VectorTileAPI.as_view(), name='vector-tile'),
     path('markers/update/', MarkerStatusUpdateAPI.as_view(), name='marker-update'),
 
 ]
@@ -1,21 +1,42 @@
 # navigation/views.py
+from django.conf import settings
+from django.http import HttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from rest_framework import generics, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
 from account.models import WheelchairRelation
-from .models import Route, Place, Transit, TransitMarker, TransitMarkerTracking
+from .models import Place, Transit, TransitMarker, TransitMarkerTracking
 from .serializers import RouteSerializer, TransitCreateSerializer, TransitCancelSerializer, \
     TransitCompleteSerializer, \
     TransitMarkerTrackingSerializer, MarkerCreateSerializer, MarkerSearchSerializer, \
-    MarkerSearchInputSerializer, RouteResponseSerializer, TransitCreateResponseSerializer, TransitCancelResponseSerializer
+    MarkerSearchInputSerializer, TransitCreateResponseSerializer, TransitCancelResponseSerializer, \
+    NearbyMarkerSerializer, MarkerSyncSerializer, TransitPositionSerializer
 
 from .utils import Utils  # Import your utility class
 from navigation.utils import Utils
+from .geocache import place_cache
+from .route_cache import route_cache
+from .executor import submit
+from . import polyline
+from .route_format import requested_geometry, compact_segments, GEOMETRY_POLYLINE
+from .simplify import requested_tolerance, simplify_segments
+from .routing import get_engine
+from .barriers import barrier_overlay
+from .route_markers import requested_marker_buffer, markers_along_route
+from .corridors import transit_corridors
+from .route_assembly import route_segments, nearest_curated_route
+from .places import upsert_place
+from .tracking import position_tracker, TrackingBusy
+from .push import push_transit_event, issue_ticket, END_EVENT
+from .markers import nearest_marker, nearest_markers, sync_markers, marker_changes, decode_cursor
+from .tiles import marker_tiles, vector_tiles, tiles_covering, MAX_ZOOM, MVT_LAYERS
+from concurrent.futures import wait, as_completed
+from .providers import provider_client, deadline_in
 
-import requests
 import logging
 from geo.models import Place, Country, State, City
 import os
@@ -31,40 +52,50 @@ import re
 # Define the constant at the top of the view file
 WHEEL_CHAIR_SPEED = 1.2  # speed in appropriate units, e.g., meters per second
 
-def get_place_details(lat, lon):
-    """Function to reverse geocode latitude and longitude using Google Places API and return place details with structured address components."""
+# Returned instead of place details when the geocoder could not be asked or did not answer,
+# as opposed to answering that nothing is there; never cached
+GEOCODER_UNAVAILABLE = object()
+
+def get_place_details(lat, lon, deadline=None):
+    """
+    Function to reverse geocode latitude and longitude using Google Places API and return place details with structured address components.
+    Returns GEOCODER_UNAVAILABLE on a timeout, an open circuit breaker, a spent `deadline`, a non-200 reply or a Google error status.
+    """
     url = "https://maps.googleapis.com/maps/api/geocode/json"
     params = {
         "latlng": f"{lat},{lon}",
         "key": os.getenv('GOOGLE_MPA_KEY'),
     }
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        data = response.json()
-        if data.get("results"):
-            # Retrieve detailed place info from the first result
-            place = data["results"][0]
-            full_address = place["formatted_address"]
-            location = place["geometry"]["location"]
-
-            # Parse full address into name and address parts
-            parts = full_address.split(",")
-            name = parts[0].strip() if len(parts) > 0 else ""
-            address = parts[1].strip() if len(parts) > 1 else ""
-
-            # Extract city, state, country, and zip code from address components
-            city, state, country, zip_code = None, None, None, None
-            for component in place["address_components"]:
-                if "locality" in component["types"]:
-                    city = component["long_name"]
-                elif "administrative_area_level_1" in component["types"]:
-                    state = component["long_name"]
-                elif "country" in component["types"]:
-                    country = component["long_name"]
-                elif "postal_code" in component["types"]:
-                    zip_code = component["long_name"]
-
-            return name, address, full_address, location["lat"], location["lng"], city, state, country, zip_code
+    response = provider_client.get('google', url, params=params, deadline=deadline)
+    if response is None or response.status_code != 200:
+        return GEOCODER_UNAVAILABLE
+    data = response.json()
+    if data.get("status") not in ("OK", "ZERO_RESULTS"):
+        return GEOCODER_UNAVAILABLE
+    if data.get("results"):
+        # Retrieve detailed place info from the first result
+        place = data["results"][0]
+        full_address = place["formatted_address"]
+        location = place["geometry"]["location"]
+
+        # Parse full address into name and address parts
+        parts = full_address.split(",")
+        name = parts[0].strip() if len(parts) > 0 else ""
+        address = parts[1].strip() if len(parts) > 1 else ""
+
+        # Extract city, state, country, and zip code from address components
+        city, state, country, zip_code = None, None, None, None
+        for component in place["address_components"]:
+            if "locality" in component["types"]:
+                city = component["long_name"]
+            elif "administrative_area_level_1" in component["types"]:
+                state = component["long_name"]
+            elif "country" in component["types"]:
+                country = component["long_name"]
+            elif "postal_code" in component["types"]:
+                zip_code = component["long_name"]
+
+        return name, address, full_address, location["lat"], location["lng"], city, state, country, zip_code
     return None, None, None, None, None, None, None, None, None
 
 def find_country(country_value):
@@ -133,10 +164,10 @@ def find_city(city_value, state_code=None, country_code=None):
     except City.DoesNotExist:
         return None
 
-def find_or_create_place(name, address, country, state, city, zip_code, lat, lng, radius=5):
+def find_or_create_place(name, address, country, state, city, zip_code, lat, lng):
     """
-    Finds a Place instance based on proximity to a point and matching address components.
-    If not found, creates a new Place instance.
+    Finds the Place in the geohash cell of a point, creating it if there is none.
+    Concurrent calls for the same spot resolve to the same row, see navigation.places.
 
     Parameters:
         name (str): Name of the place.
@@ -147,35 +178,11 @@ def find_or_create_place(name, address, country, state, city, zip_code, lat, lng
         zip_code (str): Zip code of the place.
         lat (float or Decimal): Latitude.
         lng (float or Decimal): Longitude.
-        radius (float): Radius in meters to search nearby places.
 
     Returns:
         Place: The Place instance found or created.
     """
-    user_point = Point(lng, lat, srid=4326)
-
-    # Attempt to find a matching place nearby
-    place = Place.objects.annotate(distance=Distance('location', user_point)).filter(
-        location__distance_lte=(user_point, D(m=radius)),
-        country=country,
-        state=state,
-        city=city,
-        zip_code=zip_code
-    ).order_by('distance').first()
-
-    if not place:
-        place = Place.objects.create(
-            name=name,
-            address=address,
-            country=country,
-            state=state,
-            city=city,
-            zip_code=zip_code,
-            location=user_point
-        )
-        print("New Place created with ID:", place.id)
-
-    return place
+    return upsert_place(name, address, country, state, city, zip_code, lat, lng)
 
 def find_place_by_coordinates(lat, lng, radius=5):  # radius in meters
     """
@@ -194,7 +201,8 @@ def find_place_by_coordinates(lat, lng, radius=5):  # radius in meters
 
         # Search within `radius` meters using PostGIS distance lookup
         place = (
-            Place.objects.annotate(distance=Distance('location', user_location))
+            Place.objects.select_related('city', 'state', 'country')
+            .annotate(distance=Distance('location', user_location))
             .filter(location__distance_lte=(user_location, D(m=radius)))
             .order_by('distance')
             .first()
@@ -205,13 +213,38 @@ def find_place_by_coordinates(lat, lng, radius=5):  # radius in meters
         logger.error(f"Error in finding place by coordinates: {e}")
         return None
 
-def get_place(origin_lat, origin_lng):
+def get_place(origin_lat, origin_lng, deadline=None):
+    """
+    Resolves coordinates to a Place, going through the geohash cell cache before
+    the database proximity search and the Google reverse geocode, which gives up at
+    `deadline` (see providers.deadline_in).
+    """
+    hit, place_id = place_cache.get(origin_lat, origin_lng)
+    if hit:
+        if place_id is None:
+            return None
+        place = Place.objects.select_related('city', 'state', 'country').filter(id=place_id).first()
+        if place:
+            return place
+
+    place = resolve_place(origin_lat, origin_lng, deadline)
+    if place is GEOCODER_UNAVAILABLE:
+        # A transient provider failure must not be remembered as "nothing here"
+        return None
+    place_cache.set(origin_lat, origin_lng, place.id if place else None)
+    return place
+
+def resolve_place(origin_lat, origin_lng, deadline=None):
 
     place_by_coordinates = find_place_by_coordinates(origin_lat, origin_lng)
 
     if not place_by_coordinates:
-        place_details = get_place_details(origin_lat, origin_lng)
+        place_details = get_place_details(origin_lat, origin_lng, deadline)
+        if place_details is GEOCODER_UNAVAILABLE:
+            return GEOCODER_UNAVAILABLE
         name, origin_address, origin_full_address, origin_lat, origin_lng, origin_city, origin_state, origin_country, origin_zip = place_details
+        if name is None:
+            return None
         # Process Place
 
         # print('name', name);
@@ -282,6 +315,13 @@ class RouteAPI(generics.GenericAPIView):
 
         return points
 
+    @staticmethod
+    def format_place(place):
+        return {
+            "id": place.id,
+            "address": place.display_address or place.build_display_address()
+        }
+
     @staticmethod
     def formatted_duration(duration):
         # Convert total duration in seconds to minutes and seconds
@@ -309,69 +349,45 @@ class RouteAPI(generics.GenericAPIView):
         else:
             return f"{round(distance, 2)} meters"
 
-    def formate_self_route(self, route, transitId):
-        # Find segments associated with the route
-        segments = Segments.objects.filter(route=route).order_by("segment_number")
-        # Find all segment points associated with the segments of the route
-        segment_points = SegmentPoints.objects.filter(route=route).order_by("segment__segment_number", "point_number")
-
-
-        total_duration = 0;
-        total_distance = 0;
-        origin_location = {
-            "lat": None,
-            "lng": None
-        }
-
-        destination_location = {
-            "lat": None,
-            "lng": None
-        }
+    def formate_self_route(self, route, transitId, origin_place=None, destination_place=None):
+        # Segments with their points already grouped and ordered, in one query
+        segments = route_segments(route)
 
+        total_duration = 0
+        total_distance = 0
         segment_response = []
 
         for segment in segments:
-            points = []
+            points = segment["points"]
 
-            # Gather points for the current segment
-            for segmentPoint in segment_points:
-                if segment.id == segmentPoint.segment.id and route.id == segmentPoint.route.id:
-                    points.append({"latitude": segmentPoint.lat, "longitude": segmentPoint.lng})
+            total_duration += segment["duration"]
+            total_distance += segment["distance"]
 
-            if segment.segment_number == 1:
-                origin_location = points[0]
-
-            if segment.segment_number == len(segments):
-                destination_location = points[-1]
-
-            total_duration += segment.duration
-            total_distance += segment.distance
-
-            clean_instructions = re.sub(r'<[^>]+>', '', segment.instructions)
+            clean_instructions = re.sub(r'<[^>]+>', '', segment["instructions"] or '')
 
             # Prepare the segment data
             segment_data = {
-                "segment_number": segment.segment_number,
-                "surface": segment.surface,
+                "segment_number": segment["segment_number"],
+                "surface": segment["surface"],
                 "distance": {
-                    "text": f"{self.formatted_distance(segment.distance)}",
+                    "text": f"{self.formatted_distance(segment['distance'])}",
                     "type": "meter",
-                    "value": round(segment.distance, 2)
+                    "value": round(segment["distance"], 2)
                 },
                 "duration": {
-                    "text": f"{self.formatted_duration(segment.duration)}",
+                    "text": f"{self.formatted_duration(segment['duration'])}",
                     "type": "second",
-                    "value": round(segment.duration, 2)
+                    "value": round(segment["duration"], 2)
                 },
-                "maneuver": segment.maneuver,
+                "maneuver": segment["maneuver"],
                 "instructions": clean_instructions,
-                "travel_mode": segment.travel_mode
+                "travel_mode": segment["travel_mode"]
             }
 
             # Check if points are available before setting start and end locations
             if points:
-                segment_data["start_location"] = {"latitude": points[0]['latitude'], "longitude": points[0]['longitude']}
-                segment_data["end_location"] = {"latitude": points[-1]['latitude'], "longitude": points[-1]['longitude']}
+                segment_data["start_location"] = points[0]
+                segment_data["end_location"] = points[-1]
                 segment_data["points"] = points
             else:
                 # Default or omit start and end locations if no points are available
@@ -381,27 +397,17 @@ class RouteAPI(generics.GenericAPIView):
 
             segment_response.append(segment_data)
 
+        located = [segment["points"] for segment in segments if segment["points"]]
+
         # Wrap the response data with additional fields
         response_data = {
             "success": True,
-            "source": "App",  # Replace "App" with "Google" or "Miami" as needed
+            "source": "App",
             "transit_id": transitId,
-            "origin_place": {
-                "id": route.origin.id,
-                "address": f"{route.origin.name}, {route.origin.address}, {route.origin.city.name}, {route.origin.state.state_code} {route.origin.zip_code}, {route.origin.country.iso3}"
-            },
-            "destination_place": {
-                "id": route.destination.id,
-                "address": f"{route.destination.name}, {route.destination.address}, {route.destination.city.name}, {route.destination.state.state_code} {route.destination.zip_code}, {route.destination.country.iso3}"
-            },
-            "start_location": {
-                "latitude": origin_location['latitude'],
-                "longitude": origin_location['longitude']
-            },
-            "end_location": {
-                "latitude": destination_location['latitude'],
-                "longitude": destination_location['longitude']
-            },
+            "origin_place": self.format_place(origin_place or route.origin),
+            "destination_place": self.format_place(destination_place or route.destination),
+            "start_location": located[0][0] if located else None,
+            "end_location": located[-1][-1] if located else None,
             "distance": {
                 "text": f"{self.formatted_distance(total_distance)}",
                 "type": "meter",
@@ -415,9 +421,7 @@ class RouteAPI(generics.GenericAPIView):
             "segments": segment_response
         }
 
-        # Use RouteResponseSerializer to serialize the final response
-        serializer = RouteResponseSerializer(response_data)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(response_data, status=status.HTTP_200_OK)
 
     def formatedGoogleRoute(self, google_route, origin_place, destination_place, transitId):
         # Parse the Google Maps route data into the required response format
@@ -433,12 +437,17 @@ class RouteAPI(generics.GenericAPIView):
             "longitude": google_route["legs"][0]["end_location"]["lng"]
         }
 
+        # Decode every step polyline of the route in a single batched pass
+        decoded_steps = iter(polyline.decode_many(
+            [step["polyline"]["points"] for leg in google_route["legs"] for step in leg["steps"]]
+        ))
+
         segments = []
         for leg in google_route["legs"]:
             segment_number = 1
             for step in leg["steps"]:
 
-                decoded_points = self.decode_polyline(self, step["polyline"]["points"])
+                decoded_points = next(decoded_steps).tolist()
                 points_list = [{"latitude": lat, "longitude": lng, "elevation": None} for lat, lng in decoded_points]
 
                 segment_distance = round(step["distance"]["value"])
@@ -482,14 +491,8 @@ class RouteAPI(generics.GenericAPIView):
             "success": True,
             "source": "Google Routes",
             "transit_id": transitId,
-            "origin_place": {
-                "id": origin_place.id,
-                "address": f"{origin_place.name}, {origin_place.address}, {origin_place.city.name}, {origin_place.state.state_code} {origin_place.zip_code}, {origin_place.country.iso3}"
-            },
-            "destination_place": {
-                "id": destination_place.id,
-                "address": f"{destination_place.name}, {destination_place.address}, {destination_place.city.name}, {destination_place.state.state_code} {destination_place.zip_code}, {destination_place.country.iso3}"
-            },
+            "origin_place": self.format_place(origin_place),
+            "destination_place": self.format_place(destination_place),
             "start_location": origin_location,
             "end_location": destination_location,
             "distance": {
@@ -578,14 +581,8 @@ class RouteAPI(generics.GenericAPIView):
             "success": True,
             "source": "OSM Routes",
             "transit_id": transitId,
-            "origin_place": {
-                "id": origin_place.id,
-                "address": f"{origin_place.name}, {origin_place.address}, {origin_place.city.name}, {origin_place.state.state_code} {origin_place.zip_code}, {origin_place.country.iso3}"
-            },
-            "destination_place": {
-                "id": destination_place.id,
-                "address": f"{destination_place.name}, {destination_place.address}, {destination_place.city.name}, {destination_place.state.state_code} {destination_place.zip_code}, {destination_place.country.iso3}"
-            },
+            "origin_place": self.format_place(origin_place),
+            "destination_place": self.format_place(destination_place),
             "start_location": origin_location,
             "end_location": destination_location,
             "distance": {
@@ -603,37 +600,31 @@ class RouteAPI(generics.GenericAPIView):
 
         return Response(response_data, status=status.HTTP_200_OK)
 
-    def find_self_route(self, origin_place, destination_place, transit):
-        # Find the route between the origin and destination for the user
-        route = Route.objects.filter(
-            origin=origin_place,
-            destination=destination_place,
-            status='active'
-        ).first()
-
-        if not route:
-
-            print("No active route found between the specified origin and destination.")
-            print("Searching Google Map Api.")
-
-            google_route = self.googleMapRoute(origin_place.lat, origin_place.lng, destination_place.lat, destination_place.lng)
-
-            if google_route:
-                transit.source = 'google'
-                transit.save()
-                return self.formatedGoogleRoute(google_route, origin_place, destination_place, transit.id)
-
-            return Response(
-                {"success": False, "error": "No active route found between the specified origin and destination."},
-                status=status.HTTP_404_NOT_FOUND
-            )
+    def cached_route_response(self, cached_route, origin_place, destination_place, transitId):
+        # Re-attach the per-request fields that are not stored with cached routes
+        response_data = {
+            "success": True,
+            "source": cached_route.pop("source"),
+            "transit_id": transitId,
+            "origin_place": self.format_place(origin_place),
+            "destination_place": self.format_place(destination_place),
+            **cached_route
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
 
-        transit.source = 'app'
-        transit.save()
+    def find_self_route(self, origin_lat, origin_lng, destination_lat, destination_lng):
+        """
+        Find a curated route for the request: the active route starting and ending within
+        CURATED_ROUTE_RADIUS meters of the origin and destination, with the least detour.
 
-        return self.formate_self_route(route, transit.id)
+        Returns:
+            Route: The curated route, or None.
+        """
+        return nearest_curated_route(
+            origin_lat, origin_lng, destination_lat, destination_lng, settings.CURATED_ROUTE_RADIUS
+        )
 
-    def googleMapRoute(self, origin_lat, origin_lng, destination_lat, destination_lng, mode="cycling"):
+    def googleMapRoute(self, origin_lat, origin_lng, destination_lat, destination_lng, mode="cycling", deadline=None):
         """
         Fetches a route from Google Maps Directions API with walking mode as the default.
 
@@ -643,6 +634,7 @@ class RouteAPI(generics.GenericAPIView):
             destination_lat (float): Latitude of the destination location.
             destination_lng (float): Longitude of the destination location.
             mode (str): The travel mode for the route. Default is "walking".
+            deadline (float): Optional absolute deadline for the provider call.
 
         Returns:
             dict: Route data if available, otherwise None.
@@ -655,15 +647,15 @@ class RouteAPI(generics.GenericAPIView):
             "mode": mode,
             "key": os.getenv('GOOGLE_MPA_KEY')
         }
-        response = requests.get(url, params=params)
+        response = provider_client.get('google', url, params=params, deadline=deadline)
 
-        if response.status_code == 200:
+        if response is not None and response.status_code == 200:
             data = response.json()
             if data["status"] == "OK":
                 return data["routes"][0]  # Return the first route
         return None
 
-    def osmMapRoute(self, origin_lat, origin_lng, destination_lat, destination_lng, mode="cycling"):
+    def osmMapRoute(self, origin_lat, origin_lng, destination_lat, destination_lng, mode="cycling", deadline=None):
         """
         Fetches a route from Google Maps Directions API with walking mode as the default.
         Parameters:
@@ -672,12 +664,13 @@ class RouteAPI(generics.GenericAPIView):
             destination_lat (float): Latitude of the destination location.
             destination_lng (float): Longitude of the destination location.
             mode (str): The travel mode for the route. Default is "walking".
+            deadline (float): Optional absolute deadline for the provider call.
 
         Returns:
             dict: Route data if available, otherwise None.
         """
 
-        url = "http://127.0.0.1:8093/route/getSingleRoute"
+        url = settings.OSM_ROUTE_URL
         payload = {
             'srcLat': f"{origin_lat}",
             'srcLon': f"{origin_lng}",
@@ -686,14 +679,107 @@ class RouteAPI(generics.GenericAPIView):
         }
 
         headers = {
-            'api_key': 'MYPATHg5rDJhV2ThPlHsbx1PUV6omQSHHno2YehXASoKoiSIrIh7Wz38ZUKLI9nGcHIHxIZgJQ20TwpOet7dpvnandXGenGzf9E7LGu8wLozshUrQcGYcq61g8bTL5Bi'
+            'api_key': settings.OSM_ROUTE_API_KEY
         }
 
-        response = requests.get(url, headers=headers, params=payload)
-        if response.status_code == 200:
+        response = provider_client.get('osm', url, params=payload, headers=headers, deadline=deadline)
+        if response is not None and response.status_code == 200:
             return response.json()
         return None
 
+    def fetch_engine_route(self, origin_lat, origin_lng, destination_lat, destination_lng):
+        engine = get_engine()
+        if engine is None:
+            return None
+        engine_route = engine.route(
+            origin_lat, origin_lng, destination_lat, destination_lng, settings.ROUTING_PROFILE,
+            edge_penalties=barrier_overlay.edge_penalties(engine.graph),
+        )
+        if engine_route and engine_route["points"]:
+            return 'osm', engine_route
+        return None
+
+    def fetch_osm_route(self, origin_lat, origin_lng, destination_lat, destination_lng, deadline=None):
+        osm_route = self.osmMapRoute(origin_lat, origin_lng, destination_lat, destination_lng, "cycling", deadline=deadline)
+        if osm_route and osm_route.get("routes"):
+            return 'osm', osm_route["routes"]
+        return None
+
+    def fetch_google_route(self, origin_lat, origin_lng, destination_lat, destination_lng, deadline=None):
+        google_route = self.googleMapRoute(origin_lat, origin_lng, destination_lat, destination_lng, "cycling", deadline=deadline)
+        if google_route:
+            return 'google', google_route
+        return None
+
+    def fetch_provider_route(self, origin_lat, origin_lng, destination_lat, destination_lng, deadline=None):
+        """
+        Fetches a route from the first provider that returns one: the in-process routing
+        engine when a graph is configured, then the OSM route service, then Google.
+
+        With hedging enabled, Google is fired in parallel once OSM has not answered within
+        ROUTE_HEDGE_DELAY seconds (or as soon as OSM fails) and the first good answer wins.
+        Providers whose circuit breaker is open fail immediately, so Google is used right away.
+
+        Parameters:
+            deadline (float): The request's provider deadline; ROUTE_PROVIDER_BUDGET from now by default.
+
+        Returns:
+            tuple: (source, route) where source is 'osm' or 'google', or (None, None) if no provider found a route.
+        """
+        coordinates = (origin_lat, origin_lng, destination_lat, destination_lng)
+
+        engine_route = self.fetch_engine_route(*coordinates)
+        if engine_route:
+            return engine_route
+
+        deadline = deadline or deadline_in(settings.ROUTE_PROVIDER_BUDGET)
+
+        if settings.ROUTE_HEDGE_DELAY is None:
+            result = self.fetch_osm_route(*coordinates, deadline=deadline) \
+                or self.fetch_google_route(*coordinates, deadline=deadline)
+            return result or (None, None)
+
+        osm_future = submit(self.fetch_osm_route, *coordinates, deadline=deadline)
+        wait([osm_future], timeout=settings.ROUTE_HEDGE_DELAY)
+        if osm_future.done() and self.provider_result(osm_future):
+            return osm_future.result()
+
+        pending = {osm_future, submit(self.fetch_google_route, *coordinates, deadline=deadline)}
+        for future in as_completed(pending):
+            result = self.provider_result(future)
+            if result:
+                return result
+
+        return None, None
+
+    @staticmethod
+    def provider_result(future):
+        # A provider that raised is treated like one that found no route
+        if future.exception() is not None:
+            logger.error("Route provider call failed: %s", future.exception())
+            return None
+        return future.result()
+
+    def finalize_route_response(self, request, response):
+        """
+        Applies the per-request presentation options to a formatted route response.
+        Barriers are attached here rather than cached with the route, so they are always current.
+        """
+        barrier_overlay.annotate_segments(response.data)
+
+        marker_buffer = requested_marker_buffer(request)
+        if marker_buffer is not None:
+            markers_along_route(response.data, marker_buffer)
+
+        start_location = response.data.get("start_location") or {}
+        tolerance = requested_tolerance(request, float(start_location.get("latitude") or 0))
+        if tolerance:
+            simplify_segments(response.data, tolerance)
+
+        if requested_geometry(request) == GEOMETRY_POLYLINE:
+            compact_segments(response.data)
+        return response
+
     def post(self, request, *args, **kwargs):
         origin_location = request.data.get("originLocation")
         destination_location = request.data.get("destinationLocation")
@@ -707,9 +793,29 @@ class RouteAPI(generics.GenericAPIView):
         try:
             origin_lat, origin_lng = map(float, origin_location.split(','))
             destination_lat, destination_lng = map(float, destination_location.split(','))
+            coordinates = (origin_lat, origin_lng, destination_lat, destination_lng)
+
+            # One provider budget for the whole request: both geocodes run in the background
+            # while the route is fetched on this thread, and all of them stop at the deadline
+            deadline = deadline_in(settings.ROUTE_PROVIDER_BUDGET)
+            origin_future = submit(get_place, origin_lat, origin_lng, deadline)
+            destination_future = submit(get_place, destination_lat, destination_lng, deadline)
+
+            # Curated routes near both endpoints are served without asking any provider;
+            # otherwise serve a recently computed route between the same cells, preferring OSM
+            curated_route = self.find_self_route(*coordinates)
+            cached_route = None
+            if curated_route:
+                source, provider_route = 'app', None
+            else:
+                cached_source, cached_route = route_cache.get(('osm', 'google'), *coordinates)
+                if cached_route:
+                    source, provider_route = cached_source, None
+                else:
+                    source, provider_route = self.fetch_provider_route(*coordinates, deadline=deadline)
 
-            origin_place = get_place(origin_lat, origin_lng)
-            destination_place = get_place(destination_lat, destination_lng)
+            origin_place = origin_future.result()
+            destination_place = destination_future.result()
 
             if not origin_place or not destination_place:
                 return Response(
@@ -717,35 +823,38 @@ class RouteAPI(generics.GenericAPIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Try OSM route first
-            osm_route = self.osmMapRoute(origin_lat, origin_lng, destination_lat, destination_lng, "cycling")
-            if osm_route and osm_route.get("routes"):
-                transit = Transit.objects.create(
-                    user=request.user,
-                    origin=origin_place,
-                    destination=destination_place,
-                    status='search',
-                    source='osm'
-                )
-                return self.formatedOsmRoute(osm_route["routes"], origin_place, destination_place, transit.id)
-
-            # Fallback to Google route
-            google_route = self.googleMapRoute(origin_lat, origin_lng, destination_lat, destination_lng, "cycling")
-            if google_route:
-                transit = Transit.objects.create(
-                    user=request.user,
-                    origin=origin_place,
-                    destination=destination_place,
-                    status='search',
-                    source='google'
+            if not source:
+                return Response(
+                    {"success": False, "error": "No route found via OSM or Google."},
+                    status=status.HTTP_404_NOT_FOUND
                 )
-                return self.formatedGoogleRoute(google_route, origin_place, destination_place, transit.id)
 
-            return Response(
-                {"success": False, "error": "No route found via OSM or Google."},
-                status=status.HTTP_404_NOT_FOUND
+            transit = Transit.objects.create(
+                user=request.user,
+                origin=origin_place,
+                destination=destination_place,
+                status='search',
+                source=source
             )
 
+            if curated_route:
+                response = self.formate_self_route(curated_route, transit.id, origin_place, destination_place)
+                transit_corridors.remember_route(transit.id, response.data)
+                return self.finalize_route_response(request, response)
+
+            if cached_route:
+                response = self.cached_route_response(cached_route, origin_place, destination_place, transit.id)
+                transit_corridors.remember_route(transit.id, response.data)
+                return self.finalize_route_response(request, response)
+
+            if source == 'osm':
+                response = self.formatedOsmRoute(provider_route, origin_place, destination_place, transit.id)
+            else:
+                response = self.formatedGoogleRoute(provider_route, origin_place, destination_place, transit.id)
+            route_cache.set(source, *coordinates, response.data)
+            transit_corridors.remember_route(transit.id, response.data)
+            return self.finalize_route_response(request, response)
+
         except ValueError:
             return Response(
                 {"success": False, "error": "Invalid location format. Use 'lat,lng'."},
@@ -758,6 +867,22 @@ class RouteAPI(generics.GenericAPIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class ProviderStatusAPI(generics.GenericAPIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Returns this worker's provider metrics: call, error, timeout, skipped (budget spent)
+        and rejected (circuit open) counts, average and p95 latency, and breaker state; and
+        the hit, negative-hit and miss counts of the geocode cell cache.
+        Counters are per process, so successive calls may be answered by different workers.
+        """
+        return Response({
+            "success": True,
+            "providers": provider_client.stats(),
+            "geocode_cache": place_cache.stats(),
+        }, status=status.HTTP_200_OK)
+
 class MarkerCreateAPI(generics.CreateAPIView):
     queryset = TransitMarker.objects.all()
     serializer_class = MarkerCreateSerializer
@@ -799,6 +924,71 @@ class MarkerCreateAPI(generics.CreateAPIView):
 
         return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
+class MarkerSyncAPI(generics.GenericAPIView):
+    serializer_class = MarkerSyncSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'max_batch': settings.MARKER_SYNC_MAX_BATCH}
+
+    def post(self, request, *args, **kwargs):
+        """
+        Stores a batch of markers reported offline: {"markers": [{client_id, transit_id,
+        segment_number, marker_category, marker_type, marker_lat, marker_lng}, ...]}.
+
+        The whole batch is validated first and rejected if any marker is invalid. Retrying a
+        batch is safe: markers whose client_id is already stored come back as duplicates.
+        """
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = sync_markers(request.user, serializer.validated_data["markers"])
+        created = sum(1 for result in results if result["status"] == "created")
+        return Response(
+            {"success": True, "created": created, "duplicates": len(results) - created, "markers": results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+class MarkerChangesAPI(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Returns marker changes after a cursor, oldest first.
+
+        Query parameters:
+            cursor: Opaque cursor from the previous page's next_cursor.
+            since: ISO datetime to start from when there is no cursor.
+            bbox: Optional 'west,south,east,north' in degrees.
+            limit: Page size (default 100, capped at MARKER_FEED_MAX_PAGE).
+
+        Clients keep next_cursor and pull again; has_more means another page is ready now.
+        A 'merged' or 'deleted' event means the marker is gone and its id must be dropped.
+        """
+        try:
+            after = decode_cursor(request.query_params["cursor"]) if request.query_params.get("cursor") else None
+            since = parse_datetime(request.query_params["since"]) if request.query_params.get("since") else None
+            if request.query_params.get("since") and since is None:
+                raise ValueError("since must be an ISO 8601 datetime")
+            bbox = tuple(map(float, request.query_params["bbox"].split(','))) if request.query_params.get("bbox") else None
+            limit = min(max(int(request.query_params.get("limit", 100)), 1), settings.MARKER_FEED_MAX_PAGE)
+            if bbox is not None and len(bbox) != 4:
+                raise ValueError("bbox must be 'west,south,east,north'")
+        except ValueError as e:
+            return Response({"success": False, "error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if since is not None and timezone.is_naive(since):
+            since = timezone.make_aware(since)
+
+        changes, next_cursor, has_more = marker_changes(after=after, since=since, bbox=bbox, limit=limit)
+        return Response({
+            "success": True,
+            "changes": changes,
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+        }, status=status.HTTP_200_OK)
+
 class MarkerSearchAPI(generics.GenericAPIView):
     serializer_class = MarkerCreateSerializer
     permission_classes = [IsAuthenticated]
@@ -814,20 +1004,15 @@ class MarkerSearchAPI(generics.GenericAPIView):
             )
 
         try:
-            point = Point(float(marker_lng), float(marker_lat), srid=4326)
-        except Exception as e:
+            marker_lat, marker_lng = float(marker_lat), float(marker_lng)
+        except (TypeError, ValueError) as e:
             return Response(
                 {"success": False, "error": f"Invalid coordinates: {e}"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Optional: limit to 50 meters radius
-        nearby_marker = TransitMarker.objects.filter(
-            status='detected',
-            location__distance_lte=(point, 100)  # 50 meters
-        ).annotate(
-            distance=Distance('location', point)
-        ).order_by('distance').first()
+        # Nearest active marker within 100 meters
+        nearby_marker = nearest_marker(marker_lat, marker_lng, radius=100)
 
         if not nearby_marker:
             return Response(
@@ -838,6 +1023,139 @@ class MarkerSearchAPI(generics.GenericAPIView):
         serializer = self.get_serializer(nearby_marker)
         return Response({"success": True, **serializer.data}, status=status.HTTP_200_OK)
 
+class MarkerNearbyAPI(generics.GenericAPIView):
+    serializer_class = NearbyMarkerSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Returns the detected markers nearest to a point, within a radius in meters.
+
+        Query parameters:
+            lat, lng: Search point.
+            radius: Search radius in meters (default 100, capped at MARKER_SEARCH_MAX_RADIUS).
+            limit: Number of markers to return (default 10, capped at MARKER_SEARCH_MAX_RESULTS).
+            category: Optional 'Barrier' or 'Facility'.
+        """
+        try:
+            lat = float(request.query_params["lat"])
+            lng = float(request.query_params["lng"])
+            radius = min(float(request.query_params.get("radius", 100)), settings.MARKER_SEARCH_MAX_RADIUS)
+            limit = min(int(request.query_params.get("limit", 10)), settings.MARKER_SEARCH_MAX_RESULTS)
+        except (KeyError, ValueError) as e:
+            return Response(
+                {"success": False, "error": f"Invalid or missing parameters: {e}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        category = request.query_params.get("category")
+        if category and category not in dict(TransitMarker.MARKER_CATEGORIES):
+            return Response(
+                {"success": False, "error": "Invalid category. Use 'Barrier' or 'Facility'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if radius <= 0 or limit <= 0:
+            return Response(
+                {"success": False, "error": "radius and limit must be positive."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        markers = nearest_markers(lat, lng, radius, limit=limit, category=category)
+        serializer = self.get_serializer(markers, many=True)
+        return Response({"success": True, "count": len(markers), "markers": serializer.data}, status=status.HTTP_200_OK)
+
+class MarkerClusterTileAPI(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, z, x, y, *args, **kwargs):
+        """
+        Returns the marker clusters (low zoom) or individual markers (high zoom) of one map tile.
+        """
+        if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return Response(
+                {"success": False, "error": "Invalid tile coordinates."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({"success": True, **marker_tiles.get(z, x, y)}, status=status.HTTP_200_OK)
+
+class MarkerClusterAPI(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Returns the marker clusters or markers of a map viewport.
+
+        Query parameters:
+            bbox: 'west,south,east,north' in degrees.
+            zoom: Map zoom level.
+
+        The viewport is answered from the cached tiles covering it, so panning reuses tiles.
+        """
+        try:
+            west, south, east, north = map(float, request.query_params["bbox"].split(','))
+            zoom = min(max(int(request.query_params["zoom"]), 0), MAX_ZOOM)
+        except (KeyError, ValueError):
+            return Response(
+                {"success": False, "error": "bbox ('west,south,east,north') and zoom are required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        tiles = tiles_covering(west, south, east, north, zoom)
+        if len(tiles) > settings.MARKER_CLUSTER_MAX_TILES:
+            return Response(
+                {"success": False, "error": "Viewport too large for this zoom level."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        clustered = zoom < marker_tiles.cluster_max_zoom
+        items = []
+        for x, y in tiles:
+            tile = marker_tiles.get(zoom, x, y)
+            items.extend(tile["clusters"] if clustered else tile["markers"])
+
+        response_data = {"success": True, "zoom": zoom, "clustered": clustered}
+        response_data["clusters" if clustered else "markers"] = items
+        return Response(response_data, status=status.HTTP_200_OK)
+
+class VectorTileAPI(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, layer, z, x, y, *args, **kwargs):
+        """
+        Returns a Mapbox Vector Tile of markers or places.
+
+        `?fields=a,b` selects the tile attributes from the layer's whitelist. Responses carry an
+        ETag; a matching If-None-Match gets 304 Not Modified and an empty tile 204 No Content.
+        """
+        if layer not in MVT_LAYERS:
+            return Response(
+                {"success": False, "error": f"Unknown layer. Use one of: {', '.join(MVT_LAYERS)}."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return Response(
+                {"success": False, "error": "Invalid tile coordinates."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            fields = vector_tiles.fields(layer, request.query_params.get("fields"))
+        except ValueError as e:
+            return Response({"success": False, "error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        data, etag = vector_tiles.get(layer, z, x, y, fields)
+        etag = f'"{etag}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        elif not data:
+            response = HttpResponse(status=status.HTTP_204_NO_CONTENT)
+        else:
+            response = HttpResponse(data, content_type='application/vnd.mapbox-vector-tile')
+        response['ETag'] = etag
+        response['Cache-Control'] = f'private, max-age={settings.MVT_TILE_MAX_AGE}'
+        return response
+
 class MarkerTrackerAPI(generics.CreateAPIView):
     queryset = TransitMarkerTracking.objects.all()
     serializer_class = TransitMarkerTrackingSerializer
@@ -868,20 +1186,15 @@ class MarkerStatusUpdateAPI(generics.GenericAPIView):
             )
 
         try:
-            point = Point(float(marker_lng), float(marker_lat), srid=4326)
-        except Exception as e:
+            marker_lat, marker_lng = float(marker_lat), float(marker_lng)
+        except (TypeError, ValueError) as e:
             return Response(
                 {"success": False, "error": f"Invalid coordinates: {e}"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         # Find the nearest marker within 50 meters
-        marker = TransitMarker.objects.filter(
-            status='detected',
-            location__distance_lte=(point, 50)
-        ).annotate(
-            distance=Distance('location', point)
-        ).order_by('distance').first()
+        marker = nearest_marker(marker_lat, marker_lng, radius=50)
 
         if not marker:
             return Response(
@@ -908,6 +1221,12 @@ class MarkerStatusUpdateAPI(generics.GenericAPIView):
             "transit_id": str(marker.transit.id)
         }, status=status.HTTP_200_OK)
 
+def transit_finished(transit):
+    """Stop tracking a transit that was completed or canceled, and close its event streams."""
+    position_tracker.finish(str(transit.id))
+    transit_corridors.transit_finished(transit.id)
+    push_transit_event(transit.id, END_EVENT, {"status": transit.status})
+
 class TransitCreateAPI(generics.CreateAPIView):
     queryset = Transit.objects.all()
     serializer_class = TransitCreateSerializer
@@ -943,6 +1262,9 @@ class TransitCreateAPI(generics.CreateAPIView):
             transit.start_at = timezone.now()  # Set start_at to current time
             transit.status = 'in_progress'
             transit.save()
+            # Barriers reported along the route from now on are pushed to the transit's event stream
+            transit_corridors.transit_started(transit.id)
+            position_tracker.start(transit)
 
             # Prepare the response data
             response_data = {
@@ -965,6 +1287,73 @@ class TransitCreateAPI(generics.CreateAPIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+class TransitEventTicketAPI(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, transit_id, *args, **kwargs):
+        """
+        Issues a single-use ticket for the transit's event stream, for clients (EventSource)
+        that can't send an Authorization header: open /transits/<id>/events/?ticket=<ticket>
+        within expires_in seconds.
+        """
+        if not Transit.objects.filter(id=transit_id, user=request.user, status='in_progress').exists():
+            return Response(
+                {"success": False, "error": "No in-progress transit with this ID for the authenticated user."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({
+            "success": True,
+            "ticket": issue_ticket(transit_id, request.user.id),
+            "expires_in": settings.PUSH_TICKET_TTL,
+        }, status=status.HTTP_201_CREATED)
+
+class TransitPositionAPI(generics.GenericAPIView):
+    serializer_class = TransitPositionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), "max_batch": settings.POSITION_MAX_BATCH}
+
+    def post(self, request, *args, **kwargs):
+        """
+        Records live positions of an in-progress transit: {"transit_id", "positions": [{latitude,
+        longitude, recorded_at, accuracy}]}. Each position is snapped to the transit's route;
+        the response has the resulting progress, and leaving or rejoining the route is also
+        pushed to the transit's event stream.
+        """
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"success": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        transit_id = str(serializer.validated_data["transit_id"])
+        state = position_tracker.state(transit_id)
+        if state is None:
+            # Not started through TransitCreateAPI on this deployment, or the state expired
+            transit = Transit.objects.filter(id=transit_id, user=request.user, status='in_progress').first()
+            if transit is not None:
+                position_tracker.start(transit)
+                state = position_tracker.state(transit_id)
+
+        if state is None or state["user_id"] != request.user.id:
+            return Response(
+                {"success": False, "error": "No in-progress transit with this ID for the authenticated user."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            state = position_tracker.record(transit_id, serializer.validated_data["positions"])
+        except TrackingBusy:
+            return Response(
+                {"success": False, "error": "Another position update for this transit is in progress; retry."},
+                status=status.HTTP_409_CONFLICT
+            )
+        if state is None:
+            return Response(
+                {"success": False, "error": "No in-progress transit with this ID for the authenticated user."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({"success": True, "data": position_tracker.summary(transit_id, state)}, status=status.HTTP_200_OK)
+
 class TransitCompleteAPI(generics.UpdateAPIView):
     queryset = Transit.objects.all()
     serializer_class = TransitCompleteSerializer
@@ -979,43 +1368,63 @@ class TransitCompleteAPI(generics.UpdateAPIView):
         distance = request.data.get("distance")
         duration = request.data.get("duration")
 
-        if not transit_id or distance is None or duration is None:
+        if not transit_id:
             return Response(
-                {"success": False, "error": "transit_id, distance, and duration are required."},
+                {"success": False, "error": "transit_id is required."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         try:
             transit = self.get_queryset().get(id=transit_id)
+        except Transit.DoesNotExist:
+            return Response(
+                {"success": False, "error": "Transit record with the provided ID does not exist or does not belong to the user."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # Prefer the distance and duration measured from live positions over the client's figures;
+        # tracking is only stopped by transit_finished() once the transit is saved
+        tracked = position_tracker.state(str(transit.id))
+        if tracked and tracked["first_at"] is not None and tracked["last_at"] > tracked["first_at"]:
+            distance, duration = round(tracked["distance"], 2), round(tracked["last_at"] - tracked["first_at"], 2)
+            measured_by = 'server'
+        elif distance is None or duration is None:
+            return Response(
+                {"success": False, "error": "distance and duration are required when no positions were reported."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        else:
+            measured_by = 'client'
 
-            # Convert to float
+        try:
             distance = float(distance)
             duration = float(duration)
+        except ValueError:
+            return Response(
+                {"success": False, "error": "distance and duration must be numeric."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-            transit.distance = distance
-            transit.duration = duration
-            transit.average_speed = round(distance / duration, 2)
-            transit.status = 'completed'
-            transit.end_at = timezone.now()
-            transit.save()
+        transit.distance = distance
+        transit.duration = duration
+        transit.average_speed = round(distance / duration, 2) if duration else 0
+        transit.status = 'completed'
+        transit.end_at = timezone.now()
+        transit.save()
+        transit_finished(transit)
 
-            response_data = {
-                "success": True,
-                "data": {
-                    "transit_id": transit.id,
-                    "status": transit.status,
-                    "distance": transit.distance,
-                    "duration": transit.duration,
-                    "end_at": transit.end_at,
-                }
+        response_data = {
+            "success": True,
+            "data": {
+                "transit_id": transit.id,
+                "status": transit.status,
+                "distance": transit.distance,
+                "duration": transit.duration,
+                "measured_by": measured_by,
+                "end_at": transit.end_at,
             }
-            return Response(response_data, status=status.HTTP_200_OK)
-
-        except Transit.DoesNotExist:
-            return Response(
-                {"success": False, "error": "Transit record with the provided ID does not exist or does not belong to the user."},
-                status=status.HTTP_404_NOT_FOUND
-            )
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
 
 class TransitCancelAPI(generics.UpdateAPIView):
     queryset = Transit.objects.all()
@@ -1059,6 +1468,7 @@ class TransitCancelAPI(generics.UpdateAPIView):
 
             transit.end_at = timezone.now()
             transit.save()
+            transit_finished(transit)
 
             return Response(
                 {
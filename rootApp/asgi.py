@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rootApp.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up; the event streams are long-lived, so they bypass the
+# request/response handling of the Django application
+from navigation.push import match_transit_events, transit_events  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and match_transit_events(scope):
+        await transit_events(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -61,10 +61,138 @@ else:
     CELERY_BROKER_URL = "memory://localhost/"
     CELERY_RESULT_BACKEND = "cache+memory://"
 
+# Reverse-geocode cache (geohash cell -> resolved Place)
+GEOCODE_CACHE_PRECISION = int(os.getenv('GEOCODE_CACHE_PRECISION', 8))
+GEOCODE_CACHE_TTL = int(os.getenv('GEOCODE_CACHE_TTL', 60 * 60 * 24))
+GEOCODE_CACHE_NEGATIVE_TTL = int(os.getenv('GEOCODE_CACHE_NEGATIVE_TTL', 60 * 5))
+GEOCODE_CACHE_LOCAL_SIZE = int(os.getenv('GEOCODE_CACHE_LOCAL_SIZE', 2048))
+
+# Route result cache (snapped origin/destination cells + provider -> formatted route)
+ROUTE_CACHE_PRECISION = int(os.getenv('ROUTE_CACHE_PRECISION', 8))
+ROUTE_CACHE_INDEX_PRECISION = int(os.getenv('ROUTE_CACHE_INDEX_PRECISION', 6))
+ROUTE_CACHE_TTL = int(os.getenv('ROUTE_CACHE_TTL', 60 * 15))
+ROUTE_CACHE_LOCAL_SIZE = int(os.getenv('ROUTE_CACHE_LOCAL_SIZE', 256))
+
+# Worker threads per process for concurrent place resolution / provider calls
+ROUTE_EXECUTOR_WORKERS = int(os.getenv('ROUTE_EXECUTOR_WORKERS', 8))
+
+# Routing/geocoding provider HTTP clients (timeouts in seconds)
+ROUTE_PROVIDERS = {
+    'default': {'connect_timeout': 3.05, 'read_timeout': 10.0, 'pool_size': 10},
+    'osm': {
+        'connect_timeout': float(os.getenv('OSM_CONNECT_TIMEOUT', 1.0)),
+        'read_timeout': float(os.getenv('OSM_READ_TIMEOUT', 5.0)),
+        'pool_size': int(os.getenv('OSM_POOL_SIZE', 10)),
+        'breaker': {
+            'window_seconds': int(os.getenv('OSM_BREAKER_WINDOW', 60)),
+            'min_calls': int(os.getenv('OSM_BREAKER_MIN_CALLS', 10)),
+            'error_threshold': float(os.getenv('OSM_BREAKER_ERROR_RATE', 0.5)),
+            'open_seconds': int(os.getenv('OSM_BREAKER_OPEN_SECONDS', 30)),
+            'slow_call_ms': float(os.getenv('OSM_BREAKER_SLOW_CALL_MS', 3000)),
+        },
+    },
+    'google': {
+        'connect_timeout': float(os.getenv('GOOGLE_CONNECT_TIMEOUT', 3.05)),
+        'read_timeout': float(os.getenv('GOOGLE_READ_TIMEOUT', 8.0)),
+        'pool_size': int(os.getenv('GOOGLE_POOL_SIZE', 10)),
+        'breaker': {
+            'window_seconds': int(os.getenv('GOOGLE_BREAKER_WINDOW', 60)),
+            'min_calls': int(os.getenv('GOOGLE_BREAKER_MIN_CALLS', 10)),
+            'error_threshold': float(os.getenv('GOOGLE_BREAKER_ERROR_RATE', 0.5)),
+            'open_seconds': int(os.getenv('GOOGLE_BREAKER_OPEN_SECONDS', 30)),
+        },
+    },
+}
+# Total time a route request may spend waiting on providers
+ROUTE_PROVIDER_BUDGET = float(os.getenv('ROUTE_PROVIDER_BUDGET', 12.0))
+# Time one place lookup (search + details) may take when imported outside a route request
+GEOCODE_BUDGET = float(os.getenv('GEOCODE_BUDGET', 5.0))
+# Seconds to wait on OSM before also asking Google; unset disables hedging
+ROUTE_HEDGE_DELAY = float(os.getenv('ROUTE_HEDGE_DELAY')) if os.getenv('ROUTE_HEDGE_DELAY') else None
+
+# External OSM route service
+OSM_ROUTE_URL = os.getenv('OSM_ROUTE_URL', 'http://127.0.0.1:8093/route/getSingleRoute')
+# Secret; only ever read from the environment
+OSM_ROUTE_API_KEY = os.getenv('OSM_ROUTE_API_KEY')
+
+# In-process routing engine; built with `manage.py build_routing_graph`, disabled when unset
+ROUTING_GRAPH_PATH = os.getenv('ROUTING_GRAPH_PATH')
+ROUTING_PROFILE = os.getenv('ROUTING_PROFILE', 'manual')
+# Contraction hierarchies per profile; built with `manage.py build_contraction_hierarchy`
+ROUTING_CH_PATH = os.getenv('ROUTING_CH_PATH')
+
+# In-memory overlay of reported barriers used to penalize and annotate routes (distances in meters)
+BARRIER_OVERLAY_PRECISION = int(os.getenv('BARRIER_OVERLAY_PRECISION', 7))
+BARRIER_PENALTY_RADIUS = float(os.getenv('BARRIER_PENALTY_RADIUS', 15))
+BARRIER_ANNOTATION_RADIUS = float(os.getenv('BARRIER_ANNOTATION_RADIUS', 30))
+# Seconds between checks for barrier changes made by other workers
+BARRIER_OVERLAY_REFRESH = float(os.getenv('BARRIER_OVERLAY_REFRESH', 5))
+
+# Markers returned with a route on `?include_markers=true` (buffer around the route in meters)
+ROUTE_MARKER_BUFFER = float(os.getenv('ROUTE_MARKER_BUFFER', 25))
+ROUTE_MARKER_MAX_BUFFER = float(os.getenv('ROUTE_MARKER_MAX_BUFFER', 200))
+
+# Limits of the nearest-marker search API
+MARKER_SEARCH_MAX_RADIUS = float(os.getenv('MARKER_SEARCH_MAX_RADIUS', 5000))
+MARKER_SEARCH_MAX_RESULTS = int(os.getenv('MARKER_SEARCH_MAX_RESULTS', 100))
+# Markers accepted per offline sync batch
+MARKER_SYNC_MAX_BATCH = int(os.getenv('MARKER_SYNC_MAX_BATCH', 200))
+# Largest page of the marker change feed
+MARKER_FEED_MAX_PAGE = int(os.getenv('MARKER_FEED_MAX_PAGE', 500))
+
+# Curated routes are served when they start and end within this many meters of the request
+CURATED_ROUTE_RADIUS = float(os.getenv('CURATED_ROUTE_RADIUS', 150))
+
+# Push notifications to in-progress transits: 'memory' (single process) or 'redis'
+PUSH_BROKER = os.getenv('PUSH_BROKER', 'redis' if USE_REDIS else 'memory')
+# Seconds between keepalive comments on idle event streams
+PUSH_KEEPALIVE = float(os.getenv('PUSH_KEEPALIVE', 15))
+# Seconds a single-use event stream ticket stays valid
+PUSH_TICKET_TTL = int(os.getenv('PUSH_TICKET_TTL', 30))
+# Also accept a JWT in ?token= on event streams; it ends up in access logs, so off by default
+PUSH_ALLOW_QUERY_TOKEN = os.getenv('PUSH_ALLOW_QUERY_TOKEN', 'False') == 'True'
+# New barriers within this many meters of an active transit's route are pushed to it
+TRANSIT_CORRIDOR_WIDTH = float(os.getenv('TRANSIT_CORRIDOR_WIDTH', 50))
+TRANSIT_CORRIDOR_PRECISION = int(os.getenv('TRANSIT_CORRIDOR_PRECISION', 7))
+# How long the route served for a transit is kept for corridor matching (seconds)
+TRANSIT_ROUTE_TTL = int(os.getenv('TRANSIT_ROUTE_TTL', 6 * 3600))
+
+# Live positions of in-progress transits: buffered per transit and written in batches
+POSITION_BUFFER_SIZE = int(os.getenv('POSITION_BUFFER_SIZE', 120))
+POSITION_FLUSH_SIZE = int(os.getenv('POSITION_FLUSH_SIZE', 500))
+POSITION_FLUSH_INTERVAL = float(os.getenv('POSITION_FLUSH_INTERVAL', 5))
+POSITION_MAX_BATCH = int(os.getenv('POSITION_MAX_BATCH', 50))
+# Steps implying a faster speed (m/s) are GPS jumps and don't count towards the distance
+POSITION_MAX_SPEED = float(os.getenv('POSITION_MAX_SPEED', 15))
+# A transit is off route after OFF_ROUTE_COUNT positions in a row further than this (meters)
+OFF_ROUTE_DISTANCE = float(os.getenv('OFF_ROUTE_DISTANCE', 40))
+OFF_ROUTE_COUNT = int(os.getenv('OFF_ROUTE_COUNT', 3))
+
+# Duplicate-marker consolidation: same-type markers within this many meters (at most 150) and
+# hours of an earlier one are merged into it, every MARKER_MERGE_INTERVAL seconds
+MARKER_MERGE_DISTANCE = float(os.getenv('MARKER_MERGE_DISTANCE', 10))
+MARKER_MERGE_WINDOW_HOURS = float(os.getenv('MARKER_MERGE_WINDOW_HOURS', 24 * 30))
+MARKER_MERGE_INTERVAL = int(os.getenv('MARKER_MERGE_INTERVAL', 60 * 15))
+
+# Marker cluster tiles: zoom from which individual markers are returned, zoom of the tiles
+# whose versions invalidate cached tiles, cache TTL and max tiles per viewport request
+MARKER_CLUSTER_MAX_ZOOM = int(os.getenv('MARKER_CLUSTER_MAX_ZOOM', 16))
+MARKER_TILE_VERSION_ZOOM = int(os.getenv('MARKER_TILE_VERSION_ZOOM', 12))
+MARKER_TILE_CACHE_TTL = int(os.getenv('MARKER_TILE_CACHE_TTL', 60 * 60))
+MARKER_CLUSTER_MAX_TILES = int(os.getenv('MARKER_CLUSTER_MAX_TILES', 16))
+# Seconds clients may reuse a vector tile before revalidating it with its ETag
+MVT_TILE_MAX_AGE = int(os.getenv('MVT_TILE_MAX_AGE', 60))
+
 # Celery settings
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+CELERY_BEAT_SCHEDULE = {
+    'consolidate-duplicate-markers': {
+        'task': 'navigation.tasks.consolidate_duplicate_markers',
+        'schedule': MARKER_MERGE_INTERVAL,
+    },
+}
 
 # Application definition
 INSTALLED_APPS = [
@@ -89,6 +217,8 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'rootApp.urls'
 WSGI_APPLICATION = 'rootApp.wsgi.application'
+# Served by uvicorn workers; the transit event streams only exist under ASGI
+ASGI_APPLICATION = 'rootApp.asgi.application'
 
 TEMPLATES = [{
     'BACKEND': 'django.template.backends.django.DjangoTemplates',